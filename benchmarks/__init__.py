@@ -0,0 +1,11 @@
+# Benchmark package
+from .harness import run_case, BenchSource, CollectingSink
+from .cases import CASES, run_suite
+
+__all__ = [
+    'run_case',
+    'BenchSource',
+    'CollectingSink',
+    'CASES',
+    'run_suite'
+]
@@ -0,0 +1,43 @@
+"""
+Run the benchmark suite:
+
+    python -m benchmarks --scale 2000 --out bench.json
+    python -m benchmarks --case parallel/ --case topology/model_task
+"""
+import argparse
+import contextlib
+import json
+import sys
+
+from .cases import CASES, run_suite
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="benchmarks", description="Pipeline DSL benchmarks")
+    parser.add_argument("--scale", type=int, default=1000, help="jobs per source (default 1000)")
+    parser.add_argument("--case", action="append", help="case name or prefix, repeatable")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds per case")
+    parser.add_argument("--out", help="write JSON report here instead of stdout")
+    parser.add_argument("--no-isolate", action="store_true", help="run cases in this process")
+    parser.add_argument("--list", action="store_true", help="list cases and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print("\n".join(CASES))
+        return 0
+
+    # Progress and node output go to stderr, so stdout holds nothing but the report
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run_suite(args.scale, args.case, args.timeout, isolate=not args.no_isolate)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+        print(f"📄 Benchmark report written to {args.out}")
+    else:
+        print(text)
+    return 0 if all(r.get("completed") for r in report["results"]) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+import multiprocessing
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from dsl.pipeline.builder import PipelineBuilder
+from dsl.nodes.filters import (
+    OneToOneNode, TypeTransformNode, NToOneNode,
+    OneToNNode, SelectionNode, SummatorNode
+)
+from dsl.nodes.parallel import OrderedProcessingNode
+from dsl.nodes.configurable import ConfigurableBlurNode
+from model.image_job import ImageJob
+from .harness import BenchSource, CollectingSink, run_case
+
+
+def _jobs(n: int, prefix: str = "job", **fields) -> Iterator[ImageJob]:
+    """Lazily create n jobs - per-job fields may be callables of the index"""
+    for i in range(n):
+        values = {k: (v(i) if callable(v) else v) for k, v in fields.items()}
+        yield ImageJob(image_id=f"{prefix}_{i}", transformations=["loaded"],
+                       current_format="PNG", **values)
+
+
+def _pipeline(name: str, nodes: Dict[str, Any], edges: List[tuple]) -> PipelineBuilder:
+    pipe = PipelineBuilder(name)
+    for node_id, node in nodes.items():
+        pipe.add_node(node_id, node)
+    for from_node, to_node, to_port in edges:
+        pipe.connect(from_node, 0, to_node, to_port)
+    return pipe
+
+
+# ============ Single node types ============
+
+def _single(node_factory: Callable[[], Any], expected: Callable[[int], int], **fields):
+    def build(n: int):
+        src = BenchSource("src", _jobs(n, **fields))
+        sink = CollectingSink("sink", expected(n))
+        pipe = _pipeline("bench", {"src": src, "node": node_factory(), "sink": sink},
+                         [("src", "node", 0), ("node", "sink", 0)])
+        return pipe, [src], sink
+    return build
+
+
+def _two_inputs(node_factory: Callable[[], Any], **fields):
+    def build(n: int):
+        src_a = BenchSource("src_a", _jobs(n, "a", **fields))
+        src_b = BenchSource("src_b", _jobs(n, "b", **fields))
+        sink = CollectingSink("sink", n)
+        pipe = _pipeline("bench", {"src_a": src_a, "src_b": src_b, "node": node_factory(), "sink": sink},
+                         [("src_a", "node", 0), ("src_b", "node", 1), ("node", "sink", 0)])
+        return pipe, [src_a, src_b], sink
+    return build
+
+
+def _parallel(workers: int):
+    return _single(lambda: OrderedProcessingNode("parallel", workers), lambda n: n)
+
+
+# ============ Canonical topologies ============
+
+def _linear_chain(n: int, length: int = 5):
+    src = BenchSource("src", _jobs(n))
+    sink = CollectingSink("sink", n)
+    nodes = {"src": src}
+    edges = []
+    previous = "src"
+    for i in range(length):
+        nodes[f"stage_{i}"] = OneToOneNode(f"stage_{i}", f"op_{i}")
+        edges.append((previous, f"stage_{i}", 0))
+        previous = f"stage_{i}"
+    nodes["sink"] = sink
+    edges.append((previous, "sink", 0))
+    return _pipeline("linear_chain", nodes, edges), [src], sink
+
+
+def _fan_out_fan_in(n: int):
+    src = BenchSource("src", _jobs(n, correlation_id=lambda i: f"c{i}"))
+    sink = CollectingSink("sink", n)
+    pipe = _pipeline("fan_out_fan_in", {
+        "src": src,
+        "branch_a": OneToOneNode("branch_a", "gaussian_denoise"),
+        "branch_b": OneToOneNode("branch_b", "median_denoise"),
+        "select": SelectionNode("select", 2),
+        "sink": sink,
+    }, [
+        ("src", "branch_a", 0), ("src", "branch_b", 0),
+        ("branch_a", "select", 0), ("branch_b", "select", 1),
+        ("select", "sink", 0),
+    ])
+    return pipe, [src], sink
+
+
+def _summator_join(n: int):
+    src_a = BenchSource("src_a", _jobs(n, "a", numeric_value=lambda i: float(i)))
+    src_b = BenchSource("src_b", _jobs(n, "b", numeric_value=1.0))
+    sink = CollectingSink("sink", n)
+    pipe = _pipeline("summator_join", {
+        "src_a": src_a,
+        "src_b": src_b,
+        "scale_a": OneToOneNode("scale_a", "scale"),
+        "scale_b": OneToOneNode("scale_b", "scale"),
+        "sum": SummatorNode("sum"),
+        "sink": sink,
+    }, [
+        ("src_a", "scale_a", 0), ("src_b", "scale_b", 0),
+        ("scale_a", "sum", 0), ("scale_b", "sum", 1),
+        ("sum", "sink", 0),
+    ])
+    return pipe, [src_a, src_b], sink
+
+
+def _model_task(n: int):
+    """Same graph as demo/model_task.py (terminator and printing sink left out)"""
+    n -= n % 3
+    src = BenchSource("src", _jobs(n))
+    # selector keeps 1 of each pair, stitcher merges 3, splitter makes 2
+    sink = CollectingSink("sink", 2 * (n // 3))
+    blur_small = ConfigurableBlurNode("blur_small")
+    blur_large = ConfigurableBlurNode("blur_large")
+    pipe = _pipeline("model_task", {
+        "src": src,
+        "blur1": blur_small,
+        "blur2": blur_large,
+        "selector": SelectionNode("best_selector", 2),
+        "stitcher": NToOneNode("panorama_stitcher", 3),
+        "splitter": OneToNNode("image_splitter"),
+        "parallel_proc": OrderedProcessingNode("parallel_processor", 2),
+        "converter": TypeTransformNode("format_converter", "JPG"),
+        "sink": sink,
+    }, [
+        ("src", "blur1", 0), ("src", "blur2", 0),
+        ("blur1", "selector", 0), ("blur2", "selector", 1),
+        ("selector", "stitcher", 0), ("stitcher", "splitter", 0),
+        ("splitter", "parallel_proc", 0), ("parallel_proc", "converter", 0),
+        ("converter", "sink", 0),
+    ])
+    return pipe, [src], sink
+
+
+CASES: Dict[str, Callable[[int], tuple]] = {
+    "node/one_to_one": _single(lambda: OneToOneNode("node", "blur"), lambda n: n),
+    "node/one_to_one_batched": _single(lambda: OneToOneNode("node", "blur").set_batching(64), lambda n: n),
+    "node/type_transform": _single(lambda: TypeTransformNode("node", "JPG"), lambda n: n),
+    "node/n_to_one": _single(lambda: NToOneNode("node", 3), lambda n: n // 3,
+                             panorama_group=lambda i: f"group_{i // 3}"),
+    "node/one_to_n": _single(lambda: OneToNNode("node"), lambda n: 4 * n, split_into=4),
+    "node/selection": _two_inputs(lambda: SelectionNode("node", 2), correlation_id=lambda i: f"c{i}"),
+    "node/summator": _two_inputs(lambda: SummatorNode("node"), numeric_value=1.0),
+    "parallel/workers_1": _parallel(1),
+    "parallel/workers_2": _parallel(2),
+    "parallel/workers_4": _parallel(4),
+    "parallel/workers_8": _parallel(8),
+    "topology/linear_chain": _linear_chain,
+    "topology/fan_out_fan_in": _fan_out_fan_in,
+    "topology/summator_join": _summator_join,
+    "topology/model_task": _model_task,
+}
+
+
+def _run_one(name: str, scale: int, timeout: float) -> Dict[str, Any]:
+    result = run_case(name, lambda: CASES[name](scale), timeout)
+    result["scale"] = scale
+    return result
+
+
+def _run_isolated(name: str, scale: int, timeout: float, results):
+    sys.stdout = sys.stderr  # Node chatter must not end up in a report written to stdout
+    results.put(_run_one(name, scale, timeout))
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_suite(scale: int = 1000, names: Optional[List[str]] = None,
+              timeout: float = 60.0, isolate: bool = True) -> Dict[str, Any]:
+    """Run benchmark cases and return a JSON-serializable report.
+
+    With isolate=True every case runs in a fresh interpreter so peak RSS and
+    leftover threads from one case do not leak into the next.
+    """
+    selected = [name for name in CASES if not names or any(name.startswith(n) for n in names)]
+    results = []
+    context = multiprocessing.get_context("spawn")
+
+    for name in selected:
+        print(f"⏱️  {name} (scale={scale})", file=sys.stderr)
+        if isolate:
+            queue = context.Queue()
+            process = context.Process(target=_run_isolated, args=(name, scale, timeout, queue))
+            process.start()
+            try:
+                results.append(queue.get(timeout=timeout + 30))
+            except Exception:
+                results.append({"case": name, "scale": scale, "completed": False, "error": "no result"})
+            process.join(timeout=5)
+            if process.is_alive():
+                process.kill()  # Node threads that outlived stop()
+        else:
+            results.append(_run_one(name, scale, timeout))
+
+    return {
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "scale": scale,
+        "results": results,
+    }
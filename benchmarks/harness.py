@@ -0,0 +1,105 @@
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from dsl.nodes.base import SynchronizedNode
+from model.image_job import ImageJob
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class BenchSource(SynchronizedNode):
+    """Source that emits as fast as the channels accept (no per-item sleep)"""
+    def __init__(self, name: str, jobs: Iterable[ImageJob]):
+        super().__init__(name, {"in_0": 0})
+        self.jobs = jobs
+        self.first_emit: Optional[float] = None
+
+    def _run(self):
+        self.first_emit = time.perf_counter()
+        for job in self.jobs:
+            if not self.running:
+                break
+            if self.draining:
+                self.end_of_stream = True
+                break
+            job.created_at = time.time()
+            for output in self.outputs:
+                self._send(output, job)
+            self.processed_count += 1
+        else:
+            self.end_of_stream = True
+        self._finish()
+
+
+class CollectingSink(SynchronizedNode):
+    """Sink recording per-item latency (now - job.created_at)"""
+    def __init__(self, name: str, expected: int):
+        super().__init__(name, {"in_0": 1})
+        self.expected = expected
+        self.latencies: List[float] = []
+        self.last_receive: Optional[float] = None
+        self.done = threading.Event()
+
+    def process(self, inputs):
+        job = inputs["in_0"][0]
+        self.latencies.append(time.time() - job.created_at)
+        self.last_receive = time.perf_counter()
+        if len(self.latencies) >= self.expected:
+            self.done.set()
+        return None
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(pct / 100.0 * len(values))) - 1))
+    return values[index]
+
+
+def peak_rss_kb() -> Optional[int]:
+    """Peak resident set size of this process in KiB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def run_case(name: str, build: Callable[[], tuple], timeout: float = 60.0) -> Dict[str, Any]:
+    """Run one benchmark case.
+
+    build() returns (pipeline, sources, sink); the sink knows how many items
+    to expect. Throughput is measured from the first emit to the last item
+    received by the sink.
+    """
+    pipe, sources, sink = build()
+    pipe.start()
+    finished = sink.done.wait(timeout)
+    pipe.stop()
+
+    first_emit = min(s.first_emit for s in sources if s.first_emit is not None)
+    elapsed = (sink.last_receive or first_emit) - first_emit
+    received = len(sink.latencies)
+    latencies = sorted(sink.latencies)
+
+    return {
+        "case": name,
+        "jobs_in": sum(s.processed_count for s in sources),
+        "jobs_out": received,
+        "expected_out": sink.expected,
+        "completed": finished,
+        "elapsed_s": elapsed,
+        "throughput_jobs_s": received / elapsed if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "p50": percentile(latencies, 50) * 1e3,
+            "p90": percentile(latencies, 90) * 1e3,
+            "p99": percentile(latencies, 99) * 1e3,
+            "max": (latencies[-1] if latencies else 0.0) * 1e3,
+        },
+        "peak_rss_kb": peak_rss_kb(),
+    }
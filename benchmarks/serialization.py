@@ -0,0 +1,91 @@
+"""
+ImageJob serialization: model.wire vs pickle, for encode/decode speed and size.
+
+    python -m benchmarks.serialization --count 10000 --batch 256
+    python -m benchmarks.serialization --pixels 64x64x3 --out wire.json
+"""
+import argparse
+import json
+import pickle
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+from data.synthetic import synthetic_jobs
+from model import wire
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> float:
+    """Best of repeat runs, seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _measure(name: str, batches: List[list], dumps: Callable, loads: Callable, repeat: int) -> Dict[str, Any]:
+    count = sum(len(batch) for batch in batches)
+    encoded = [dumps(batch) for batch in batches]
+    encode = _time(lambda: [dumps(batch) for batch in batches], repeat)
+    decode = _time(lambda: [loads(data) for data in encoded], repeat)
+    size = sum(len(data) for data in encoded)
+    return {
+        "format": name,
+        "encode_us_per_job": encode / count * 1e6,
+        "decode_us_per_job": decode / count * 1e6,
+        "bytes_per_job": size / count,
+    }
+
+
+def run(count: int = 10000, batch: int = 256, pixels: str = "", repeat: int = 5) -> Dict[str, Any]:
+    jobs = list(synthetic_jobs(count, seed=0))
+    for i, job in enumerate(jobs):
+        job.add_transformation("blur")
+        job.add_transformation("quality_scored")
+        job.quality_metrics = {"sharpness": 120.0 + i, "noise": 3.5, "exposure": 0.48}
+    if pixels:
+        import numpy as np
+        shape = tuple(int(n) for n in pixels.split("x"))
+        rng = np.random.default_rng(0)
+        for job in jobs:
+            # One array per job - a shared one would let pickle's memo send it once
+            job.pixels = rng.integers(0, 255, shape, dtype=np.uint8)
+    batches = [jobs[i:i + batch] for i in range(0, len(jobs), batch)]
+
+    results = [
+        _measure("pickle", batches, lambda b: pickle.dumps(b, pickle.HIGHEST_PROTOCOL), pickle.loads, repeat),
+        _measure("pickle_single", batches,
+                 lambda b: [pickle.dumps(job, pickle.HIGHEST_PROTOCOL) for job in b],
+                 lambda data: [pickle.loads(d) for d in data], repeat),
+        _measure("wire", batches, wire.pack, wire.unpack, repeat),
+    ]
+    # pickle_single yields lists of bytes - count their total size
+    results[1]["bytes_per_job"] = sum(len(pickle.dumps(job, pickle.HIGHEST_PROTOCOL)) for job in jobs) / count
+    return {"count": count, "batch": batch, "pixels": pixels or None, "results": results}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="benchmarks.serialization",
+                                     description="ImageJob wire format vs pickle")
+    parser.add_argument("--count", type=int, default=10000, help="jobs (default 10000)")
+    parser.add_argument("--batch", type=int, default=256, help="jobs per encoded batch (default 256)")
+    parser.add_argument("--pixels", default="", help="attach HxW[xC] uint8 pixels to every job")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement, best is kept")
+    parser.add_argument("--out", help="write JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run(args.count, args.batch, args.pixels, args.repeat)
+    for result in report["results"]:
+        print(f"⏱️  {result['format']:<14} encode {result['encode_us_per_job']:7.2f} us/job  "
+              f"decode {result['decode_us_per_job']:7.2f} us/job  {result['bytes_per_job']:9.1f} B/job")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📄 Serialization report written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
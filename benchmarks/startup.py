@@ -0,0 +1,125 @@
+"""
+Pipeline startup: importing dsl, compiling a spec vs loading its cached
+plan, and building the nodes.
+
+    python -m benchmarks.startup --nodes 200
+    python -m benchmarks.startup --nodes 50 --out startup.json
+
+Imports are timed in fresh interpreters (interpreter startup excluded).
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict
+
+from dsl import spec as specs
+
+_STAGES = [("convert", {"target_format": "PNG"}), ("1-to-1", {"operation": "sharpen"}),
+           ("score_quality", {"level": 1}), ("tone", {"gamma": 1.1}), ("parallel", {"workers": 2})]
+
+
+# What a process imports, by scenario
+IMPORTS = {
+    "import_dsl": "import dsl",
+    "two_node_types": "from dsl import create; create('blur', 'b'); create('1-to-1', 'o', operation='sharpen')",
+    "dsl_api": "from dsl import pipeline, source, sink, blur, connect; pipeline('p')",
+    "all_node_types": "import dsl.nodes as n; [getattr(n, name) for name in n.__all__]",
+}
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_ms(statement: str, repeat: int) -> float:
+    """Best of repeat fresh interpreters, milliseconds to run statement"""
+    code = ("import time; started = time.perf_counter()\n" + statement +
+            "\nprint((time.perf_counter() - started) * 1e3)")
+    return min(float(subprocess.run([sys.executable, "-c", code], cwd=_ROOT, check=True,
+                                    capture_output=True, text=True).stdout.split()[-1])
+               for _ in range(repeat))
+
+
+def chain_spec(nodes: int) -> dict:
+    """Spec of a source, nodes - 2 stages in a chain and a sink"""
+    spec = {"name": f"chain{nodes}", "defaults": {"capacity": 16},
+            "nodes": [{"id": "src", "type": "source", "data": "$jobs", "interval": 0}],
+            "connections": []}
+    previous = "src"
+    for i in range(max(0, nodes - 2)):
+        node_type, kwargs = _STAGES[i % len(_STAGES)]
+        spec["nodes"].append({"id": f"stage{i}", "type": node_type, **kwargs})
+        spec["connections"].append(f"{previous} -> stage{i}")
+        previous = f"stage{i}"
+    spec["nodes"].append({"id": "out", "type": "sink"})
+    spec["connections"].append(f"{previous} -> out")
+    return spec
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> float:
+    """Best of repeat runs, milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1e3
+
+
+def run(nodes: int = 200, repeat: int = 10) -> Dict[str, Any]:
+    directory = tempfile.mkdtemp(prefix="startup_")
+    try:
+        path = os.path.join(directory, "spec.json")
+        with open(path, "w") as f:
+            json.dump(chain_spec(nodes), f)
+        cache_dir = os.path.join(directory, "plans")
+
+        def compile_only():
+            with open(path, "rb") as f:
+                specs.compile_spec(specs.parse_spec(f.read(), path))
+
+        def disk_cached():
+            specs._plans.clear()  # Only the on-disk copy is left, as in a fresh process
+            specs.plan_for(path, cache_dir)
+
+        plan = specs.plan_for(path, cache_dir)
+        results = {
+            "compile_ms": _time(compile_only, repeat),
+            "cached_plan_ms": _time(lambda: specs.plan_for(path, cache_dir), repeat),
+            "disk_cached_plan_ms": _time(disk_cached, repeat),
+        }
+        with contextlib.redirect_stdout(io.StringIO()):  # Nodes announce their config
+            results["build_ms"] = _time(lambda: specs.build(plan, {"jobs": []}), repeat)
+        imports = {name: import_ms(statement, repeat) for name, statement in IMPORTS.items()}
+        return {"nodes": nodes, **results, "imports_ms": imports}
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="benchmarks.startup",
+                                     description="Spec compile vs cached plan startup")
+    parser.add_argument("--nodes", type=int, default=200, help="nodes in the generated chain (default 200)")
+    parser.add_argument("--repeat", type=int, default=10, help="runs per measurement, best is kept")
+    parser.add_argument("--out", help="write JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run(args.nodes, args.repeat)
+    for name, ms in report["imports_ms"].items():
+        print(f"⏱️  import {name:<16} {ms:7.2f} ms")
+    print(f"⏱️  {report['nodes']} nodes: compile {report['compile_ms']:.2f} ms, "
+          f"cached plan {report['cached_plan_ms']:.3f} ms (from disk {report['disk_cached_plan_ms']:.2f} ms), "
+          f"build nodes {report['build_ms']:.2f} ms")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📄 Startup report written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,8 @@ from .panorama_inputs import panorama_parts
 from .split_input import split_input
 from .selection_inputs import selection_variants
 from .termination_signal import termination_signal
+from .synthetic import synthetic_jobs, synthetic_batches
+from .files import load_image, map_image, image_files
 
 __all__ = [
     'raw_images',
@@ -14,5 +16,10 @@ __all__ = [
     'panorama_parts',
     'split_input',
     'selection_variants',
-    'termination_signal'
+    'termination_signal',
+    'synthetic_jobs',
+    'synthetic_batches',
+    'load_image',
+    'map_image',
+    'image_files'
 ]
\ No newline at end of file
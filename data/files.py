@@ -0,0 +1,123 @@
+import mmap
+import os
+import threading
+import weakref
+from typing import Iterator, Optional
+from model.image_job import ImageJob
+
+# File extension -> format name used by ImageJob.current_format and model.codec
+EXTENSIONS = {
+    ".ppm": "PPM", ".pgm": "PGM", ".raw": "RAW",
+    ".png": "PNG", ".jpg": "JPG", ".jpeg": "JPG",
+    ".tif": "TIFF", ".tiff": "TIFF", ".bmp": "BMP", ".webp": "WEBP",
+}
+
+
+def format_of(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in EXTENSIONS:
+        raise ValueError(f"Unknown image format for '{path}'")
+    return EXTENSIONS[extension]
+
+
+def load_image(path: str, image_id: Optional[str] = None, fmt: Optional[str] = None,
+               width: Optional[int] = None, height: Optional[int] = None) -> ImageJob:
+    """ImageJob holding the file's bytes - pixels are decoded on first use.
+
+    width/height are read from the header when the codec can; RAW files
+    have none, so pass them (or set them on the job) before decoding.
+    """
+    from model.codec import CODECS
+
+    fmt = fmt or format_of(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    codec = CODECS.get(fmt)
+    if codec is not None and width is None:
+        size = codec.size(data)
+        if size:
+            width, height = size
+    return ImageJob(
+        image_id=image_id or os.path.splitext(os.path.basename(path))[0],
+        transformations=["loaded"],
+        current_format=fmt,
+        width=width,
+        height=height,
+        encoded=data,
+        encoded_format=fmt,
+    )
+
+
+# (real path, size, mtime) -> live mapping, so stages and jobs share one
+_mappings = weakref.WeakValueDictionary()
+_mappings_lock = threading.Lock()
+
+
+def _map_file(path: str, willneed: bool = False) -> mmap.mmap:
+    """Read-only mapping of path, reused while any job still references it"""
+    status = os.stat(path)
+    key = (os.path.realpath(path), status.st_size, status.st_mtime_ns)
+    with _mappings_lock:
+        mapping = _mappings.get(key)
+        if mapping is None:
+            with open(path, "rb") as f:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            # Pixels are read front to back: read ahead, drop pages behind
+            if hasattr(mapping, "madvise"):
+                mapping.madvise(mmap.MADV_SEQUENTIAL)
+            _mappings[key] = mapping
+    if willneed and hasattr(mapping, "madvise"):
+        mapping.madvise(mmap.MADV_WILLNEED)
+    return mapping
+
+
+def map_image(path: str, image_id: Optional[str] = None, fmt: Optional[str] = None,
+              width: Optional[int] = None, height: Optional[int] = None,
+              offset: Optional[int] = None, dtype: str = "u1", channels: int = 1,
+              willneed: bool = False) -> ImageJob:
+    """Like load_image(), but the file is mmap'ed instead of read.
+
+    Without offset the mapping becomes job.encoded and decodes lazily
+    (PPM/PGM/RAW decode as zero-copy views of it). With offset, the pixel
+    region of a RAW-style file (width x height x channels samples of dtype
+    starting at offset) is exposed directly as a read-only numpy view in
+    job.pixels. Either way nothing is read into heap memory until pixels are
+    touched. willneed asks the kernel to start reading the file now.
+    """
+    from model.codec import CODECS
+
+    fmt = fmt or format_of(path)
+    mapping = _map_file(path, willneed)
+    job = ImageJob(
+        image_id=image_id or os.path.splitext(os.path.basename(path))[0],
+        transformations=["loaded"],
+        current_format=fmt,
+        width=width,
+        height=height,
+    )
+    if offset is None:
+        codec = CODECS.get(fmt)
+        if codec is not None and width is None:
+            size = codec.size(mapping)
+            if size:
+                job.width, job.height = size
+        job.encoded = mapping
+        job.encoded_format = fmt
+        return job
+
+    import numpy as np
+    if not width or not height:
+        raise ValueError("A pixel region needs width and height")
+    pixels = np.frombuffer(mapping, dtype=dtype, count=width * height * channels, offset=offset)
+    job.pixels = pixels.reshape((height, width, channels) if channels > 1 else (height, width))
+    return job
+
+
+def image_files(directory: str, mapped: bool = False, **kwargs) -> Iterator[ImageJob]:
+    """Lazily load (or with mapped=True, map) every recognised image file in
+    directory, sorted by name"""
+    load = map_image if mapped else load_image
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path) and os.path.splitext(name)[1].lower() in EXTENSIONS:
+            yield load(path, **kwargs)
@@ -0,0 +1,121 @@
+import random
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple, Union
+from model.image_job import ImageJob
+
+# A distribution is either a sequence (uniform choice) or {value: weight}
+Distribution = Union[Sequence[Any], Dict[Any, float]]
+
+DEFAULT_SIZES: Dict[Tuple[int, int], float] = {
+    (640, 480): 0.2,
+    (1920, 1080): 0.5,
+    (4000, 3000): 0.3,
+}
+DEFAULT_FORMATS: Dict[str, float] = {"JPG": 0.6, "PNG": 0.3, "RAW": 0.1}
+
+
+def _chooser(rng: random.Random, spec: Distribution):
+    """Return a zero-argument function drawing from spec"""
+    if isinstance(spec, dict):
+        values = list(spec.keys())
+        cumulative = []
+        total = 0.0
+        for weight in spec.values():
+            total += weight
+            cumulative.append(total)
+        return lambda: rng.choices(values, cum_weights=cumulative)[0]
+    values = list(spec)
+    return lambda: rng.choice(values)
+
+
+def synthetic_jobs(count: Optional[int] = 1_000_000,
+                   seed: int = 0,
+                   sizes: Distribution = None,
+                   formats: Distribution = None,
+                   panorama_groups: int = 0,
+                   panorama_fraction: float = 0.0,
+                   correlation_fan_in: int = 0,
+                   split_factors: Optional[Distribution] = None,
+                   quality_range: Tuple[float, float] = (0.5, 1.0),
+                   pixels: bool = False,
+                   prefix: str = "synthetic") -> Iterator[ImageJob]:
+    """Lazily generate ImageJobs for load testing.
+
+    count=None yields forever. The same seed always yields the same jobs.
+
+    panorama_groups/panorama_fraction: that fraction of jobs gets one of
+        panorama_groups distinct panorama_group values.
+    correlation_fan_in: consecutive runs of this many jobs share one
+        correlation_id (variants for SelectionNode).
+    split_factors: distribution of split_into values (None = never set).
+    pixels: attach a random uint8 (height, width, 3) array - needs numpy.
+    """
+    rng = random.Random(seed)
+    pick_size = _chooser(rng, sizes or DEFAULT_SIZES)
+    pick_format = _chooser(rng, formats or DEFAULT_FORMATS)
+    pick_split = _chooser(rng, split_factors) if split_factors else None
+    low, high = quality_range
+
+    if pixels:
+        import numpy as np
+
+    i = 0
+    while count is None or i < count:
+        width, height = pick_size()
+        job = ImageJob(
+            image_id=f"{prefix}_{i:08d}",
+            transformations=["loaded"],
+            current_format=pick_format(),
+            quality_score=rng.uniform(low, high),
+            width=width,
+            height=height,
+        )
+
+        if panorama_groups and rng.random() < panorama_fraction:
+            job.panorama_group = f"{prefix}_pano_{rng.randrange(panorama_groups)}"
+        if correlation_fan_in:
+            job.correlation_id = f"{prefix}_corr_{i // correlation_fan_in}"
+        if pick_split:
+            job.split_into = pick_split()
+        if pixels:
+            # Seeded per job so any slice of the stream is reproducible
+            pixel_rng = np.random.default_rng((seed, i))
+            job.pixels = pixel_rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+
+        yield job
+        i += 1
+
+
+def synthetic_batches(count: Optional[int] = 1_000_000,
+                      batch_size: int = 4096,
+                      seed: int = 0,
+                      formats: Sequence[str] = ("JPG", "PNG", "RAW"),
+                      correlation_fan_in: int = 0,
+                      quality_range: Tuple[float, float] = (0.5, 1.0),
+                      prefix: str = "synthetic") -> Iterator["JobBatch"]:
+    """Lazily generate metadata-only JobBatches (columns built by numpy).
+
+    count is the total number of rows (None = forever); the last batch may
+    be shorter. correlation_fan_in as in synthetic_jobs. Needs numpy.
+    """
+    import numpy as np
+    from model.job_batch import FORMATS, JobBatch
+
+    rng = np.random.default_rng(seed)
+    codes = np.array([FORMATS.code(f) for f in formats], dtype=np.int16)
+    low, high = quality_range
+    start = 0
+    while count is None or start < count:
+        n = batch_size if count is None else min(batch_size, count - start)
+        index = np.arange(start, start + n)
+        correlation = None
+        if correlation_fan_in:
+            correlation = np.char.add(f"{prefix}_corr_", (index // correlation_fan_in).astype(str))
+        yield JobBatch(
+            image_id=np.char.add(f"{prefix}_", index.astype(str)),
+            current_format=codes[rng.integers(0, len(codes), n)],
+            quality_score=rng.uniform(low, high, n),
+            numeric_value=index.astype(np.float64),
+            correlation_id=correlation,
+            transformations=["loaded"],
+        )
+        start += n
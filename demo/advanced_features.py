@@ -27,7 +27,6 @@ def demo_advanced_features():
     pipe.add_node("src", source(test_data, "source"))
     pipe.add_node("config_node", configurable("adaptive_blur"))
     pipe.add_node("parallel_node", parallel("fast_processor", 3))
-    pipe.add_node("quality_check", source([], "quality_check"))  # Simplified
     pipe.add_node("output", sink("sink"))
     
     # Configure initial parameters
@@ -38,18 +37,19 @@ def demo_advanced_features():
     connect(pipe, "config_node", 0, "parallel_node", 0)
     connect(pipe, "parallel_node", 0, "output", 0)
     
-    # Add feedback cycle (simplified)
+    # Add feedback cycle: low-quality results go back through the blur
     pipe.add_cycle(
-        from_node="quality_check",
+        from_node="parallel_node",
         to_node="config_node",
         max_iterations=3,
-        condition=lambda job: job.quality_score < 0.8,
+        condition=lambda job: (job.quality_score or 0) < 0.8,
         description="Enhancement feedback loop"
     )
     
     # Add termination
     pipe.add_node("terminator", source([termination_signal], "terminator"))
     connect(pipe, "terminator", 0, "output", 1)
+    pipe.build()
     
     # Create monitored pipeline
     from dsl.pipeline.completion import CompletionAwarePipeline
@@ -80,6 +80,7 @@ def demo_advanced_features():
         print("⚠️ Pipeline timed out as expected")
         
     # Print monitoring report
+    monitored_pipe.stop()
     monitor.print_report()
     
     print("\n✅ Advanced features demonstration complete")
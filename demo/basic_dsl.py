@@ -26,8 +26,7 @@ def demo_basic_dsl():
     print("\n▶️ Starting pipeline...")
     pipe.start()
     
-    import time
-    time.sleep(2)
+    pipe.wait_for_completion(10.0)
     
     print("\n⏹️ Stopping pipeline...")
     pipe.stop()
@@ -72,14 +72,11 @@ def demo_model_task():
     exec_pipe.nodes = pipe.nodes
     exec_pipe.channels = pipe.channels
 
-    import time
-
     exec_pipe.start()
 
-# Allow pipeline to process data + termination
-    time.sleep(2.0)
+# Returns as soon as end-of-stream (or the termination signal) reaches the sink
+    exec_pipe.wait_for_completion()
 
-# 🔑 FORCE CLEAN SHUTDOWN (control-level termination)
     exec_pipe.stop()
 
     print("✅ ModelTaskPipeline stopped cleanly after termination signal")
@@ -28,8 +28,8 @@ def demo_synchronization():
     print("1. Summator processes: (1 + 10) = 11")
     print("2. Summator processes: (2 + 20) = 22") 
     print("3. Channel A has 3 remaining items (3, 4, 5)")
-    print("4. These WAIT forever for matching inputs from Channel B")
-    print("   ⚠️ This demonstrates 'data accumulation' problem")
+    print("4. These can never be matched once Channel B reaches end-of-stream")
+    print("   ⚠️ This demonstrates 'data accumulation' problem (dropped with a warning)")
     
     # Create pipeline
     pipe = pipeline("SynchronizationDemo", timeout=5.0)
@@ -50,10 +50,11 @@ def demo_synchronization():
     print("\n▶️ Running synchronization demo...")
     pipe.start()
     
-    try:
-        pipe.wait_for_completion(4.0)
-    except:
+    if pipe.wait_for_completion(4.0):
+        print("\n✅ Summator stopped at end-of-stream of Channel B")
+    else:
         print("\n⚠️ Pipeline timed out (expected due to unbalanced inputs)")
-        print("✅ This demonstrates the synchronization issue!")
+    print("✅ This demonstrates the synchronization issue!")
+    pipe.stop()
         
     return pipe
\ No newline at end of file
@@ -1,37 +1,58 @@
 """
 Domain-Specific Language for Photo Processing Pipelines
 All DSL functions are exported here for clean user interface
+
+Names are imported on first use (PEP 562), so `import dsl` costs next to
+nothing and a worker only loads the modules it actually touches.
 """
+import importlib
 
-# DSL Core
-from .core import Channel, NodeDSL, PipelineDSL
+_EXPORTS = {
+    # Core types (for advanced use)
+    'Channel': '.core', 'NodeDSL': '.core', 'PipelineDSL': '.core',
 
-# DSL API functions (these are the actual DSL)
-from .dsl_api import (
     # Pipeline creation
-    pipeline, with_cycles, monitored_pipeline,
-    
+    'pipeline': '.dsl_api', 'with_cycles': '.dsl_api', 'monitored_pipeline': '.dsl_api',
+
     # Node creation
-    node, source, sink,
-    
+    'node': '.dsl_api', 'source': '.dsl_api', 'sink': '.dsl_api',
+
     # Filter factories (5 types)
-    blur, convert, stitch, split, select_best, summator,
-    
+    'blur': '.dsl_api', 'convert': '.dsl_api', 'stitch': '.dsl_api', 'split': '.dsl_api',
+    'select_best': '.dsl_api', 'summator': '.dsl_api',
+
     # Advanced nodes
-    configurable, parallel,
-    
+    'configurable': '.dsl_api', 'parallel': '.dsl_api', 'score_quality': '.dsl_api', 'tone': '.dsl_api',
+
     # Connection
-    connect
-)
+    'connect': '.dsl_api',
+
+    # Node type registry (plugins)
+    'register': '.registry', 'create': '.registry',
+}
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
+
 
 __all__ = [
     # Core types (for advanced use)
     'Channel', 'NodeDSL', 'PipelineDSL',
-    
+
     # DSL API (this is what users use)
     'pipeline', 'with_cycles', 'monitored_pipeline',
     'node', 'source', 'sink',
     'blur', 'convert', 'stitch', 'split', 'select_best', 'summator',
-    'configurable', 'parallel',
-    'connect'
-]
\ No newline at end of file
+    'configurable', 'parallel', 'score_quality', 'tone',
+    'connect', 'register', 'create'
+]
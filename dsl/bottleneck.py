@@ -0,0 +1,211 @@
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from .core import NodeDSL
+
+
+@dataclass
+class StageEstimate:
+    """Load on one node over the sampling window"""
+    name: str
+    visits: float         # invocations per source item
+    service_time: float   # seconds of work per item
+    parallelism: int      # workers (1 for ordinary nodes)
+    queue: float          # average items waiting for the node
+    throughput: float     # items/s observed in the window
+    parallel: bool = False
+
+    @property
+    def demand(self) -> float:
+        """Seconds of this stage's time needed per source item"""
+        return self.visits * self.service_time / self.parallelism
+
+    @property
+    def capacity(self) -> float:
+        """Source items/s this stage can sustain"""
+        return 1.0 / self.demand if self.demand > 0 else float("inf")
+
+    @property
+    def utilization(self) -> float:
+        return min(1.0, self.throughput * self.service_time / self.parallelism)
+
+
+@dataclass
+class BottleneckReport:
+    """Stages ranked by demand, with the throughput they allow"""
+    pipeline: str
+    window: float
+    offered: float                    # source items/s in the window (0 once sources finished)
+    stages: List[StageEstimate]
+    allocation: Dict[str, int] = field(default_factory=dict)
+    achievable_after: Optional[float] = None
+    applied: bool = False
+
+    @property
+    def bottleneck(self) -> Optional[StageEstimate]:
+        return self.stages[0] if self.stages else None
+
+    @property
+    def achievable(self) -> float:
+        return self.bottleneck.capacity if self.bottleneck else float("inf")
+
+    def __str__(self) -> str:
+        lines = [f"Bottlenecks '{self.pipeline}' ({self.window:.1f}s window): "
+                 f"offered {self.offered:.1f}/s, achievable {self.achievable:.1f}/s"]
+        lines.append(f"  {'stage':<24}{'capacity/s':>12}{'util':>7}{'queue':>8}{'service':>10}{'workers':>9}")
+        for stage in self.stages:
+            lines.append(f"  {stage.name:<24}{stage.capacity:>12.1f}{stage.utilization:>7.0%}"
+                         f"{stage.queue:>8.1f}{stage.service_time * 1000:>8.2f}ms{stage.parallelism:>9}")
+        if self.allocation:
+            verb = "applied" if self.applied else "suggested"
+            plan = ", ".join(f"{name}={workers}" for name, workers in self.allocation.items())
+            lines.append(f"  {verb} workers: {plan} -> achievable {self.achievable_after:.1f}/s")
+        return "\n".join(lines)
+
+
+class BottleneckAnalyzer:
+    """Finds the limiting stage of a running pipeline from PipelineMonitor data.
+
+    Over a sampling window each node's service time is the growth of its
+    process_time divided by the items it handled, and its visit ratio is
+    the items offered to it (put on its input channels) per source item. The stage with the largest
+    visits * service_time / workers limits end-to-end throughput to the
+    inverse of that demand. Parallel stages are assumed to scale with
+    their workers, which holds when the work releases the GIL (I/O, numpy).
+    """
+    def __init__(self, monitor):
+        self.monitor = monitor
+
+    def _sample(self, window: float, samples: int):
+        pipeline = self.monitor.pipeline
+        before = self.monitor.snapshot()
+        queues = {node.name: 0.0 for node in pipeline.nodes}
+        for _ in range(samples):
+            time.sleep(window / samples)
+            for node in pipeline.nodes:
+                # Parallel nodes pull eagerly into their work queue
+                waiting = node.backlog() if hasattr(node, "backlog") else sum(ch.pending() for ch in node.inputs)
+                queues[node.name] += waiting / samples
+        after = self.monitor.snapshot()
+        return before, after, queues
+
+    def analyze(self, window: float = 1.0, samples: int = 10) -> BottleneckReport:
+        """Sample the pipeline for window seconds and rank its stages"""
+        pipeline = self.monitor.pipeline
+        before, after, queues = self._sample(window, samples)
+        elapsed = after["timestamp"] - before["timestamp"]
+        old = {stats["name"]: stats for stats in before["nodes"]}
+        new = {stats["name"]: stats for stats in after["nodes"]}
+
+        def delta(name: str, key: str) -> float:
+            return new[name].get(key, 0) - old[name].get(key, 0)
+
+        put_before = {ch["name"]: ch["total_put"] for ch in before["channels"]}
+        put_after = {ch["name"]: ch["total_put"] for ch in after["channels"]}
+
+        def arrivals(node: NodeDSL) -> float:
+            """Invocations offered to node: items put on each port / items it needs per call"""
+            requirements = getattr(node, "input_requirements", {})
+            return min((put_after.get(ch.name, 0) - put_before.get(ch.name, 0))
+                       / max(1, requirements.get(f"in_{port}", 1))
+                       for port, ch in enumerate(node.inputs))
+
+        sources = [node for node in pipeline.nodes if not node.inputs]
+        offered = sum(delta(node.name, "processed") for node in sources)
+        # Once the sources have finished, visit ratios come from totals: what
+        # each node has completed plus what is queued for it, per source item
+        produced = sum(new[node.name]["processed"] for node in sources)
+
+        def visits(node: NodeDSL) -> float:
+            # Arrivals, not completions: a saturated stage completes fewer
+            # items than it is offered
+            if offered:
+                return arrivals(node) / offered
+            if not produced:
+                return 0.0
+            stats = new[node.name]
+            done = stats.get("completed", stats["processed"])
+            queued = sum(ch.pending() for ch in node.inputs) + node.in_flight()
+            return (done + queued) / produced
+
+        stages = []
+        for node in pipeline.nodes:
+            if not node.inputs:
+                continue
+            stats = new[node.name]
+            # Parallel nodes count items on dispatch; service time needs completions
+            items = delta(node.name, "completed" if "completed" in stats else "processed")
+            busy = delta(node.name, "process_time")
+            stages.append(StageEstimate(
+                name=node.name,
+                visits=visits(node),
+                service_time=busy / items if items else stats.get("avg_latency", 0.0),
+                parallelism=max(1, stats.get("workers", 1)),
+                queue=queues[node.name],
+                throughput=items / elapsed if elapsed > 0 else 0.0,
+                parallel="workers" in stats,
+            ))
+
+        stages.sort(key=lambda stage: (stage.demand, stage.queue), reverse=True)
+        return BottleneckReport(pipeline.name, elapsed, offered / elapsed if elapsed > 0 else 0.0, stages)
+
+    @staticmethod
+    def allocate(stages: List[StageEstimate], cores: int) -> Dict[str, int]:
+        """Split cores across the parallel stages to minimise the largest demand.
+
+        Greedy: every parallel stage gets one worker, then each further core
+        goes to the parallel stage with the highest demand - until that stage
+        no longer limits throughput, as more workers would then be wasted.
+        """
+        parallel = [stage for stage in stages if stage.parallel]
+        if cores < len(parallel):
+            raise ValueError(f"need at least {len(parallel)} cores, one per parallel stage")
+        floor = max((stage.demand for stage in stages if not stage.parallel), default=0.0)
+        workers = {stage.name: 1 for stage in parallel}
+
+        def demand(stage: StageEstimate) -> float:
+            return stage.visits * stage.service_time / workers[stage.name]
+
+        for _ in range(cores - len(parallel)):
+            worst = max(parallel, key=demand)
+            if demand(worst) <= floor:
+                break
+            workers[worst.name] += 1
+        return workers
+
+    def rebalance(self, cores: Optional[int] = None, window: float = 1.0,
+                  apply: bool = False) -> BottleneckReport:
+        """Analyze, then redistribute a budget of cores across parallel() stages.
+
+        cores defaults to os.cpu_count(). With apply=True running stages are
+        resized (and autoscaling stages capped at their new share).
+        """
+        report = self.analyze(window)
+        allocation = self.allocate(report.stages, cores or os.cpu_count() or 1)
+
+        demands = []
+        for stage in report.stages:
+            workers = allocation.get(stage.name, stage.parallelism)
+            demands.append(stage.visits * stage.service_time / workers)
+        worst = max(demands, default=0.0)
+        report.allocation = allocation
+        report.achievable_after = 1.0 / worst if worst > 0 else float("inf")
+
+        if apply:
+            nodes = {node.name: node for node in self.monitor.pipeline.nodes}
+            for name, workers in allocation.items():
+                self._apply(nodes[name], workers)
+            report.applied = True
+        return report
+
+    @staticmethod
+    def _apply(node: NodeDSL, workers: int):
+        if node.autoscale is not None:
+            node.autoscale["max_workers"] = workers
+            node.autoscale["min_workers"] = min(node.autoscale["min_workers"], workers)
+        if node.running:
+            node._resize(workers, "rebalance")
+        else:
+            node.worker_count = workers
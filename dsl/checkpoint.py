@@ -0,0 +1,308 @@
+"""
+Checkpoint/resume for running pipelines.
+
+A Checkpointer periodically asks every source for a CheckpointBarrier. The
+barrier travels behind the items the source already sent; each node passes
+it on once it has arrived on all of its inputs (aligned barriers), handing
+its state (snapshot_state()) to the checkpoint at that moment. Nodes never
+stop for a checkpoint: the only wait is a multi-input node holding back a
+port whose barrier came early. Everything a node read before the barrier
+is in its state (input_buffers, sequence counters, reorder buffer), and
+everything behind it is replayed by the sources on resume, so channel
+contents at the cut are captured by the nodes that drained them.
+
+On disk a checkpoint directory holds one append-only pack of pickled node
+states and a small JSON manifest per checkpoint. A node whose state did not
+change since the previous checkpoint is not written again; the pack is
+rewritten with only live states once it is mostly garbage.
+
+    checkpointer = Checkpointer(pipeline, "ckpt", interval=10.0)
+    resume(pipeline, "ckpt")   # no-op without a checkpoint
+    pipeline.start()
+    checkpointer.start()
+"""
+import copyreg
+import hashlib
+import io
+import json
+import mmap
+import os
+import pickle
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from .core import CheckpointBarrier, NodeDSL, PipelineDSL
+from model.image_job import ImageJob
+
+MANIFEST = "checkpoint-{:06d}.json"
+
+
+class _StatePickler(pickle.Pickler):
+    """Pickles jobs without their pyramid cache, and mmap'ed bytes as bytes"""
+    def reducer_override(self, obj):
+        if isinstance(obj, ImageJob):
+            state = dict(obj.__dict__)
+            state["levels"] = None
+            if isinstance(state.get("encoded"), mmap.mmap):
+                state["encoded"] = state["encoded"][:]
+            return copyreg.__newobj__, (ImageJob,), state
+        if isinstance(obj, mmap.mmap):
+            return bytes, (obj[:],)
+        return NotImplemented
+
+
+def dumps(state: Any) -> bytes:
+    buffer = io.BytesIO()
+    _StatePickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(state)
+    return buffer.getvalue()
+
+
+class Checkpointer:
+    """Takes a checkpoint of pipeline every interval seconds into directory.
+
+    Nodes that have finished (a short source, the sink it feeds) take part
+    with their final state: their outputs are closed, and closed ports count
+    as aligned downstream. A
+    checkpoint that does not complete within timeout (a source stuck, or
+    stopped before its stream ended) is abandoned. Only the newest `keep`
+    checkpoints are kept.
+    """
+    def __init__(self, pipeline: PipelineDSL, directory: str, interval: float = 10.0,
+                 timeout: float = 30.0, keep: int = 2, compact_ratio: float = 4.0):
+        names = [node.name for node in pipeline.nodes]
+        if len(set(names)) != len(names):
+            raise ValueError("Checkpointing needs unique node names")
+        unsupported = [node.name for node in pipeline.nodes if not node.checkpointable]
+        if unsupported:
+            raise ValueError(f"Nodes cannot be checkpointed: {', '.join(unsupported)}")
+        self.pipeline = pipeline
+        self.directory = directory
+        self.interval = interval
+        self.timeout = timeout
+        self.keep = max(1, keep)
+        self.compact_ratio = compact_ratio
+        os.makedirs(directory, exist_ok=True)
+
+        latest = load_manifest(directory)
+        self.checkpoint_id = latest["checkpoint"] if latest else 0
+        self.entries: Dict[str, list] = latest["nodes"] if latest else {}  # name -> [offset, length, digest]
+        self.pack = latest["pack"] if latest else f"state-{self.checkpoint_id + 1:06d}.pack"
+
+        self.lock = threading.Lock()
+        self.states: Dict[str, dict] = {}
+        self.barrier: Optional[CheckpointBarrier] = None
+        self.complete = threading.Event()
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+
+        self.completed = 0
+        self.abandoned = 0
+        self.bytes_written = 0
+        self.last_duration = 0.0
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, name="Checkpointer", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=self.timeout + 1.0)
+
+    def _loop(self):
+        next_at = time.time() + self.interval
+        while self.running:
+            time.sleep(min(0.1, max(0.0, next_at - time.time())))
+            if time.time() >= next_at:
+                self.checkpoint()
+                next_at = time.time() + self.interval
+
+    def _sources(self) -> List[NodeDSL]:
+        return [node for node in self.pipeline.nodes if not node.inputs]
+
+    def checkpoint(self) -> Optional[int]:
+        """Take one checkpoint now; returns its id, or None if abandoned (or
+        every source has finished - there is nothing left to cut)"""
+        sources = self._sources()
+        stopped = [node.name for node in sources if node.exited.is_set() and not node.finished.is_set()]
+        if stopped:
+            self.abandoned += 1
+            print(f"⚠️ Checkpoint abandoned - sources stopped before their stream ended: {', '.join(stopped)}")
+            return None
+        active = [node for node in sources if not node.finished.is_set()]
+        if not active:
+            return None
+        started = time.perf_counter()
+        with self.lock:
+            self.checkpoint_id += 1
+            barrier = CheckpointBarrier(self.checkpoint_id, self._collect)
+            self.barrier = barrier
+            self.states = {}
+            self.complete.clear()
+        for node in active:
+            node.request_barrier(barrier)
+
+        deadline = time.time() + self.timeout
+        while True:
+            self._collect_finished(barrier)
+            if self.complete.wait(0.05):
+                break
+            if time.time() >= deadline:
+                with self.lock:
+                    self.barrier = None
+                    missing = sorted(set(node.name for node in self.pipeline.nodes) - set(self.states))
+                self.abandoned += 1
+                print(f"⚠️ Checkpoint {barrier.checkpoint_id} abandoned - no barrier from: {', '.join(missing)}")
+                return None
+
+        with self.lock:
+            states, self.barrier = self.states, None
+        # Nodes have moved on already - serialising happens off their threads
+        self._write(barrier.checkpoint_id, states)
+        self.completed += 1
+        self.last_duration = time.perf_counter() - started
+        return barrier.checkpoint_id
+
+    def _collect_finished(self, barrier: CheckpointBarrier):
+        """Final states of nodes that ended without the barrier reaching them:
+        all their inputs closed before it, so nothing of theirs lies behind the cut"""
+        for node in self.pipeline.nodes:
+            if node.finished.is_set():
+                with self.lock:
+                    collected = node.name in self.states
+                if not collected:
+                    self._collect(barrier, node, node.snapshot_state())
+
+    def _collect(self, barrier: CheckpointBarrier, node: NodeDSL, state: dict):
+        """Called by each node (on its own thread) as the barrier passes"""
+        with self.lock:
+            if barrier is not self.barrier:
+                return  # Late barrier of an abandoned checkpoint
+            self.states[node.name] = state
+            if len(self.states) == len(self.pipeline.nodes):
+                self.complete.set()
+
+    def _write(self, checkpoint_id: int, states: Dict[str, dict]):
+        pack_path = os.path.join(self.directory, self.pack)
+        entries = {}
+        with open(pack_path, "ab") as pack:
+            offset = pack.tell()
+            for name, state in states.items():
+                data = dumps(state)
+                digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+                previous = self.entries.get(name)
+                if previous is not None and previous[2] == digest:
+                    entries[name] = previous  # Unchanged - keep pointing at the old copy
+                    continue
+                pack.write(data)
+                entries[name] = [offset, len(data), digest]
+                offset += len(data)
+                self.bytes_written += len(data)
+            pack.flush()
+            os.fsync(pack.fileno())
+        self.entries = entries
+
+        live = sum(length for _, length, _ in entries.values())
+        if offset > self.compact_ratio * max(live, 1 << 20):
+            self._compact(checkpoint_id)
+
+        self._write_manifest(checkpoint_id)
+        self._prune()
+
+    def _compact(self, checkpoint_id: int):
+        """Copy the live states into a fresh pack"""
+        old_path = os.path.join(self.directory, self.pack)
+        self.pack = f"state-{checkpoint_id:06d}.pack"
+        entries = {}
+        with open(old_path, "rb") as old, open(os.path.join(self.directory, self.pack), "wb") as new:
+            for name, (offset, length, digest) in self.entries.items():
+                old.seek(offset)
+                entries[name] = [new.tell(), length, digest]
+                new.write(old.read(length))
+            new.flush()
+            os.fsync(new.fileno())
+        self.entries = entries
+
+    def _write_manifest(self, checkpoint_id: int):
+        manifest = {
+            "checkpoint": checkpoint_id,
+            "pipeline": self.pipeline.name,
+            "created": time.time(),
+            "pack": self.pack,
+            "nodes": self.entries,
+        }
+        path = os.path.join(self.directory, MANIFEST.format(checkpoint_id))
+        with open(path + ".tmp", "w") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+    def _prune(self):
+        """Drop old manifests and packs no kept manifest refers to"""
+        manifests = _manifests(self.directory)
+        for name in manifests[:-self.keep]:
+            os.remove(os.path.join(self.directory, name))
+        packs = set()
+        for name in manifests[-self.keep:]:
+            with open(os.path.join(self.directory, name)) as f:
+                packs.add(json.load(f)["pack"])
+        for name in os.listdir(self.directory):
+            if name.endswith(".pack") and name not in packs:
+                os.remove(os.path.join(self.directory, name))
+
+    def stats(self) -> dict:
+        return {
+            "checkpoint": self.checkpoint_id,
+            "completed": self.completed,
+            "abandoned": self.abandoned,
+            "bytes_written": self.bytes_written,
+            "last_duration": self.last_duration,
+        }
+
+
+def _manifests(directory: str) -> List[str]:
+    return sorted(name for name in os.listdir(directory)
+                  if name.startswith("checkpoint-") and name.endswith(".json"))
+
+
+def load_manifest(directory: str, checkpoint_id: Optional[int] = None) -> Optional[dict]:
+    """Manifest of checkpoint_id (default: the newest), or None"""
+    if not os.path.isdir(directory):
+        return None
+    if checkpoint_id is None:
+        manifests = _manifests(directory)
+        if not manifests:
+            return None
+        name = manifests[-1]
+    else:
+        name = MANIFEST.format(checkpoint_id)
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def resume(pipeline: PipelineDSL, directory: str, checkpoint_id: Optional[int] = None) -> Optional[int]:
+    """Load a checkpoint into pipeline's nodes before pipeline.start().
+
+    The pipeline must be built the same way (same node names); sources must
+    replay the same data, from which they skip what was sent before the
+    checkpoint. Returns the checkpoint id, or None when there is none.
+    """
+    manifest = load_manifest(directory, checkpoint_id)
+    if manifest is None:
+        return None
+    nodes = {node.name: node for node in pipeline.nodes}
+    unknown = sorted(set(manifest["nodes"]) - set(nodes))
+    if unknown:
+        raise ValueError(f"Checkpoint has nodes this pipeline does not: {', '.join(unknown)}")
+    with open(os.path.join(directory, manifest["pack"]), "rb") as pack:
+        for name, (offset, length, _) in manifest["nodes"].items():
+            pack.seek(offset)
+            nodes[name].restore_state(pickle.loads(pack.read(length)))
+    print(f"↩️ Resumed '{pipeline.name}' from checkpoint {manifest['checkpoint']}")
+    return manifest["checkpoint"]
@@ -1,10 +1,33 @@
-from typing import Generic, TypeVar, Any, Optional, List
-from queue import Queue, Empty
+from dataclasses import dataclass, field
+from typing import Generic, TypeVar, Any, Optional, List, Dict
+from queue import Queue, Empty, Full
 import threading
+import time
 from model.image_job import ImageJob
+from . import tracing
 
 T = TypeVar('T')
 
+class EndOfStream:
+    """Marker put into a channel by Channel.close() - never an ImageJob"""
+    def __repr__(self) -> str:
+        return "END_OF_STREAM"
+
+    def __reduce__(self):
+        return "END_OF_STREAM"  # Unpickles as the module's singleton, so `is` checks hold
+
+END_OF_STREAM = EndOfStream()
+
+class CheckpointBarrier:
+    """Marker a dsl.checkpoint.Checkpointer sends from the sources through the
+    graph; everything a node took in before it belongs to the checkpoint"""
+    def __init__(self, checkpoint_id: int, collect):
+        self.checkpoint_id = checkpoint_id
+        self.collect = collect  # collect(barrier, node, state)
+
+    def __repr__(self) -> str:
+        return f"CheckpointBarrier({self.checkpoint_id})"
+
 class Channel(Generic[T]):
     """Statically typed channel for data transmission"""
     def __init__(self, name: str, data_type: type = ImageJob, maxsize: int = 0):
@@ -13,23 +36,59 @@ class Channel(Generic[T]):
         self.queue = Queue(maxsize=maxsize)
         self.total_put = 0
         self.total_get = 0
+        self.closed = False
 
     def put(self, item: T, block: bool = True, timeout: Optional[float] = None):
         """Put item into channel with type checking"""
-        if not isinstance(item, self.data_type):
+        if item is END_OF_STREAM:
+            self.queue.put(item, block, timeout)
+            self.closed = True
+            return
+        if type(item) is CheckpointBarrier:
+            self.queue.put(item, block, timeout)
+            return
+        # Batches (model.job_batch.JobBatch) declare the record type they carry
+        if not isinstance(item, self.data_type) and getattr(type(item), 'record_type', None) is not self.data_type:
             raise TypeError(f"Channel '{self.name}' expects {self.data_type}, got {type(item)}")
+        if tracing.ACTIVE is not None and getattr(item, 'trace_id', None) is not None:
+            tracing.ACTIVE.on_put(self, item)
         self.queue.put(item, block, timeout)
         self.total_put += 1
 
     def get(self, block: bool = True, timeout: Optional[float] = None) -> T:
         """Get item from channel"""
         item = self.queue.get(block, timeout)
+        if item is END_OF_STREAM or type(item) is CheckpointBarrier:
+            return item
         self.total_get += 1
+        if tracing.ACTIVE is not None and getattr(item, 'trace_id', None) is not None:
+            tracing.ACTIVE.on_get(self, item)
         return item
 
+    def close(self):
+        """Signal end-of-stream: readers get END_OF_STREAM after the last item"""
+        if not self.closed:
+            self.put(END_OF_STREAM)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until end-of-stream has been handed to the reader (immediate in-process)"""
+        return True
+
+    def disconnect(self):
+        """Release the channel's transport (nothing to do in-process)"""
+
+    def pending(self) -> int:
+        """Items waiting in the channel, not counting end-of-stream or checkpoint markers"""
+        with self.queue.mutex:
+            return sum(1 for item in self.queue.queue
+                       if item is not END_OF_STREAM and type(item) is not CheckpointBarrier)
+
     def empty(self) -> bool:
         return self.queue.empty()
 
+    def full(self) -> bool:
+        return self.queue.full()
+
     def size(self) -> int:
         return self.queue.qsize()
 
@@ -38,6 +97,10 @@ class Channel(Generic[T]):
 
 class NodeDSL:
     """Base DSL node definition"""
+    checkpointable = True  # False: state cannot be captured by snapshot_state()
+    one_to_one = True  # False: emits other than one item per input set (cannot sit inside a cycle)
+    accepts_batches = False  # True: process() takes model.job_batch.JobBatch inputs as they are
+    
     def __init__(self, name: str):
         self.name = name
         self.inputs: List[Channel] = []
@@ -45,6 +108,18 @@ class NodeDSL:
         self.thread: Optional[threading.Thread] = None
         self.running = False
         self.processed_count = 0
+        self.process_time = 0.0
+        self.started_at: Optional[float] = None
+        self.finished = threading.Event()  # Set when the node has seen end-of-stream
+        self.exited = threading.Event()  # Set when the node's loop has returned, finished or stopped
+        self.draining = False
+        self.dropped_count = 0
+        # thread id -> ("get" | "put", channel, since) while a thread waits on a channel
+        self.blocked: Dict[int, tuple] = {}
+        # Callables taking an emitted item; True means a cycle took it back upstream
+        self.feedback_routes: List[Any] = []
+        # CheckpointBarrier to pass on at the next safe point (see dsl.checkpoint)
+        self.barrier: Optional[CheckpointBarrier] = None
 
     def add_input(self, channel: Channel) -> 'NodeDSL':
         self.inputs.append(channel)
@@ -57,14 +132,88 @@ class NodeDSL:
     def start(self):
         """Start node execution in a separate thread"""
         self.running = True
-        self.thread = threading.Thread(target=self._run, name=f"Node-{self.name}")
+        self.started_at = time.time()
+        self.finished.clear()
+        self.exited.clear()
+        self.draining = False
+        self.thread = threading.Thread(target=self._run, name=f"Node-{self.name}", daemon=True)
         self.thread.start()
 
     def stop(self):
         """Stop node execution"""
+        self.request_stop()
+        self.join(timeout=1.0)
+
+    def request_stop(self):
+        """Signal the node to stop without waiting for it"""
         self.running = False
+
+    def drain(self):
+        """Stop taking new work - sources end their stream, other nodes follow end-of-stream"""
+        self.draining = True
+
+    def join(self, timeout: Optional[float] = None):
+        """Wait for the node's threads to exit"""
         if self.thread:
-            self.thread.join(timeout=1.0)
+            self.thread.join(timeout)
+
+    def is_alive(self) -> bool:
+        return bool(self.thread and self.thread.is_alive())
+
+    def in_flight(self) -> int:
+        """Items held inside the node (buffers, worker queues)"""
+        return 0
+
+    def request_barrier(self, barrier: CheckpointBarrier):
+        """Ask a source to start a checkpoint between two items"""
+        self.barrier = barrier
+
+    def snapshot_state(self) -> dict:
+        """What restore_state() needs to continue from here - called on the
+        node's own thread at a barrier, so it must copy mutable containers"""
+        return {"processed": self.processed_count}
+
+    def restore_state(self, state: dict):
+        """Load a snapshot_state() result before the node is started"""
+        self.processed_count = state.get("processed", 0)
+
+    def _pass_barrier(self):
+        """Hand this node's state to the checkpoint and forward the barrier"""
+        barrier, self.barrier = self.barrier, None
+        barrier.collect(barrier, self, self.snapshot_state())
+        for output in self.outputs:
+            self._send(output, barrier)
+
+    def _block(self, kind: str, channel: 'Channel'):
+        """Record that the calling thread waits on channel (for deadlock detection)"""
+        ident = threading.get_ident()
+        current = self.blocked.get(ident)
+        if current is None or current[0] != kind or current[1] is not channel:
+            self.blocked[ident] = (kind, channel, time.time())
+
+    def _unblock(self):
+        self.blocked.pop(threading.get_ident(), None)
+
+    def _send(self, channel: 'Channel', item: Any) -> bool:
+        """Put item into channel; while it is full, wait as long as the node runs"""
+        try:
+            channel.put(item, block=False)
+            return True
+        except Full:
+            pass
+        self._block("put", channel)
+        try:
+            while self.running:
+                try:
+                    channel.put(item, timeout=0.1)
+                    return True
+                except Full:
+                    continue
+            if item is not END_OF_STREAM and type(item) is not CheckpointBarrier:
+                self.dropped_count += 1
+            return False
+        finally:
+            self._unblock()
 
     def _run(self):
         """Main execution loop - to be overridden by subclasses"""
@@ -74,9 +223,47 @@ class NodeDSL:
         """Processing logic - to be overridden by subclasses"""
         raise NotImplementedError("Subclasses must implement process()")
 
+    def stats(self) -> dict:
+        """Counters for monitoring - subclasses may add their own keys"""
+        return {
+            "processed": self.processed_count,
+            "process_time": self.process_time,
+            "running": self.running,
+        }
+
     def __str__(self) -> str:
         return f"NodeDSL('{self.name}', inputs={len(self.inputs)}, outputs={len(self.outputs)})"
 
+@dataclass
+class ShutdownReport:
+    """What PipelineDSL.shutdown() managed to drain and what it had to drop"""
+    pipeline: str
+    drained: bool
+    elapsed: float
+    dropped_in_nodes: Dict[str, int] = field(default_factory=dict)
+    dropped_in_channels: Dict[str, int] = field(default_factory=dict)
+    discarded: Dict[str, int] = field(default_factory=dict)  # dropped_count per node
+    alive_threads: List[str] = field(default_factory=list)
+
+    @property
+    def dropped(self) -> int:
+        return sum(self.dropped_in_nodes.values()) + sum(self.dropped_in_channels.values())
+
+    @property
+    def clean(self) -> bool:
+        return self.drained and not self.dropped and not self.alive_threads
+
+    def __str__(self) -> str:
+        status = "clean" if self.clean else ("drained" if self.drained else "not drained")
+        lines = [f"Shutdown '{self.pipeline}': {status} in {self.elapsed:.2f}s, {self.dropped} item(s) dropped"]
+        for name, count in {**self.dropped_in_nodes, **self.dropped_in_channels}.items():
+            lines.append(f"  {name}: {count} dropped")
+        for name, count in self.discarded.items():
+            lines.append(f"  {name}: {count} discarded (unmatched at end-of-stream or unsendable at stop)")
+        if self.alive_threads:
+            lines.append(f"  still running: {', '.join(self.alive_threads)}")
+        return "\n".join(lines)
+
 class PipelineDSL:
     """Base pipeline DSL"""
     def __init__(self, name: str):
@@ -97,10 +284,89 @@ class PipelineDSL:
         for node in self.nodes:
             node.start()
 
-    def stop(self):
-        """Stop all nodes in the pipeline"""
+    def stop(self, timeout: float = 1.0):
+        """Stop all nodes in the pipeline - signals all first, then joins against one deadline"""
+        for node in self.nodes:
+            node.request_stop()
+        deadline = time.time() + timeout
         for node in self.nodes:
-            node.stop()
+            node.join(max(0.0, deadline - time.time()))
+        for channel in self.channels:
+            channel.disconnect()
+
+    def shutdown(self, deadline: float = 5.0, drain: bool = True) -> 'ShutdownReport':
+        """Graceful shutdown bounded by a global deadline (seconds).
+
+        Sources stop producing and end their streams, so in-flight items
+        drain through the graph in topological order behind end-of-stream.
+        Whatever has not reached the sinks by the deadline is stopped and
+        reported as dropped.
+        """
+        started = time.time()
+        drained = False
+        if drain:
+            for node in self.nodes:
+                node.drain()
+            # Keep part of the budget for stopping threads that did not drain
+            drained = self.wait_for_completion(deadline - min(0.5, deadline * 0.2))
+
+        self.stop(max(0.0, started + deadline - time.time()))
+
+        # Counted after stopping so nothing moves while we look
+        in_flight = {
+            node.name: node.in_flight() for node in self.topological_order()
+        }
+        queued = {channel.name: channel.pending() for channel in self.channels}
+
+        return ShutdownReport(
+            pipeline=self.name,
+            drained=drained,
+            elapsed=time.time() - started,
+            dropped_in_nodes={name: n for name, n in in_flight.items() if n},
+            dropped_in_channels={name: n for name, n in queued.items() if n},
+            discarded={node.name: node.dropped_count for node in self.nodes if node.dropped_count},
+            alive_threads=[node.name for node in self.nodes if node.is_alive()],
+        )
+
+    def topological_order(self) -> List[NodeDSL]:
+        """Nodes ordered producers-first (nodes on cycles are appended last)"""
+        producers = {}
+        for node in self.nodes:
+            for channel in node.outputs:
+                producers.setdefault(id(channel), []).append(node)
+        remaining = {id(node): {id(p) for ch in node.inputs for p in producers.get(id(ch), [])}
+                     for node in self.nodes}
+        order = []
+        while True:
+            ready = [node for node in self.nodes
+                     if id(node) in remaining and not remaining[id(node)]]
+            if not ready:
+                break
+            for node in ready:
+                del remaining[id(node)]
+                order.append(node)
+            for deps in remaining.values():
+                deps.difference_update(id(node) for node in ready)
+        return order + [node for node in self.nodes if id(node) in remaining]
+
+    def sink_nodes(self) -> List[NodeDSL]:
+        """Nodes without outputs - the pipeline is done when they are"""
+        return [node for node in self.nodes if not node.outputs]
+
+    def wait_for_completion(self, timeout: Optional[float] = None) -> bool:
+        """Block until end-of-stream has reached every sink; False on timeout
+        or when a sink was stopped before the stream ended"""
+        deadline = None if timeout is None else time.time() + timeout
+        for node in self.sink_nodes():
+            remaining = None if deadline is None else max(0.0, deadline - time.time())
+            if not node.exited.wait(remaining) or not node.finished.is_set():
+                return False
+        # Channels to other processes finish once the far end has everything
+        for channel in self.channels:
+            remaining = None if deadline is None else max(0.0, deadline - time.time())
+            if not channel.flush(remaining):
+                return False
+        return True
 
     def __str__(self) -> str:
         return f"PipelineDSL('{self.name}', nodes={len(self.nodes)}, channels={len(self.channels)})"
\ No newline at end of file
@@ -2,80 +2,121 @@
 Domain-Specific Language API
 Provides a clean, declarative interface for building pipelines
 """
+import itertools
 import time
-
-# Import everything at module level for clean DSL
-from .pipeline.builder import PipelineBuilder
-from .pipeline.with_cycles import PipelineWithCycles
-from .pipeline.completion import CompletionAwarePipeline
-
-from .nodes.base import SynchronizedNode
-from .nodes.filters import (
-    OneToOneNode, TypeTransformNode, NToOneNode,
-    OneToNNode, SelectionNode, SummatorNode
-)
-from .nodes.configurable import ConfigurableBlurNode
-from .nodes.parallel import OrderedProcessingNode
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional
+
+from . import tracing
+from .registry import REGISTRY
+
+# Node and pipeline modules are imported by the functions using them, so a
+# process only pays for the node types it builds
+if TYPE_CHECKING:
+    from .pipeline.builder import PipelineBuilder
+    from .pipeline.with_cycles import PipelineWithCycles
+    from .pipeline.completion import CompletionAwarePipeline
+    from .nodes.filters import TypeTransformNode, NToOneNode, OneToNNode, SelectionNode, SummatorNode
+    from .nodes.configurable import ConfigurableBlurNode
+    from .nodes.parallel import OrderedProcessingNode
+    from .nodes.quality import QualityScoreNode
+    from .nodes.tone import ToneNode
 
 # ============ DSL ENTRY POINTS ============
 
-def pipeline(name: str, timeout: float = 30.0) -> PipelineBuilder:
+def pipeline(name: str, timeout: float = 30.0) -> 'PipelineBuilder':
     """Start a new pipeline definition - DSL entry point"""
+    from .pipeline.builder import PipelineBuilder
     return PipelineBuilder(name)
 
-def with_cycles(name: str) -> PipelineWithCycles:
+def with_cycles(name: str) -> 'PipelineWithCycles':
     """Create a pipeline that supports cycles - DSL"""
+    from .pipeline.with_cycles import PipelineWithCycles
     return PipelineWithCycles(name)
 
-def monitored_pipeline(name: str, timeout: float = 30.0) -> CompletionAwarePipeline:
+def monitored_pipeline(name: str, timeout: float = 30.0) -> 'CompletionAwarePipeline':
     """Create a pipeline with completion detection - DSL"""
+    from .pipeline.completion import CompletionAwarePipeline
     return CompletionAwarePipeline(name, timeout)
 
-def node(name: str):
-    """Create a node builder - DSL for node creation"""
-    class NodeBuilder:
-        def __init__(self, node_name: str):
-            self.name = node_name
-
-        def of_type(self, node_type: str, **kwargs):
-            """Specify node type - part of DSL syntax"""
-            if node_type == "1-to-1":
-                return OneToOneNode(self.name, kwargs.get('operation', 'transform'))
-            elif node_type == "type":
-                return TypeTransformNode(self.name, kwargs.get('target_format', 'JPG'))
-            elif node_type == "n-to-1":
-                return NToOneNode(self.name, kwargs.get('group_size', 3))
-            elif node_type == "1-to-n":
-                return OneToNNode(self.name)
-            elif node_type == "selection":
-                return SelectionNode(self.name, kwargs.get('num_inputs', 2))
-            elif node_type == "summator":
-                return SummatorNode(self.name)
-            else:
-                raise ValueError(f"Unknown node type: {node_type}")
+class NodeBuilder:
+    """node(name).of_type(kind, **kwargs) - kinds are dsl.registry node types"""
+    def __init__(self, node_name: str):
+        self.name = node_name
+
+    def of_type(self, node_type: str, **kwargs):
+        """Specify node type - part of DSL syntax"""
+        return REGISTRY.create(node_type, self.name, **kwargs)
 
+def node(name: str) -> NodeBuilder:
+    """Create a node builder - DSL for node creation"""
     return NodeBuilder(name)
 
-def source(data: list, name: str = "source") -> 'SourceNode': # type: ignore
-    """Create a source node - DSL"""
+def source(data: Iterable, name: str = "source", interval: float = 0.01,
+           skip=None) -> 'SourceNode': # type: ignore
+    """Create a source node - DSL
+
+    data may be any iterable (lists, generators such as data.synthetic_jobs);
+    it is consumed lazily. interval is the pause between items (0 = none).
+    Jobs whose image_id is in skip (e.g. a dsl.journal.JobJournal) are not sent.
+    """
+    from .nodes.base import SynchronizedNode
+
     class SourceNode(SynchronizedNode):
-        def __init__(self, node_name: str, data_list: list):
+        def __init__(self, node_name: str, data_list: Iterable):
             super().__init__(node_name, {"in_0": 0})
             self.data = data_list
             self.index = 0
+            self.interval = interval
+            self.skip = skip
+            self.skipped = 0
+            self.pending: Optional[Iterator] = None
 
         def _run(self):
-            while self.running and self.index < len(self.data):
-                item = self.data[self.index]
+            if self.pending is None:
+                # Skip what was already emitted (restart after stop)
+                self.pending = itertools.islice(iter(self.data), self.index, None)
+            while self.running:
+                if self.barrier is not None:
+                    self._pass_barrier()
+                item = None if self.draining else next(self.pending, None)
+                if item is None:
+                    self.end_of_stream = True
+                    break
+                if self.skip is not None and item.image_id in self.skip:
+                    self.index += 1
+                    self.skipped += 1
+                    continue
+                if tracing.ACTIVE is not None:
+                    tracing.ACTIVE.sample(item)
                 for output in self.outputs:
-                    output.put(item)
+                    self._send(output, item)
                 self.index += 1
-                time.sleep(0.01)
-            self.running = False
+                self.processed_count += 1
+                if self.interval:
+                    time.sleep(self.interval)
+            self._finish()
+
+        def stats(self) -> dict:
+            stats = super().stats()
+            stats["skipped"] = self.skipped
+            return stats
+
+        def snapshot_state(self) -> dict:
+            state = super().snapshot_state()
+            state["index"] = self.index
+            return state
+
+        def restore_state(self, state: dict):
+            super().restore_state(state)
+            # Resume replays data from here - it must yield the same items again
+            self.index = state["index"]
+            self.pending = None
 
     return SourceNode(name, data)
 
-def sink(name: str = "sink") -> 'SinkNode': # type: ignore
+def sink(name: str = "sink", journal=None) -> 'SinkNode': # type: ignore
+    from .nodes.base import SynchronizedNode
+
     class SinkNode(SynchronizedNode):
         def __init__(self, node_name: str):
             super().__init__(node_name, {"in_0": 1, "in_1": 1})
@@ -96,52 +137,83 @@ def sink(name: str = "sink") -> 'SinkNode': # type: ignore
                 term = inputs["in_1"][0]
                 if term.is_termination:
                     print(f"[{self.name}] Termination signal received. Stopping pipeline.")
+                    self.end_of_stream = True  # The signal ends the stream - this sink completed
                     self.running = False
 
             return None
 
-    return SinkNode(name)
+    return SinkNode(name).set_journal(journal)
 
 
 def connect(pipeline_builder, from_node: str, from_port: int,
-            to_node: str, to_port: int):
-    """Connect nodes - DSL for pipeline wiring"""
-    return pipeline_builder.connect(from_node, from_port, to_node, to_port)
+            to_node: str, to_port: int, capacity: int = 0,
+            spill_dir: Optional[str] = None, spill_limit: Optional[int] = None,
+            remote: Optional[str] = None):
+    """Connect nodes - DSL for pipeline wiring (capacity > 0 bounds the channel;
+    with spill_dir, overflow beyond capacity goes to disk instead; with remote,
+    the nodes may run in different processes)"""
+    return pipeline_builder.connect(from_node, from_port, to_node, to_port, capacity=capacity,
+                                    spill_dir=spill_dir, spill_limit=spill_limit, remote=remote)
 
 # ============ FILTER FACTORIES (5 Types) ============
 
-def blur(name: str = "blur", radius: float = 2.0) -> ConfigurableBlurNode:
+def blur(name: str = "blur", radius: float = 2.0) -> 'ConfigurableBlurNode':
     """1-to-1 transformation DSL: blur filter"""
+    from .nodes.configurable import ConfigurableBlurNode
     node = ConfigurableBlurNode(name)
     node.set_config(radius=radius)
     return node
 
-def convert(name: str = "convert", target_format: str = "JPG") -> TypeTransformNode:
+def convert(name: str = "convert", target_format: str = "JPG") -> 'TypeTransformNode':
     """Type transformation DSL: format conversion"""
+    from .nodes.filters import TypeTransformNode
     return TypeTransformNode(name, target_format)
 
-def stitch(name: str = "stitch", group_size: int = 3) -> NToOneNode:
-    """n-to-1 transformation DSL: panorama stitching"""
-    return NToOneNode(name, group_size)
+def stitch(name: str = "stitch", group_size: int = 3, canvas_size=None,
+           canvas_dir: Optional[str] = None, feather: int = 32) -> 'NToOneNode':
+    """n-to-1 transformation DSL: panorama stitching (canvas_size stitches pixels)"""
+    from .nodes.filters import NToOneNode
+    return NToOneNode(name, group_size, canvas_size, canvas_dir, feather)
 
-def split(name: str = "split") -> OneToNNode:
+def split(name: str = "split") -> 'OneToNNode':
     """1-to-n transformation DSL: image splitting"""
+    from .nodes.filters import OneToNNode
     return OneToNNode(name)
 
-def select_best(name: str = "selector", num_inputs: int = 2) -> SelectionNode:
-    """1-of-n selection DSL: choose best result"""
-    return SelectionNode(name, num_inputs)
+def select_best(name: str = "selector", num_inputs: int = 2,
+                scorer=None, score_level: int = 2) -> 'SelectionNode':
+    """1-of-n selection DSL: choose best result (scorer rates a pyramid level)"""
+    from .nodes.filters import SelectionNode
+    return SelectionNode(name, num_inputs, scorer, score_level)
 
-def summator(name: str = "summator") -> SummatorNode:
+def summator(name: str = "summator") -> 'SummatorNode':
     """Professor's example DSL: summator node"""
+    from .nodes.filters import SummatorNode
     return SummatorNode(name)
 
 # ============ ADVANCED NODES DSL ============
 
-def configurable(name: str = "configurable") -> ConfigurableBlurNode:
+def configurable(name: str = "configurable") -> 'ConfigurableBlurNode':
     """Configurable node DSL"""
+    from .nodes.configurable import ConfigurableBlurNode
     return ConfigurableBlurNode(name)
 
-def parallel(name: str = "parallel", workers: int = 2) -> OrderedProcessingNode:
-    """Parallel processing node DSL"""
-    return OrderedProcessingNode(name, workers)
\ No newline at end of file
+def parallel(name: str = "parallel", workers: int = 2,
+             min_workers: Optional[int] = None,
+             max_workers: Optional[int] = None) -> 'OrderedProcessingNode':
+    """Parallel processing node DSL (set min/max_workers to autoscale)"""
+    from .nodes.parallel import OrderedProcessingNode
+    return OrderedProcessingNode(name, workers, min_workers, max_workers)
+
+def score_quality(name: str = "quality", level: int = 1, batch_size: int = 1) -> 'QualityScoreNode':
+    """Quality scoring DSL: sharpness/noise/exposure into quality_score"""
+    from .nodes.quality import QualityScoreNode
+    node = QualityScoreNode(name, level)
+    if batch_size > 1:
+        node.set_batching(batch_size)
+    return node
+
+def tone(name: str = "tone", **ops) -> 'ToneNode':
+    """Tone/color DSL: levels, curve, gamma, white_balance (normalised 0-1 values)"""
+    from .nodes.tone import ToneNode
+    return ToneNode(name, **ops)
\ No newline at end of file
@@ -0,0 +1,122 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional
+
+# Node stats rendered with a fixed metric name and type, everything else
+# numeric becomes a gauge named pipeline_node_<key>
+NODE_METRICS = {
+    'processed': ('pipeline_node_processed_total', 'counter', 'Items processed by node'),
+    'process_time': ('pipeline_node_process_seconds_total', 'counter', 'Time spent in process()'),
+    'throughput': ('pipeline_node_throughput', 'gauge', 'Items per second since node start'),
+    'avg_latency': ('pipeline_node_latency_seconds', 'gauge', 'Average time per item in process()'),
+    'running': ('pipeline_node_running', 'gauge', '1 if node thread is running'),
+}
+
+CHANNEL_METRICS = {
+    'size': ('pipeline_channel_depth', 'gauge', 'Items waiting in channel'),
+    'capacity': ('pipeline_channel_capacity', 'gauge', 'Channel maxsize (0 = unbounded)'),
+    'total_put': ('pipeline_channel_put_total', 'counter', 'Items put into channel'),
+    'total_get': ('pipeline_channel_get_total', 'counter', 'Items taken from channel'),
+}
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _collect(rows: List[Dict[str, Any]], known: Dict[str, tuple], prefix: str,
+             label: str, pipeline: str) -> List[str]:
+    """Group samples by metric so every metric gets one HELP/TYPE header"""
+    samples: Dict[str, List[str]] = {}
+    headers: Dict[str, tuple] = {}
+
+    for row in rows:
+        labels = f'pipeline="{_escape(pipeline)}",{label}="{_escape(row["name"])}"'
+        for key, value in row.items():
+            if key == 'name' or not isinstance(value, (int, float)):
+                continue
+            metric, kind, help_text = known.get(key, (f"{prefix}_{key}", 'gauge', key.replace('_', ' ')))
+            headers[metric] = (kind, help_text)
+            samples.setdefault(metric, []).append(f"{metric}{{{labels}}} {float(value):g}")
+
+    lines = []
+    for metric, values in samples.items():
+        kind, help_text = headers[metric]
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        lines.extend(values)
+    return lines
+
+
+def render_prometheus(snapshot: Dict[str, Any]) -> str:
+    """Render a PipelineMonitor snapshot in Prometheus text exposition format"""
+    pipeline = snapshot['pipeline']
+    lines = _collect(snapshot['channels'], CHANNEL_METRICS, 'pipeline_channel', 'channel', pipeline)
+    lines += _collect(snapshot['nodes'], NODE_METRICS, 'pipeline_node', 'node', pipeline)
+    return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """Stdlib HTTP endpoint serving PipelineMonitor data.
+
+    GET /metrics returns Prometheus text, GET /metrics.json returns JSON.
+    Nothing is collected between scrapes - each request builds one snapshot.
+    """
+    def __init__(self, monitor, host: str = "127.0.0.1", port: int = 9108):
+        self.monitor = monitor
+        self.host = host
+        self.port = port
+        self.server: Optional[ThreadingHTTPServer] = None
+        self.server_thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start serving in a background thread"""
+        monitor = self.monitor
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path == '/metrics':
+                    body = render_prometheus(monitor.snapshot()).encode()
+                    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+                elif path == '/metrics.json':
+                    body = json.dumps(monitor.snapshot()).encode()
+                    content_type = 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Keep scrapes out of pipeline output
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]  # Resolve port=0
+        self.server_thread = threading.Thread(
+            target=self.server.serve_forever,
+            name="MetricsExporter",
+            daemon=True
+        )
+        self.server_thread.start()
+        print(f"📡 Metrics exporter listening on {self.url}")
+        return self
+
+    def stop(self):
+        """Stop serving"""
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        if self.server_thread:
+            self.server_thread.join(timeout=1.0)
+            self.server_thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/metrics"
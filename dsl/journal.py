@@ -0,0 +1,273 @@
+"""
+Journal of completed jobs, so a restarted pipeline skips finished images.
+
+Sinks record each job's image_id under a hash of the pipeline
+configuration (config_hash()); a source given the journal as skip= drops
+jobs already recorded under the same configuration. Changing the
+configuration changes the hash, so everything is processed again.
+
+On disk, per configuration hash:
+  journal-<hash>.log  append-only image_ids, one per line, written by a
+                      background thread in group commits (one write +
+                      fsync per commit_interval)
+  journal-<hash>.idx  sorted unique 64-bit keys of the image_ids,
+                      binary-searched through mmap; the log is merged into
+                      it when the journal is opened, and by the writer
+                      thread once recent_limit image_ids have been
+                      committed since the last merge
+An optional in-memory Bloom filter answers most misses without touching
+the index pages.
+
+Termination signals and poison pills are never recorded. Only image_ids
+that reach the sink unchanged can be skipped at the source
+(1-to-1 filters, parallel, convert keep them; n-to-1 nodes make new ones).
+"""
+import hashlib
+import json
+import mmap
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Iterable, List, Optional
+
+
+def config_hash(pipeline) -> str:
+    """Stable hash of the pipeline's nodes, their types and configuration"""
+    description = []
+    for node in pipeline.nodes:
+        config = getattr(node, "config", None)
+        description.append([node.name, type(node).__name__,
+                            sorted((key, repr(value)) for key, value in (config or {}).items())])
+    return hashlib.blake2b(json.dumps(description).encode(), digest_size=8).hexdigest()
+
+
+class BloomFilter:
+    """Bit array with k probes derived from a 64-bit key (double hashing)"""
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        import math
+        capacity = max(capacity, 1024)
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.probes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: int):
+        h1, h2 = key & 0xFFFFFFFF, (key >> 32) | 1
+        return [(h1 + i * h2) % self.size for i in range(self.probes)]
+
+    def add(self, key: int):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def update(self, keys):
+        """Add many keys (a numpy uint64 array takes the vectorized path)"""
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        if np is None or not isinstance(keys, np.ndarray):
+            for key in keys:
+                self.add(int(key))
+            return
+        bits = np.frombuffer(self.bits, dtype=np.uint8)
+        h1 = keys & np.uint64(0xFFFFFFFF)
+        h2 = (keys >> np.uint64(32)) | np.uint64(1)
+        for i in range(self.probes):
+            positions = (h1 + np.uint64(i) * h2) % np.uint64(self.size)
+            np.bitwise_or.at(bits, positions >> np.uint64(3),
+                             (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)))
+
+    def __contains__(self, key: int) -> bool:
+        h1, h2 = key & 0xFFFFFFFF, (key >> 32) | 1
+        bits, size = self.bits, self.size
+        for i in range(self.probes):
+            position = (h1 + i * h2) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False  # Most misses stop at the first probe or two
+        return True
+
+
+class JobJournal:
+    """Append-only journal of the image_ids of completed jobs, per configuration.
+
+    record() only appends the image_id to an in-memory queue; a writer
+    thread appends everything queued to the log every commit_interval
+    seconds (one write + fsync), so the sink never waits for the disk or
+    hashes anything. A crash loses at most the last commit_interval of
+    records - those jobs are simply processed again.
+    """
+    def __init__(self, directory: str, config: str = "", commit_interval: float = 0.05,
+                 bloom: bool = False, durable: bool = True, recent_limit: int = 1 << 16):
+        self.directory = directory
+        self.config = config
+        self.commit_interval = commit_interval
+        self.durable = durable
+        self.recent_limit = recent_limit
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(directory, f"journal-{config}" if config else "journal")
+        self.log_path = stem + ".log"
+        self.index_path = stem + ".idx"
+
+        self.index = None   # memoryview of uint64 keys (sorted)
+        self._index_map: Optional[mmap.mmap] = None
+        self._index_view: Optional[memoryview] = None
+        self._merge()
+        self.recent = set()  # image_ids committed since the last merge
+        self.bloom: Optional[BloomFilter] = None
+        if bloom:
+            self.bloom = self._bloom_index(BloomFilter(len(self.index)))
+        self.merges = 0
+
+        self.queued = deque()
+        self.recorded = 0
+        self.commits = 0
+        self.commit_time = 0.0
+        self.commit_lock = threading.Lock()  # flush() may race the writer thread
+        self.log = open(self.log_path, "ab")
+        self.running = True
+        self.stopped = threading.Event()
+        self.writer = threading.Thread(target=self._write_loop, name=f"Journal-{os.path.basename(directory)}",
+                                       daemon=True)
+        self.writer.start()
+
+    @staticmethod
+    def key(image_id: str) -> int:
+        digest = hashlib.blake2b(image_id.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "little")
+
+    # ---- index ----
+
+    def _merge(self):
+        """Fold the log into the sorted index of keys, then empty the log"""
+        keys = set()
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "rb") as f:
+                lines = f.read().split(b"\n")
+            # The last line is empty, or torn by a crash - dropped either way
+            keys.update(self.key(line.decode()) for line in lines[:-1])
+        if keys:
+            if os.path.exists(self.index_path):
+                with open(self.index_path, "rb") as f:
+                    keys.update(memoryview(f.read()).cast("Q"))
+            with open(self.index_path + ".tmp", "wb") as f:
+                f.write(_pack(sorted(keys)))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(self.index_path + ".tmp", self.index_path)
+        # The index now holds everything - only then may the log go
+        open(self.log_path, "wb").close()
+
+        if os.path.exists(self.index_path) and os.path.getsize(self.index_path):
+            with open(self.index_path, "rb") as f:
+                self._index_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._index_view = memoryview(self._index_map)
+            self.index = self._index_view.cast("Q")
+        else:
+            self.index = memoryview(b"").cast("Q")
+
+    def _bloom_index(self, bloom: BloomFilter) -> BloomFilter:
+        try:
+            import numpy as np
+        except ImportError:
+            bloom.update(self.index)
+            return bloom
+        if self._index_map is not None:
+            bloom.update(np.frombuffer(self._index_map, dtype=np.uint64))
+        return bloom
+
+    def _fold_recent(self):
+        """Merge the log into the index so `recent` can start over (commit_lock held)"""
+        # Lookups may still be using the old index - it is not released, only dropped
+        self._merge()
+        if self.bloom is not None:
+            self.bloom = self._bloom_index(BloomFilter(len(self.index)))
+        # Everything in recent is in the index now
+        self.recent = set()
+        self.merges += 1
+
+    def __contains__(self, image_id: str) -> bool:
+        if image_id in self.recent:
+            return True
+        key = self.key(image_id)
+        bloom, index = self.bloom, self.index  # The writer thread may swap both in a merge
+        if bloom is not None and key not in bloom:
+            return False
+        position = bisect_left(index, key)
+        return position < len(index) and index[position] == key
+
+    # ---- recording ----
+
+    def record(self, job: Any):
+        """Queue a completed job (an ImageJob, or a JobBatch's rows)"""
+        image_ids = job.image_id
+        if isinstance(image_ids, str):
+            if not (job.is_termination or job.is_poison_pill):
+                self.queued.append(image_ids)
+        else:
+            self.queued.extend(image_ids.tolist())
+
+    def record_inputs(self, inputs: dict):
+        """record() every job of a node's input set (called per item - kept lean)"""
+        append = self.queued.append
+        for jobs in inputs.values():
+            for job in jobs:
+                image_id = job.image_id
+                if type(image_id) is str:
+                    if not (job.is_termination or job.is_poison_pill):
+                        append(image_id)
+                else:
+                    self.record(job)
+
+    def _write_loop(self):
+        while not self.stopped.wait(self.commit_interval):
+            self.flush()
+        self.flush()
+
+    def _commit(self, image_ids: List[str]):
+        started = time.perf_counter()
+        data = ("\n".join(image_ids) + "\n").encode()
+        with self.commit_lock:
+            self.log.write(data)
+            self.log.flush()
+            if self.durable:
+                os.fsync(self.log.fileno())
+            self.recent.update(image_ids)
+            if len(self.recent) >= self.recent_limit:
+                self._fold_recent()
+        self.recorded += len(image_ids)
+        self.commits += 1
+        self.commit_time += time.perf_counter() - started
+
+    def flush(self):
+        """Commit everything queued so far"""
+        queued = self.queued
+        image_ids = [queued.popleft() for _ in range(len(queued))]
+        if image_ids:
+            self._commit(image_ids)
+
+    def close(self):
+        self.stopped.set()
+        self.writer.join()
+        self.log.close()
+        self.index.release()
+        self.index = None
+        if self._index_map is not None:
+            self._index_view.release()
+            self._index_map.close()
+            self._index_map = None
+
+    def stats(self) -> dict:
+        return {
+            "recorded": self.recorded,
+            "commits": self.commits,
+            "commit_time": self.commit_time,
+            "indexed": len(self.index) if self.index is not None else 0,
+            "merges": self.merges,
+        }
+
+
+def _pack(keys: Iterable[int]) -> bytes:
+    from array import array
+    packed = array("Q", keys)
+    return packed.tobytes()
@@ -1,6 +1,7 @@
 import threading
 import time
-from typing import Dict, List, Optional
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Any
 from .core import PipelineDSL, Channel
 
 class PipelineMonitor:
@@ -15,6 +16,7 @@ class PipelineMonitor:
             'node_activity': [],
             'throughput': []
         }
+        self.exporter = None
 
     def attach_pipeline(self, pipeline: PipelineDSL):
         """Attach pipeline to monitor"""
@@ -38,12 +40,72 @@ class PipelineMonitor:
         self.running = False
         if self.monitor_thread:
             self.monitor_thread.join(timeout=1.0)
+        if self.exporter:
+            self.exporter.stop()
+            self.exporter = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current channel and node statistics (computed on demand)"""
+        if not self.pipeline:
+            raise ValueError("No pipeline attached")
+
+        now = time.time()
+        channels = []
+        for channel in self.pipeline.channels:
+            channels.append({
+                'name': channel.name,
+                'size': channel.size(),
+                'capacity': channel.queue.maxsize,
+                'total_put': channel.total_put,
+                'total_get': channel.total_get,
+            })
+
+        nodes = []
+        for node in self.pipeline.nodes:
+            stats = dict(node.stats())
+            processed = stats.get('processed', 0)
+            uptime = now - node.started_at if node.started_at else 0.0
+            stats['name'] = node.name
+            stats['throughput'] = processed / uptime if uptime > 0 else 0.0
+            stats['avg_latency'] = stats.get('process_time', 0.0) / processed if processed else 0.0
+            if 'cache_hits' in stats and 'cache_misses' in stats:
+                lookups = stats['cache_hits'] + stats['cache_misses']
+                stats['cache_hit_rate'] = stats['cache_hits'] / lookups if lookups else 0.0
+            nodes.append(stats)
+
+        return {
+            'pipeline': self.pipeline.name,
+            'timestamp': now,
+            'channels': channels,
+            'nodes': nodes,
+        }
+
+    def serve_metrics(self, port: int = 9108, host: str = "127.0.0.1"):
+        """Expose snapshot() over HTTP (/metrics and /metrics.json)"""
+        from .exporter import MetricsExporter
+
+        if self.exporter:
+            self.exporter.stop()
+        self.exporter = MetricsExporter(self, host, port)
+        self.exporter.start()
+        return self.exporter
+
+    def bottlenecks(self, window: float = 1.0, cores: Optional[int] = None, apply: bool = False):
+        """Rank stages by load; with cores, also split them across parallel() stages"""
+        from .bottleneck import BottleneckAnalyzer
+
+        if not self.pipeline:
+            raise ValueError("No pipeline attached")
+        analyzer = BottleneckAnalyzer(self)
+        if cores is None and not apply:
+            return analyzer.analyze(window)
+        return analyzer.rebalance(cores, window, apply)
 
     def _monitor_loop(self):
         """Main monitoring loop"""
         while self.running and self.pipeline:
             # Collect metrics
-            total_size = sum(channel.size() for channel in self.pipeline.channels)
+            total_size = sum(channel.pending() for channel in self.pipeline.channels)
             active_nodes = sum(1 for node in self.pipeline.nodes if node.running)
 
             self.metrics['channel_sizes'].append(total_size)
@@ -68,4 +130,147 @@ class PipelineMonitor:
         print("-" * 40)
         print(f"Avg channel size: {sum(self.metrics['channel_sizes'])/len(self.metrics['channel_sizes']):.1f}")
         print(f"Max channel size: {max(self.metrics['channel_sizes'])}")
-        print(f"Avg active nodes: {sum(self.metrics['node_activity'])/len(self.metrics['node_activity']):.1f}")
\ No newline at end of file
+        print(f"Avg active nodes: {sum(self.metrics['node_activity'])/len(self.metrics['node_activity']):.1f}")
+
+@dataclass
+class WaitEdge:
+    """One edge of the wait-for graph: waiter cannot progress until target does"""
+    waiter: str
+    target: str
+    channel: str
+    reason: str      # "empty input", "incomplete join" or "full output"
+    waited: float    # seconds the waiter has been blocked
+
+    def __str__(self) -> str:
+        return f"{self.waiter} --[{self.reason} on '{self.channel}', {self.waited * 1000:.0f} ms]--> {self.target}"
+
+
+class DeadlockDetector:
+    """Finds cycles in the wait-for graph of a running pipeline.
+
+    Nodes record which channel each of their threads is blocked on. A node
+    blocked on an empty input waits for the channel's producers; a node
+    blocked on a full output waits for its consumers. A cycle of such edges,
+    unchanged over two polls with no channel traffic, is a deadlock - a
+    merely slow pipeline always has some node that is not blocked.
+    """
+    def __init__(self, pipeline: PipelineDSL, interval: float = 0.01,
+                 stall_threshold: float = 0.05,
+                 on_deadlock: Optional[Callable[[List[WaitEdge]], None]] = None):
+        self.pipeline = pipeline
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.on_deadlock = on_deadlock
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        self.deadlock: Optional[List[WaitEdge]] = None
+        self._last_seen = None
+
+    def _edges(self) -> List[tuple]:
+        """(waiter node, target node, WaitEdge) for every current wait"""
+        producers: Dict[int, list] = {}
+        consumers: Dict[int, list] = {}
+        for node in self.pipeline.nodes:
+            for channel in node.outputs:
+                producers.setdefault(id(channel), []).append(node)
+            for channel in node.inputs:
+                consumers.setdefault(id(channel), []).append(node)
+
+        now = time.time()
+        edges = []
+        for node in self.pipeline.nodes:
+            for kind, channel, since in list(node.blocked.values()):
+                if kind == "get":
+                    if not channel.empty():
+                        continue  # Woken up already
+                    # Holding part of an input set = waiting to complete a join/group
+                    joining = any(getattr(node, 'input_buffers', {}).values())
+                    reason = "incomplete join" if joining else "empty input"
+                    targets = producers.get(id(channel), [])
+                else:
+                    if not channel.full():
+                        continue
+                    reason = "full output"
+                    targets = consumers.get(id(channel), [])
+                for target in targets:
+                    if target.finished.is_set():
+                        continue  # Finished nodes will not be the ones to move
+                    edges.append((node, target, WaitEdge(node.name, target.name, channel.name,
+                                                         reason, now - since)))
+        return edges
+
+    def wait_for_graph(self) -> List[WaitEdge]:
+        """Current wait-for edges"""
+        return [edge for _, _, edge in self._edges()]
+
+    def find_cycle(self) -> Optional[List[WaitEdge]]:
+        """A cycle of waits that have all lasted at least stall_threshold"""
+        adjacency: Dict[int, list] = {}
+        for waiter, target, edge in self._edges():
+            if edge.waited >= self.stall_threshold:
+                adjacency.setdefault(id(waiter), []).append((id(target), edge))
+
+        # Iterative DFS keeping the path of edges on the stack
+        done = set()
+        for start in adjacency:
+            if start in done:
+                continue
+            on_path = {start: 0}
+            path: List[WaitEdge] = []
+            stack = [(start, iter(adjacency.get(start, [])))]
+            while stack:
+                node_id, children = stack[-1]
+                for child, edge in children:
+                    if child in on_path:
+                        return path[on_path[child]:] + [edge]
+                    if child not in done:
+                        on_path[child] = len(path) + 1
+                        path.append(edge)
+                        stack.append((child, iter(adjacency.get(child, []))))
+                        break
+                else:
+                    stack.pop()
+                    done.add(node_id)
+                    on_path.pop(node_id, None)
+                    if path:
+                        path.pop()
+        return None
+
+    def check(self) -> Optional[List[WaitEdge]]:
+        """Return the deadlocked cycle once it has been stable for two polls"""
+        cycle = self.find_cycle()
+        if not cycle:
+            self._last_seen = None
+            return None
+        traffic = tuple((c.total_put, c.total_get) for c in self.pipeline.channels)
+        key = (tuple((e.waiter, e.target, e.channel) for e in cycle), traffic)
+        stable = key == self._last_seen
+        self._last_seen = key
+        return cycle if stable else None
+
+    @staticmethod
+    def format_cycle(cycle: List[WaitEdge]) -> str:
+        lines = ["🚨 DEADLOCK DETECTED: wait-for cycle"]
+        lines += [f"   {edge}" for edge in cycle]
+        return "\n".join(lines)
+
+    def start(self):
+        self.running = True
+        self.deadlock = None
+        self.thread = threading.Thread(target=self._loop, name="DeadlockDetector", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1.0)
+
+    def _loop(self):
+        while self.running:
+            cycle = self.check()
+            if cycle and self.deadlock is None:
+                self.deadlock = cycle
+                print(self.format_cycle(cycle))
+                if self.on_deadlock:
+                    self.on_deadlock(cycle)
+            time.sleep(self.interval)
@@ -1,33 +1,41 @@
 """
 All node types for the pipeline system
+
+Each class is imported from its module on first use (PEP 562), so using
+one node type does not load the others.
 """
+import importlib
+
+_EXPORTS = {
+    'SynchronizedNode': '.base', 'InputBatch': '.base',
+
+    # 5 Filter types
+    'OneToOneNode': '.filters', 'TypeTransformNode': '.filters', 'NToOneNode': '.filters',
+    'OneToNNode': '.filters', 'SelectionNode': '.filters', 'SummatorNode': '.filters',
+
+    # Advanced nodes
+    'ConfigurableNode': '.configurable', 'ConfigurableBlurNode': '.configurable',
+    'OrderedProcessingNode': '.parallel', 'QualityScoreNode': '.quality', 'ToneNode': '.tone',
+}
+
 
-# Import each module individually to avoid circular imports
-import dsl.nodes.base as base
-import dsl.nodes.filters as filters
-import dsl.nodes.configurable as configurable
-import dsl.nodes.parallel as parallel
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
 
-# Re-export with clear names
-SynchronizedNode = base.SynchronizedNode
 
-# 5 Filter types
-OneToOneNode = filters.OneToOneNode
-TypeTransformNode = filters.TypeTransformNode
-NToOneNode = filters.NToOneNode
-OneToNNode = filters.OneToNNode
-SelectionNode = filters.SelectionNode
-SummatorNode = filters.SummatorNode
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
 
-# Advanced nodes
-ConfigurableNode = configurable.ConfigurableNode
-ConfigurableBlurNode = configurable.ConfigurableBlurNode
-OrderedProcessingNode = parallel.OrderedProcessingNode
 
 __all__ = [
-    'SynchronizedNode',
+    'SynchronizedNode', 'InputBatch',
     'OneToOneNode', 'TypeTransformNode', 'NToOneNode',
     'OneToNNode', 'SelectionNode', 'SummatorNode',
     'ConfigurableNode', 'ConfigurableBlurNode',
-    'OrderedProcessingNode'
-]
\ No newline at end of file
+    'OrderedProcessingNode', 'QualityScoreNode', 'ToneNode'
+]
@@ -2,7 +2,9 @@ import threading
 import time
 from typing import List, Dict, Any, Optional
 from collections import defaultdict
-from ..core import NodeDSL, Channel
+from queue import Empty
+from ..core import NodeDSL, Channel, CheckpointBarrier, END_OF_STREAM
+from .. import tracing
 from model.image_job import ImageJob
 
 class SynchronizedNode(NodeDSL):
@@ -16,74 +18,387 @@ class SynchronizedNode(NodeDSL):
         self.input_requirements = input_requirements or {"default": 1}
         self.input_buffers = defaultdict(list)
         self.buffer_locks = defaultdict(threading.Lock)
+        self.closed_ports = set()
+        self.aligned_ports = set()  # Ports that delivered self.barrier - not read until it is passed
+        self.end_of_stream = False
         self.verbose = False
+        self.batch_size = 1
+        self.linger = 0.0
+        self.journal = None  # dsl.journal.JobJournal recording completed input sets
         
-    def _wait_for_inputs(self) -> Dict[str, List[ImageJob]]:
-        """Wait until all required inputs are available (professor's synchronization)"""
+    def set_batching(self, batch_size: int, linger: float = 0.005):
+        """Hand up to batch_size ready input sets to process_batch() at once,
+        waiting at most linger seconds for a batch to fill"""
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
+        self.batch_size = batch_size
+        self.linger = linger
+        return self
+        
+    def set_journal(self, journal):
+        """Record every input set this node completes (use on sinks) - see dsl.journal"""
+        self.journal = journal
+        return self
+        
+    def _wait_for_inputs(self, timeout: Optional[float] = None) -> Dict[str, List[ImageJob]]:
+        """Wait until all required inputs are available (professor's synchronization)
+
+        Items stay buffered until every port has enough, so a slow port never
+        makes the other ports lose items. Returns {} with end_of_stream set once
+        a closed port can no longer meet its requirement, or {} after timeout.
+        """
+        if not self.inputs:
+            # Nothing can ever arrive
+            self.end_of_stream = True
+            return {}
+        deadline = None if timeout is None else time.perf_counter() + timeout
         while self.running:
-            ready_inputs = {}
+            if self.barrier is not None and self._barrier_aligned():
+                return {}
             all_ready = True
+            starved = None  # A closed port short of its requirement
             
             for port_idx, channel in enumerate(self.inputs):
                 port_name = f"in_{port_idx}"
                 required = self.input_requirements.get(port_name, 1)
                 
                 with self.buffer_locks[port_name]:
-                    if len(self.input_buffers[port_name]) < required:
-                        # Not enough data in this buffer
+                    # Pull until this port has enough data or the channel runs dry
+                    # (while aligning a barrier: until the barrier arrives)
+                    while ((len(self.input_buffers[port_name]) < required or self.barrier is not None)
+                           and port_name not in self.closed_ports
+                           and port_name not in self.aligned_ports):
                         try:
-                            # Try to get more data
-                            item = channel.get(timeout=0.1)
+                            item = channel.get(block=False)
+                        except Empty:
+                            if deadline is not None and time.perf_counter() >= deadline:
+                                break
+                            self._block("get", channel)
+                            try:
+                                wait = 0.1 if deadline is None else min(0.1, max(0.0, deadline - time.perf_counter()))
+                                item = channel.get(timeout=wait)
+                            except Empty:
+                                break
+                            finally:
+                                # Only while inside get(): a stale record would be a false wait-for edge
+                                self._unblock()
+                        if item is END_OF_STREAM:
+                            self.closed_ports.add(port_name)
+                        elif type(item) is CheckpointBarrier:
+                            self._align(port_name, item)
+                        else:
                             self.input_buffers[port_name].append(item)
-                        except:
-                            all_ready = False
-                            break
                     
-                    # Check again after potential get
-                    if len(self.input_buffers[port_name]) >= required:
-                        ready_inputs[port_name] = self.input_buffers[port_name][:required]
-                        # Remove consumed items
-                        self.input_buffers[port_name] = self.input_buffers[port_name][required:]
-                    else:
+                    if len(self.input_buffers[port_name]) < required:
                         all_ready = False
-                        break
+                        if port_name in self.closed_ports:
+                            starved = port_name
+                        # Keep reading the other ports until their barriers arrive
+                        if port_name not in self.aligned_ports:
+                            break
+                        
+            if starved is not None:
+                # This join can never fire again
+                self._drain_inputs()
+                return {}
             
             if all_ready:
+                ready_inputs = {}
+                for port_idx in range(len(self.inputs)):
+                    port_name = f"in_{port_idx}"
+                    required = self.input_requirements.get(port_name, 1)
+                    with self.buffer_locks[port_name]:
+                        ready_inputs[port_name] = self.input_buffers[port_name][:required]
+                        # Remove consumed items
+                        self.input_buffers[port_name] = self.input_buffers[port_name][required:]
                 if self.verbose:
                     print(f"[{self.name}] Got all required inputs: {ready_inputs}")
                 return ready_inputs
-            else:
-                time.sleep(0.01)  # Yield to avoid busy waiting
+            
+            if deadline is not None and time.perf_counter() >= deadline:
+                return {}
         
         return {}
+
+    def _align(self, port_name: str, barrier: CheckpointBarrier):
+        """Stop reading a port that delivered the current barrier; a newer
+        barrier (an earlier checkpoint timed out) restarts the alignment"""
+        current = self.barrier
+        if current is None or barrier.checkpoint_id > current.checkpoint_id:
+            self.barrier = barrier
+            self.aligned_ports = {port_name}
+        elif barrier.checkpoint_id == current.checkpoint_id:
+            self.aligned_ports.add(port_name)
+
+    def _barrier_aligned(self) -> bool:
+        return all(f"in_{i}" in self.aligned_ports or f"in_{i}" in self.closed_ports
+                   for i in range(len(self.inputs)))
+
+    def _pass_barrier(self):
+        super()._pass_barrier()
+        self.aligned_ports = set()
+
+    def snapshot_state(self) -> dict:
+        state = super().snapshot_state()
+        state["input_buffers"] = {port: list(buffer) for port, buffer in list(self.input_buffers.items())
+                                  if buffer}
+        return state
+
+    def restore_state(self, state: dict):
+        super().restore_state(state)
+        for port, buffer in state.get("input_buffers", {}).items():
+            self.input_buffers[port] = list(buffer)
+
+    def _drain_inputs(self):
+        """Discard what is left on the inputs until every one of them has closed"""
+        self.end_of_stream = True
+        dropped = 0
+        for port_idx, channel in enumerate(self.inputs):
+            port_name = f"in_{port_idx}"
+            with self.buffer_locks[port_name]:
+                dropped += len(self.input_buffers[port_name])
+                self.input_buffers[port_name] = []
+                while self.running and port_name not in self.closed_ports:
+                    try:
+                        item = channel.get(timeout=0.1)
+                    except Empty:
+                        continue
+                    if item is END_OF_STREAM:
+                        self.closed_ports.add(port_name)
+                    elif type(item) is not CheckpointBarrier:
+                        dropped += 1
+        self.dropped_count += dropped
+        if dropped:
+            print(f"⚠️ [{self.name}] End of stream: dropped {dropped} unmatched item(s)")
     
     def _run(self):
         """Main execution with synchronization"""
+        if self.batch_size > 1:
+            self._run_batched()
+            return
         while self.running:
+            inputs = {}
             try:
+                if self.barrier is not None and self._barrier_aligned():
+                    self._pass_barrier()
                 # Wait for required inputs (professor's synchronization requirement)
                 inputs = self._wait_for_inputs()
                 if not inputs:
+                    if self.end_of_stream:
+                        break
                     continue
                     
                 # Process the inputs
-                result = self.process(inputs)
+                started = time.perf_counter()
+                result = self._process(inputs)
+                finished = time.perf_counter()
+                self.process_time += finished - started
                 self.processed_count += 1
                 
                 # Send to outputs
-                if result:
-                    if isinstance(result, list):
-                        for item in result:
-                            for output in self.outputs:
-                                output.put(item)
-                    else:
-                        for output in self.outputs:
-                            output.put(result)
+                if tracing.ACTIVE is not None:
+                    self._trace(inputs, result, started, finished)
+                else:
+                    self._emit(result)
+                if self.journal is not None:
+                    self.journal.record_inputs(inputs)
                             
             except Exception as e:
-                if self.verbose:
-                    print(f"[{self.name}] Error: {e}")
+                self._drop(e, inputs)
+        
+        self._finish()
+                    
+    def _collect_batch(self) -> "InputBatch":
+        """Block for one input set, then take more until batch_size or linger expires"""
+        batch = InputBatch()
+        inputs = self._wait_for_inputs()
+        if not inputs:
+            return batch
+        batch.append(inputs)
+        deadline = time.perf_counter() + self.linger
+        while len(batch) < self.batch_size and not self.end_of_stream:
+            inputs = self._wait_for_inputs(max(0.0, deadline - time.perf_counter()))
+            if not inputs:
+                break
+            batch.append(inputs)
+        return batch
+        
+    def _run_batched(self):
+        """Main execution handing input sets to process_batch()"""
+        while self.running:
+            batch = InputBatch()
+            try:
+                if self.barrier is not None and self._barrier_aligned():
+                    self._pass_barrier()
+                batch = self._collect_batch()
+                if not batch:
+                    if self.end_of_stream:
+                        break
+                    continue
                     
+                started = time.perf_counter()
+                results = self.process_batch(batch)
+                finished = time.perf_counter()
+                self.process_time += finished - started
+                self.processed_count += len(batch)
+                
+                for inputs, result in zip(batch, results):
+                    if tracing.ACTIVE is not None:
+                        self._trace(inputs, result, started, finished)
+                    else:
+                        self._emit(result)
+                    if self.journal is not None:
+                        self.journal.record_inputs(inputs)
+                if self.end_of_stream:
+                    break
+                    
+            except Exception as e:
+                self._drop(e, *batch)
+        
+        self._finish()
+        
+    def process_batch(self, batch: "InputBatch") -> List[Any]:
+        """Process several input sets at once - one result per input set.
+
+        Override for vectorized filters; batch.pixels() stacks same-shaped
+        pixel arrays. The default calls process() for each input set.
+        """
+        return [self._process(inputs) for inputs in batch]
+        
+    def _process(self, inputs: Dict[str, List]) -> Any:
+        """process(), row by row when a JobBatch reaches a node without accepts_batches"""
+        if self.accepts_batches or not any(_is_batch(job) for jobs in inputs.values() for job in jobs):
+            return self.process(inputs)
+        results, failed, error = [], [], None
+        for rows in self._expand_batches(inputs):
+            try:
+                result = self.process(rows)
+            except Exception as e:
+                failed.append(rows)
+                error = e
+                continue
+            if result:
+                results.extend(result if isinstance(result, list) else [result])
+        if failed:
+            self._drop(error, *failed)  # Reported once per batch, not per row
+        return results
+        
+    def _expand_batches(self, inputs: Dict[str, List]) -> List[Dict[str, List]]:
+        """Input sets of ImageJobs: ports holding batches are unpacked and cut
+        into sets of the port's requirement; other ports go with the last set"""
+        expanded, rest = {}, {}
+        for port, jobs in inputs.items():
+            if any(_is_batch(job) for job in jobs):
+                rows = [row for job in jobs for row in (job.to_jobs() if _is_batch(job) else [job])]
+                required = max(1, self.input_requirements.get(port, 1))
+                expanded[port] = [rows[i:i + required] for i in range(0, len(rows), required)]
+            else:
+                rest[port] = jobs
+        counts = {len(sets) for sets in expanded.values()}
+        if len(counts) > 1:
+            raise ValueError(f"Batches on {', '.join(expanded)} do not have the same number of rows")
+        count = counts.pop()
+        return [{**{port: sets[i] for port, sets in expanded.items()}, **(rest if i == count - 1 else {})}
+                for i in range(count)]
+        
+    def _drop(self, error: Exception, *input_sets: Dict[str, List]):
+        """Count and report input sets lost to an exception"""
+        dropped = sum(len(job) if _is_batch(job) else 1
+                      for inputs in input_sets for jobs in inputs.values() for job in jobs)
+        self.dropped_count += dropped
+        lost = f" - dropped {dropped} item(s)" if dropped else ""
+        print(f"⚠️ [{self.name}] {type(error).__name__}: {error}{lost}")
+        
+    def _finish(self):
+        """Forward end-of-stream downstream once all inputs have closed"""
+        if self.end_of_stream:
+            try:
+                self._emit(self.on_end_of_stream())
+            except Exception as e:
+                self._drop(e)
+            for output in self.outputs:
+                self._send(output, END_OF_STREAM)
+            self.running = False
+            self.finished.set()
+        self._unblock()
+        self.exited.set()
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["dropped"] = self.dropped_count
+        return stats
+
+    def in_flight(self) -> int:
+        return sum(len(buffer) for buffer in list(self.input_buffers.values()))
+
+    def on_end_of_stream(self) -> Any:
+        """Called once after the last input set - return items to flush downstream"""
+        return None
+
+    def _emit(self, result):
+        """Send a process() result (single item or list) to every output"""
+        if result:
+            for item in (result if isinstance(result, list) else [result]):
+                if self.feedback_routes and any(route(item) for route in self.feedback_routes):
+                    continue
+                for output in self.outputs:
+                    self._send(output, item)
+
+    def _trace(self, inputs: Dict[str, List[ImageJob]], result, started: float, finished: float):
+        """Emit result while recording wait/process/output spans for sampled jobs"""
+        tracer = tracing.ACTIVE
+        traced = tracer.traced(job for jobs in inputs.values() for job in jobs)
+        if not traced:
+            self._emit(result)
+            return
+
+        # Jobs created by process() (n-to-1, summator) inherit the trace
+        for item in (result if isinstance(result, list) else [result]):
+            if item is not None and getattr(item, 'trace_id', None) is None:
+                item.trace_id = traced[0].trace_id
+
+        for job in traced:
+            received = tracer.received_at(job)
+            if received is not None:
+                tracer.span("wait_for_inputs", job, received, started, node=self.name)
+            tracer.span("process", job, started, finished, node=self.name)
+
+        self._emit(result)
+        emitted = time.perf_counter()
+        for job in traced:
+            tracer.span("output", job, finished, emitted, node=self.name)
+
     def set_verbose(self, verbose: bool):
         self.verbose = verbose
-        return self
\ No newline at end of file
+        return self
+
+
+def _is_batch(item) -> bool:
+    """A model.job_batch.JobBatch (batches declare the record type they carry)"""
+    return getattr(type(item), 'record_type', None) is not None
+
+
+class InputBatch(list):
+    """Input sets ({port: [jobs]}) collected for one process_batch() call"""
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._stacked = {}
+
+    def jobs(self, port: str = "in_0", index: int = 0) -> List[ImageJob]:
+        """The index-th job of port from every input set"""
+        return [inputs[port][index] for inputs in self]
+
+    def pixels(self, port: str = "in_0", index: int = 0):
+        """Pixel arrays of jobs() stacked into one (N, ...) array, or None when
+        some job has no pixels or the shapes/dtypes differ"""
+        key = (port, index)
+        if key not in self._stacked:
+            arrays = [job.load_pixels() for job in self.jobs(port, index)]
+            stacked = None
+            if arrays and all(a is not None for a in arrays):
+                first = arrays[0]
+                if all(a.shape == first.shape and a.dtype == first.dtype for a in arrays):
+                    import numpy as np
+                    stacked = np.stack(arrays)
+            self._stacked[key] = stacked
+        return self._stacked[key]
@@ -1,4 +1,4 @@
-from typing import List, Dict, Any
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from collections import defaultdict
 from ..core import Channel
 from .base import SynchronizedNode
@@ -50,29 +50,66 @@ class OneToOneNode(SynchronizedNode):
 
 # ============ Type Transformation ============
 class TypeTransformNode(SynchronizedNode):
-    """Type transformation: PNG→JPG, etc."""
+    """Type transformation: PNG→JPG, etc.
+
+    Only relabels the job: encoded bytes keep their encoded_format and are
+    transcoded by ImageJob.to_bytes() when someone needs them, so convert-only
+    paths never decode. Jobs already in the target format pass through untouched.
+    """
     def __init__(self, name: str, target_format: str):
         super().__init__(name, {"in_0": 1})
         self.target_format = target_format
+        self.passed_through = 0
         
     def process(self, inputs: Dict[str, List]) -> Any:
         from model.image_job import ImageJob  # Import here
-        job = inputs["in_0"][0].copy()
+        job = inputs["in_0"][0]
+        if job.current_format == self.target_format:
+            self.passed_through += 1
+            return job
+        job = job.copy()
         old_format = job.current_format
         job.current_format = self.target_format
         job.add_transformation(f"convert_{old_format}_to_{self.target_format}")
         return job
+        
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["passed_through"] = self.passed_through
+        return stats
 
 # ============ n-to-1 Transformation ============
 class NToOneNode(SynchronizedNode):
-    """n-to-1 transformation: panorama stitching, HDR"""
-    def __init__(self, name: str, group_size: int = 3):
-        super().__init__(name, {"in_0": group_size})
+    """n-to-1 transformation: panorama stitching, HDR
+
+    With canvas_size=(height, width) parts are stitched for real: each part
+    is feather-blended at its panorama_offset into a disk-backed canvas (see
+    model.canvas.PanoramaCanvas) as soon as it arrives, in any order, and
+    the panorama is emitted with memmap pixels once its group_size parts are
+    in. Only one part is held in memory at a time.
+    """
+    one_to_one = False
+    
+    def __init__(self, name: str, group_size: int = 3,
+                 canvas_size: Optional[Tuple[int, int]] = None,
+                 canvas_dir: Optional[str] = None, feather: int = 32):
+        super().__init__(name, {"in_0": 1 if canvas_size else group_size})
         self.group_size = group_size
         self.pending_groups = {}
+        self.canvas_size = canvas_size
+        self.canvas_dir = canvas_dir
+        self.feather = feather
+        self.canvases = {}
+        
+    @property
+    def checkpointable(self) -> bool:
+        # Blended canvases live in temporary memmaps that are not snapshotted
+        return not self.canvas_size
         
     def process(self, inputs: Dict[str, List]) -> Any:
         from model.image_job import ImageJob  # Import here
+        if self.canvas_size:
+            return self._stitch_part(inputs["in_0"][0])
         jobs = inputs["in_0"]
         
         # Group by panorama_group if present
@@ -100,10 +137,61 @@ class NToOneNode(SynchronizedNode):
             )
             
         return result
+        
+    def _stitch_part(self, job) -> Any:
+        """Blend one part into its group's canvas; emit the panorama when complete"""
+        from model.image_job import ImageJob
+        from model.canvas import PanoramaCanvas
+        
+        group = job.panorama_group or "default"
+        pixels = job.load_pixels()
+        if pixels is not None:
+            if job.panorama_offset is None:
+                print(f"⚠️ [{self.name}] {job.image_id} has pixels but no panorama_offset - dropped")
+                self.dropped_count += 1
+                return None
+            canvas = self.canvases.get(group)
+            if canvas is None:
+                height, width = self.canvas_size
+                channels = pixels.shape[2] if pixels.ndim == 3 else 1
+                canvas = PanoramaCanvas(height, width, channels, self.canvas_dir, self.feather)
+                self.canvases[group] = canvas
+            canvas.add(pixels, *job.panorama_offset)
+            
+        # Keep only what the result needs, not the part
+        parts = self.pending_groups.setdefault(group, [])
+        parts.append((job.quality_score or 0, job.current_format))
+        if len(parts) < self.group_size:
+            return None
+            
+        del self.pending_groups[group]
+        result = ImageJob(
+            image_id=f"{group}_panorama",
+            transformations=["loaded", "stitched"],
+            current_format=parts[0][1],
+            quality_score=sum(quality for quality, _ in parts) / len(parts)
+        )
+        canvas = self.canvases.pop(group, None)
+        if canvas is not None:
+            result.set_pixels(canvas.finish())
+        return result
+        
+    def on_end_of_stream(self):
+        """Incomplete panoramas are discarded"""
+        for group, parts in self.pending_groups.items():
+            print(f"⚠️ [{self.name}] Panorama '{group}' incomplete ({len(parts)}/{self.group_size} parts) - discarded")
+            self.dropped_count += len(parts)
+            canvas = self.canvases.pop(group, None)
+            if canvas is not None:
+                canvas.discard()
+        self.pending_groups.clear()
+        return None
 
 # ============ 1-to-n Transformation ============
 class OneToNNode(SynchronizedNode):
     """1-to-n transformation: splitting into regions"""
+    one_to_one = False
+    
     def __init__(self, name: str):
         super().__init__(name, {"in_0": 1})
         
@@ -125,15 +213,37 @@ class OneToNNode(SynchronizedNode):
 
 # ============ 1-of-n Selection ============
 class SelectionNode(SynchronizedNode):
-    """Selection of one out of n: compare results, choose best"""
-    def __init__(self, name: str, num_inputs: int = 2):
+    """Selection of one out of n: compare results, choose best
+
+    With a scorer (pixels -> float, e.g. model.imaging.sharpness) variants
+    that carry pixels are scored on pyramid level score_level instead of
+    trusting quality_score; full-resolution pixels are never touched here.
+    """
+    one_to_one = False  # Buffers variants until a correlation group is complete
+    accepts_batches = True
+    
+    def __init__(self, name: str, num_inputs: int = 2,
+                 scorer: Optional[Callable[[Any], float]] = None, score_level: int = 2):
         input_reqs = {f"in_{i}": 1 for i in range(num_inputs)}
         super().__init__(name, input_reqs)
         self.num_inputs = num_inputs
         self.correlation_buffers = defaultdict(list)
+        self.scorer = scorer
+        self.score_level = score_level
+        
+    def _score(self, job) -> float:
+        if self.scorer is not None:
+            pixels = job.pyramid_level(self.score_level)
+            if pixels is not None:
+                return self.scorer(pixels)
+        return getattr(job, 'quality_score', 0) or 0
         
     def process(self, inputs: Dict[str, List]) -> Any:
         from model.image_job import ImageJob  # Import here
+        from model.job_batch import JobBatch
+        
+        if any(isinstance(jobs[0], JobBatch) for jobs in inputs.values()):
+            return self._select_batches([jobs[0] for jobs in inputs.values()])
         
         # Collect all inputs
         all_jobs = []
@@ -149,9 +259,12 @@ class SelectionNode(SynchronizedNode):
         # Process first complete group
         for corr_id, jobs in groups.items():
             if len(jobs) >= self.num_inputs:
-                # Select best by quality score
-                best_job = max(jobs, key=lambda j: getattr(j, 'quality_score', 0) or 0)
-                result = best_job.copy()
+                # Select best by quality score (or by scoring a pyramid level)
+                scores = [self._score(job) for job in jobs]
+                best = max(range(len(jobs)), key=scores.__getitem__)
+                result = jobs[best].copy()
+                if self.scorer is not None:
+                    result.quality_score = scores[best]
                 result.add_transformation(f"selected_best_from_{len(jobs)}")
                 if hasattr(result, 'correlation_id'):
                     result.correlation_id = None  # Clear for downstream
@@ -161,19 +274,52 @@ class SelectionNode(SynchronizedNode):
         if all_jobs:
             return all_jobs[0].copy()
         return None
+        
+    def _select_batches(self, ports: List[Any]) -> List[Any]:
+        """Vectorized selection: row i of every port forms one group"""
+        import numpy as np
+        from model.job_batch import JobBatch
+        
+        batches = [p if isinstance(p, JobBatch) else JobBatch.from_jobs([p]) for p in ports]
+        n = min(len(b) for b in batches)
+        if any(len(b) != n for b in batches):
+            unmatched = sum(len(b) - n for b in batches)
+            self.dropped_count += unmatched
+            print(f"⚠️ [{self.name}] Batch length mismatch: dropped {unmatched} row(s)")
+            batches = [b.take(slice(0, n)) for b in batches]
+            
+        correlation = np.stack([b.correlation_id for b in batches])
+        complete = (correlation[0] != "") & (correlation == correlation[0]).all(axis=0)
+        quality = np.nan_to_num(np.stack([b.quality_score for b in batches]), nan=0.0)
+        best = JobBatch.choose(batches, quality.argmax(axis=0))  # Ties go to the lowest port
+        
+        selected = best if complete.all() else best.take(complete)
+        selected.correlation_id = np.full(len(selected), "", dtype="<U1")  # Clear for downstream
+        selected.add_transformation(f"selected_best_from_{len(batches)}")
+        # Rows without a complete group pass port 0 through, as process() does
+        if len(selected) == n:
+            return [selected]
+        results = [selected, batches[0].take(~complete)]
+        return [batch for batch in results if len(batch)]
 
 # ============ Professor's Summator Example ============
 class SummatorNode(SynchronizedNode):
     """Professor's example: summator with two inputs, one output"""
+    accepts_batches = True
+    
     def __init__(self, name: str):
         super().__init__(name, {"in_0": 1, "in_1": 1})
+        self.rows_summed = 0
         
     def process(self, inputs: Dict[str, List]) -> Any:
         from model.image_job import ImageJob  # Import here
+        from model.job_batch import JobBatch
         
         # Get one from each input channel
         job1 = inputs["in_0"][0]
         job2 = inputs["in_1"][0]
+        if isinstance(job1, JobBatch) or isinstance(job2, JobBatch):
+            return self._sum_batches(job1, job2)
         
         # Sum numeric values (if present)
         value1 = getattr(job1, 'numeric_value', 0) or 0
@@ -193,4 +339,23 @@ class SummatorNode(SynchronizedNode):
         leftover2 = len(self.input_buffers.get("in_1", []))
         if leftover1 > 0 or leftover2 > 0:
             print(f"⚠️ [{self.name}] Data accumulation: in_0={leftover1}, in_1={leftover2}")
-        return result
\ No newline at end of file
+        return result
+        
+    def _sum_batches(self, first: Any, second: Any) -> Any:
+        """Vectorized summation: row i of in_0 plus row i of in_1"""
+        import numpy as np
+        from model.job_batch import JobBatch
+        
+        a = first if isinstance(first, JobBatch) else JobBatch.from_jobs([first])
+        b = second if isinstance(second, JobBatch) else JobBatch.from_jobs([second])
+        n = min(len(a), len(b))
+        if len(a) != len(b):
+            unmatched = abs(len(a) - len(b))
+            self.dropped_count += unmatched
+            print(f"⚠️ [{self.name}] Batch length mismatch: in_0={len(a)}, in_1={len(b)}, dropped {unmatched} row(s)")
+            
+        total = np.nan_to_num(a.numeric_value[:n]) + np.nan_to_num(b.numeric_value[:n])
+        ids = np.char.add("sum_", np.arange(self.rows_summed, self.rows_summed + n).astype(str))
+        self.rows_summed += n
+        return JobBatch(ids, a.current_format[:n], numeric_value=total,
+                        transformations=["summation"])
@@ -1,43 +1,168 @@
+import math
 import threading
+import time
 from queue import Queue, PriorityQueue
-from typing import List, Tuple
+from typing import List, Tuple, Optional
 from .base import SynchronizedNode
+from .. import tracing
 from model.image_job import ImageJob
 
 class OrderedProcessingNode(SynchronizedNode):
     """Processes multiple items in parallel but maintains output order"""
-    def __init__(self, name: str, worker_count: int = 2):
+    def __init__(self, name: str, worker_count: int = 2,
+                 min_workers: Optional[int] = None, max_workers: Optional[int] = None):
         super().__init__(name, {"in_0": 1})
         self.worker_count = worker_count
         self.workers: List[threading.Thread] = []
+        self.next_worker_id = 0
+        self.items_done = 0
+        self.autoscale: Optional[dict] = None
+        self.scaler: Optional[threading.Thread] = None
+        self.scale_events: List[Tuple[float, int, int, str]] = []  # (time, old, new, reason)
+        if min_workers is not None or max_workers is not None:
+            self.enable_autoscaling(min_workers or 1, max_workers or max(worker_count, 1))
         self.input_queue = Queue()
         self.output_queue = PriorityQueue()  # (sequence, result)
         self.sequence_counter = 0
         self.next_output = 0
         self.output_lock = threading.Lock()
+        self.dispatched = {}  # sequence -> input job, until its result is emitted
+        self.reorder = {}     # sequence -> result waiting for its predecessors
+        self.emit_lock = threading.Lock()  # Orders in-order emits against checkpoint barriers
+        self.worker_time = 0.0
+        self.coordinator: Optional[threading.Thread] = None
         
     def _run(self):
         """Start workers and output coordinator"""
         # Start worker threads
-        for i in range(self.worker_count):
-            worker = threading.Thread(
-                target=self._worker_func,
-                args=(i,),
-                name=f"{self.name}_worker_{i}"
-            )
-            self.workers.append(worker)
-            worker.start()
+        for _ in range(self.worker_count):
+            self._add_worker()
             
         # Output coordinator thread
-        coordinator = threading.Thread(
+        self.coordinator = threading.Thread(
             target=self._output_coordinator,
-            name=f"{self.name}_coordinator"
+            name=f"{self.name}_coordinator",
+            daemon=True
         )
-        coordinator.start()
+        self.coordinator.start()
+        
+        if self.autoscale is not None:
+            self.scaler = threading.Thread(
+                target=self._autoscale_loop,
+                name=f"{self.name}_autoscaler",
+                daemon=True
+            )
+            self.scaler.start()
         
         # Main thread feeds input queue
         super()._run()
         
+    def _add_worker(self):
+        worker_id = self.next_worker_id
+        self.next_worker_id += 1
+        worker = threading.Thread(
+            target=self._worker_func,
+            args=(worker_id,),
+            name=f"{self.name}_worker_{worker_id}",
+            daemon=True
+        )
+        self.workers.append(worker)
+        worker.start()
+        
+    def enable_autoscaling(self, min_workers: int = 1, max_workers: int = 8,
+                           interval: float = 0.25,
+                           high_utilization: float = 0.75,
+                           low_utilization: float = 0.3,
+                           scale_up_after: int = 2,
+                           scale_down_after: int = 8):
+        """Grow/shrink the worker pool between min_workers and max_workers.
+        
+        Every interval the scaler samples the backlog (input channel + work
+        queue), worker utilization and per-item latency. It grows after
+        scale_up_after busy samples in a row and shrinks after
+        scale_down_after idle ones, so short bursts and lulls do not thrash.
+        """
+        if min_workers < 1 or max_workers < min_workers:
+            raise ValueError("need 1 <= min_workers <= max_workers")
+        self.autoscale = {
+            "min_workers": min_workers,
+            "max_workers": max_workers,
+            "interval": interval,
+            "high_utilization": high_utilization,
+            "low_utilization": low_utilization,
+            "scale_up_after": scale_up_after,
+            "scale_down_after": scale_down_after,
+        }
+        self.worker_count = min(max(self.worker_count, min_workers), max_workers)
+        return self
+        
+    def backlog(self) -> int:
+        """Items waiting for a worker, including those still in the input channel"""
+        return self.input_queue.qsize() + sum(ch.pending() for ch in self.inputs)
+        
+    def _autoscale_loop(self):
+        """Sample load and resize the pool, with hysteresis"""
+        config = self.autoscale
+        interval = config["interval"]
+        last_busy, last_done, last_dispatched = self.worker_time, self.items_done, self.sequence_counter
+        busy_samples = idle_samples = 0
+        
+        # A burst that has already ended upstream is still queued here - keep
+        # sampling until every dispatched item has been emitted
+        while self.running and (not self.end_of_stream or self.next_output < self.sequence_counter):
+            time.sleep(interval)
+            busy, done, dispatched = self.worker_time, self.items_done, self.sequence_counter
+            workers = self.worker_count
+            backlog = self.backlog()
+            utilization = (busy - last_busy) / (interval * workers)
+            latency = (busy - last_busy) / (done - last_done) if done > last_done else 0.0
+            arrival_rate = (dispatched - last_dispatched) / interval
+            last_busy, last_done, last_dispatched = busy, done, dispatched
+            
+            # Workers needed to keep up at the target utilization (Little's law),
+            # plus enough to clear the current backlog within one interval
+            needed = math.ceil((arrival_rate * latency + backlog * latency / interval)
+                               / config["high_utilization"])
+            
+            if utilization >= config["high_utilization"] and backlog > workers:
+                busy_samples += 1
+                idle_samples = 0
+            elif utilization <= config["low_utilization"] and backlog == 0:
+                idle_samples += 1
+                busy_samples = 0
+            else:
+                busy_samples = idle_samples = 0
+                
+            if busy_samples >= config["scale_up_after"] and workers < config["max_workers"]:
+                target = min(config["max_workers"], max(workers + 1, needed))
+                self._resize(target, f"backlog={backlog} utilization={utilization:.0%} "
+                                     f"latency={latency * 1000:.1f}ms")
+                busy_samples = 0
+            elif idle_samples >= config["scale_down_after"] and workers > config["min_workers"]:
+                # Halve at most per step: the next wave may be close behind
+                target = max(config["min_workers"], min(workers - 1, max(needed, workers // 2)))
+                self._resize(target, f"idle utilization={utilization:.0%}")
+                idle_samples = 0
+                
+        if self.running and self.worker_count > config["min_workers"]:
+            self._resize(config["min_workers"], "end of stream")
+                
+    def _resize(self, target: int, reason: str = ""):
+        """Start workers or retire them with poison pills"""
+        old = self.worker_count
+        if target == old or not self.running:
+            return
+        if target > old:
+            for _ in range(target - old):
+                self._add_worker()
+        else:
+            for _ in range(old - target):
+                self.input_queue.put((0, None))
+        self.worker_count = target
+        self.workers = [w for w in self.workers if w.is_alive()]
+        self.scale_events.append((time.time(), old, target, reason))
+        print(f"⚖️ {self.name}: workers {old} → {target} ({reason})")
+        
     def _worker_func(self, worker_id: int):
         """Worker processes items from input queue"""
         while self.running:
@@ -47,10 +172,18 @@ class OrderedProcessingNode(SynchronizedNode):
                     break
                     
                 # Process the job (simulated)
+                started = time.perf_counter()
                 result = self._process_item(job)
+                finished = time.perf_counter()
+                elapsed = finished - started
+                
+                if tracing.ACTIVE is not None and job.trace_id is not None:
+                    self._trace_worker(sequence, job, result, started, finished)
                 
                 # Put in output queue with sequence
                 with self.output_lock:
+                    self.worker_time += elapsed
+                    self.items_done += 1
                     self.output_queue.put((sequence, result))
                     
             except:
@@ -58,7 +191,7 @@ class OrderedProcessingNode(SynchronizedNode):
                 
     def _output_coordinator(self):
         """Coordinates output to maintain order"""
-        buffer = {}
+        buffer = self.reorder
         
         while self.running:
             try:
@@ -68,34 +201,107 @@ class OrderedProcessingNode(SynchronizedNode):
                 
                 # Output in order
                 while self.next_output in buffer:
-                    result = buffer.pop(self.next_output)
-                    for output in self.outputs:
-                        output.put(result)
-                    self.next_output += 1
+                    with self.emit_lock:
+                        result = buffer.pop(self.next_output)
+                        if tracing.ACTIVE is not None and result.trace_id is not None:
+                            released = tracing.ACTIVE.pop_mark((self.name, "reorder", self.next_output))
+                            if released is not None:
+                                tracing.ACTIVE.span("reorder_wait", result, released, time.perf_counter(),
+                                                    node=self.name, sequence=self.next_output)
+                        self._emit(result)
+                        self.dispatched.pop(self.next_output, None)
+                        self.next_output += 1
                     
             except:
                 continue
                 
+    def _trace_worker(self, sequence: int, job: ImageJob, result: ImageJob,
+                      started: float, finished: float):
+        """Record queue and worker spans, then mark the start of the reorder wait"""
+        tracer = tracing.ACTIVE
+        queued = tracer.pop_mark((self.name, "queued", sequence))
+        if queued is not None:
+            tracer.span("worker_queue", job, queued, started, node=self.name, sequence=sequence)
+        tracer.span("worker_process", job, started, finished, node=self.name, sequence=sequence)
+        if result.trace_id is None:
+            result.trace_id = job.trace_id
+        tracer.mark((self.name, "reorder", sequence), finished)
+        
     def _process_item(self, job: ImageJob) -> ImageJob:
         """Process single item - override in subclasses"""
         result = job.copy()
         result.add_transformation(f"parallel_processed_by_{self.name}")
         return result
         
+    def on_end_of_stream(self):
+        """Let the coordinator emit every dispatched item before closing outputs"""
+        while self.running and self.next_output < self.sequence_counter:
+            time.sleep(0.001)
+        return None
+        
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["process_time"] = self.worker_time
+        stats["workers"] = self.worker_count
+        stats["completed"] = self.items_done
+        if self.autoscale is not None:
+            stats["scale_events"] = len(self.scale_events)
+        stats["pending"] = self.sequence_counter - self.next_output
+        return stats
+        
     def process(self, inputs):
         """Override to use parallel processing"""
         job = inputs["in_0"][0]
         sequence = self.sequence_counter
         self.sequence_counter += 1
+        if tracing.ACTIVE is not None and job.trace_id is not None:
+            tracing.ACTIVE.mark((self.name, "queued", sequence))
+        self.dispatched[sequence] = job
         self.input_queue.put((sequence, job))
         return None  # Output handled by coordinator
         
-    def stop(self):
+    def _pass_barrier(self):
+        # Results emitted after this point follow the barrier downstream
+        with self.emit_lock:
+            super()._pass_barrier()
+            
+    def snapshot_state(self) -> dict:
+        """Counters, finished results still waiting for their turn and the
+        inputs of items in the workers - those are processed again on resume"""
+        state = super().snapshot_state()
+        reorder = dict(self.reorder)
+        state["sequence_counter"] = self.sequence_counter
+        state["next_output"] = self.next_output
+        state["reorder"] = reorder
+        state["dispatched"] = {sequence: job for sequence, job in dict(self.dispatched).items()
+                               if sequence not in reorder}
+        return state
+        
+    def restore_state(self, state: dict):
+        super().restore_state(state)
+        self.sequence_counter = state["sequence_counter"]
+        self.next_output = state["next_output"]
+        for sequence, result in state["reorder"].items():
+            self.output_queue.put((sequence, result))
+        for sequence, job in sorted(state["dispatched"].items(), key=lambda entry: entry[0]):
+            self.dispatched[sequence] = job
+            self.input_queue.put((sequence, job))
+        
+    def request_stop(self):
         """Stop all workers"""
         self.running = False
         # Send poison pills to workers
         for _ in range(self.worker_count):
             self.input_queue.put((0, None))
-        for worker in self.workers:
-            worker.join(timeout=1.0)
-        super().stop()
\ No newline at end of file
+            
+    def join(self, timeout: Optional[float] = None):
+        deadline = None if timeout is None else time.time() + timeout
+        for thread in [self.thread, self.coordinator, self.scaler] + self.workers:
+            if thread:
+                thread.join(None if deadline is None else max(0.0, deadline - time.time()))
+                
+    def is_alive(self) -> bool:
+        return any(t.is_alive() for t in [self.thread, self.coordinator, self.scaler] + self.workers if t)
+        
+    def in_flight(self) -> int:
+        return super().in_flight() + self.sequence_counter - self.next_output
@@ -1,10 +1,24 @@
-# Pipeline package
-from .builder import PipelineBuilder
-from .with_cycles import PipelineWithCycles
-from .completion import CompletionAwarePipeline
+# Pipeline package - classes are imported on first use (PEP 562)
+import importlib
+
+_EXPORTS = {
+    'PipelineBuilder': '.builder',
+    'PipelineWithCycles': '.with_cycles',
+    'CompletionAwarePipeline': '.completion',
+}
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
 
 __all__ = [
     'PipelineBuilder',
     'PipelineWithCycles',
     'CompletionAwarePipeline'
-]
\ No newline at end of file
+]
@@ -1,4 +1,4 @@
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 from ..core import PipelineDSL, Channel, NodeDSL
 from model.image_job import ImageJob
 
@@ -16,11 +16,32 @@ class PipelineBuilder(PipelineDSL):
         
     def connect(self, from_node: str, from_port: int, 
                 to_node: str, to_port: int, 
-                channel_type: type = ImageJob):
-        """Connect nodes with type checking"""
+                channel_type: type = ImageJob,
+                capacity: int = 0,
+                spill_dir: Optional[str] = None,
+                spill_limit: Optional[int] = None,
+                remote: Optional[str] = None):
+        """Connect nodes with type checking (capacity 0 = unbounded channel)
+
+        With spill_dir the channel keeps capacity items (default 1024) in
+        memory and spills the rest to segment files under spill_dir, up to
+        spill_limit bytes (see dsl.spill.SpillChannel).
+
+        With remote ("tcp://host:port" or "unix:///path") the nodes may live
+        in different processes: only the local one needs adding here, and
+        the receiving side listens on the address (see dsl.remote).
+        """
         # Create channel
         channel_name = f"{from_node}_{from_port}_to_{to_node}_{to_port}"
-        channel = Channel(channel_name, channel_type)
+        if remote is not None:
+            return self._connect_remote(from_node, from_port, to_node, to_port,
+                                        channel_name, channel_type, capacity, remote)
+        if spill_dir is not None:
+            from ..spill import SpillChannel
+            channel = SpillChannel(channel_name, channel_type, memory_items=capacity or 1024,
+                                   directory=spill_dir, disk_limit=spill_limit)
+        else:
+            channel = Channel(channel_name, channel_type, maxsize=capacity)
         self.add_channel(channel)
         self.channel_map[channel_name] = channel
         
@@ -34,6 +55,25 @@ class PipelineBuilder(PipelineDSL):
         self.connections.append((from_node, from_port, to_node, to_port))
         return self
         
+    def _connect_remote(self, from_node: str, from_port: int, to_node: str, to_port: int,
+                        channel_name: str, channel_type: type, capacity: int, address: str):
+        if from_node not in self.node_map and to_node not in self.node_map:
+            raise KeyError(f"Neither '{from_node}' nor '{to_node}' is in pipeline '{self.name}'")
+        from ..remote import RemoteReceiver, RemoteSender
+        if to_node in self.node_map:
+            receiver = RemoteReceiver(channel_name, channel_type, address, window=capacity or 1024)
+            self.add_channel(receiver)
+            self.channel_map[channel_name] = receiver
+            self.node_map[to_node].add_input(receiver)
+            address = receiver.address  # Port 0 resolved, for a local sender
+        if from_node in self.node_map:
+            sender = RemoteSender(channel_name, channel_type, address, capacity=capacity or 1024)
+            self.add_channel(sender)
+            self.channel_map.setdefault(channel_name, sender)
+            self.node_map[from_node].add_output(sender)
+        self.connections.append((from_node, from_port, to_node, to_port))
+        return self
+
     def build(self):
         """Validate and build pipeline"""
         self._validate_connections()
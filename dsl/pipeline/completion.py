@@ -1,7 +1,7 @@
 import threading
 import time
 from ..core import PipelineDSL
-from ..monitoring import PipelineMonitor
+from ..monitoring import PipelineMonitor, DeadlockDetector
 
 class CompletionAwarePipeline(PipelineDSL):
     """Pipeline with completion detection and timeout"""
@@ -11,14 +11,21 @@ class CompletionAwarePipeline(PipelineDSL):
         self.start_time = None  # type: float | None
         self.end_time = None    # type: float | None
         self.completed = False
+        self.timed_out = False
         self.completion_event = threading.Event()
         self.monitor = None     # type: PipelineMonitor | None
         self.timeout_thread = None  # type: threading.Thread | None
+        self.completion_thread = None  # type: threading.Thread | None
+        self.deadlock_detector = DeadlockDetector(self, on_deadlock=self._on_deadlock)
+        self.deadlock = None    # type: list | None
         
     def start(self):
         """Start pipeline with monitoring"""
         self.start_time = time.time()
         self.completed = False
+        self.timed_out = False
+        self.deadlock = None
+        self.completion_event.clear()
         
         # Start timeout monitor
         self.timeout_thread = threading.Thread(
@@ -33,16 +40,43 @@ class CompletionAwarePipeline(PipelineDSL):
             
         super().start()
         
+        # Completes as soon as end-of-stream reaches every sink
+        self.completion_thread = threading.Thread(
+            target=self._completion_watcher,
+            name=f"{self.name}_completion_watcher"
+        )
+        self.completion_thread.start()
+        
+        # Stuck (not just slow) pipelines are reported within milliseconds
+        self.deadlock_detector.start()
+        
     def _timeout_monitor(self):
         """Monitor for timeout"""
         while not self.completion_event.is_set():
             elapsed = time.time() - (self.start_time or 0)
             if elapsed > self.timeout:
                 print(f"⏰ TIMEOUT: Pipeline '{self.name}' exceeded {self.timeout}s")
+                self.timed_out = True
                 self._diagnose_stuck()
                 self.completion_event.set()
                 break
-            time.sleep(0.1)
+            self.completion_event.wait(0.1)
+            
+    def _completion_watcher(self):
+        """Set completion_event the moment every sink has finished"""
+        for node in self.sink_nodes():
+            while not node.exited.wait(0.1):
+                if self.completion_event.is_set():
+                    return
+            if not node.finished.is_set():
+                return  # Stopped, not completed - left to stop() or the timeout
+        self.completion_event.set()
+            
+    def _on_deadlock(self, cycle):
+        """Called by the deadlock detector - end the wait instead of timing out"""
+        self.deadlock = cycle
+        self._diagnose_stuck()
+        self.completion_event.set()
             
     def _diagnose_stuck(self):
         """Diagnose why pipeline is stuck"""
@@ -54,8 +88,17 @@ class CompletionAwarePipeline(PipelineDSL):
         
         # Check channel states
         for channel in self.channels:
-            if channel.size() > 10:  # Arbitrary threshold
-                print(f"  Channel '{channel.name}' has {channel.size()} pending items")
+            pending = channel.pending()
+            if pending:
+                capacity = f"/{channel.queue.maxsize}" if channel.queue.maxsize else ""
+                print(f"  Channel '{channel.name}' has {pending}{capacity} pending items")
+                
+        # Who waits for whom
+        edges = self.deadlock_detector.wait_for_graph()
+        if edges:
+            print("  Wait-for graph:")
+            for edge in edges:
+                print(f"    {edge}")
                 
         # Check for cycles
         if hasattr(self, 'cycles'):
@@ -66,12 +109,18 @@ class CompletionAwarePipeline(PipelineDSL):
     def wait_for_completion(self, timeout=None):
         """Wait for pipeline completion"""
         timeout = timeout or self.timeout
-        result = self.completion_event.wait(timeout)
+        result = (self.completion_event.wait(timeout)
+                  and not self.timed_out and self.deadlock is None
+                  and all(node.finished.is_set() for node in self.sink_nodes()))
         
         if result:
             self.completed = True
             self.end_time = time.time()
             print(f"✅ Pipeline '{self.name}' completed in {self.end_time - self.start_time:.2f}s")
+        elif self.deadlock:
+            print(f"⚠️ Pipeline '{self.name}' is deadlocked")
+        elif self.completion_event.is_set() and not self.timed_out:
+            print(f"⚠️ Pipeline '{self.name}' was stopped before completing")
         else:
             print(f"⚠️ Pipeline '{self.name}' did not complete in {timeout}s")
             
@@ -82,11 +131,14 @@ class CompletionAwarePipeline(PipelineDSL):
         self.monitor = monitor
         self.monitor.attach_pipeline(self)
         
-    def stop(self):
+    def stop(self, timeout: float = 1.0):
         """Stop pipeline and cleanup"""
         self.completion_event.set()
         if self.timeout_thread:
             self.timeout_thread.join(timeout=1.0)
+        if self.completion_thread:
+            self.completion_thread.join(timeout=1.0)
+        self.deadlock_detector.stop()
         if self.monitor:
             self.monitor.stop()
-        super().stop()
\ No newline at end of file
+        super().stop(timeout)
\ No newline at end of file
@@ -1,32 +1,232 @@
+import threading
+from queue import Empty
 from typing import Dict, Any, Callable, Optional, List
-from ..core import PipelineDSL, Channel
+from ..core import Channel, NodeDSL, END_OF_STREAM
+from ..monitoring import DeadlockDetector
+from ..nodes.base import SynchronizedNode
+from .builder import PipelineBuilder
 from model.image_job import ImageJob
 
-class PipelineWithCycles(PipelineDSL):
+DEFAULT_CYCLE_CREDITS = 64
+
+class CycleGate(SynchronizedNode):
+    """Entry of a feedback cycle: merges re-injected jobs with new ones.
+
+    A new job is only admitted while fewer than `credits` jobs are inside the
+    loop, and the feedback channel holds `credits` items, so re-injecting can
+    never block on the loop's own channels. Re-injected jobs go first.
+    """
+    checkpointable = False  # Jobs circulating in the loop are not captured
+    
+    def __init__(self, name: str, feedback: Channel, credits: int):
+        super().__init__(name, {"in_0": 1})
+        self.feedback = feedback
+        self.credits = credits
+        self.in_loop = 0
+        self.loop_changed = threading.Condition()
+
+    def admit(self) -> bool:
+        with self.loop_changed:
+            if self.in_loop < self.credits:
+                self.in_loop += 1
+                return True
+            return False
+
+    def release(self):
+        """A job has left the loop"""
+        with self.loop_changed:
+            self.in_loop -= 1
+            self.loop_changed.notify()
+
+    def reinject(self, job: ImageJob, sender: NodeDSL):
+        """Send a job back to the loop entry (it keeps its credit)"""
+        sender._send(self.feedback, job)
+        with self.loop_changed:
+            self.loop_changed.notify()
+
+    def _run(self):
+        external = self.inputs[0]
+        external_open = True
+        while self.running:
+            item = None
+            try:
+                item = self.feedback.get(block=False)
+            except Empty:
+                pass
+
+            if item is None and external_open and self.admit():
+                try:
+                    # Short wait while jobs circulate so they are not held up
+                    item = external.get(timeout=0.01 if self.in_loop > 1 else 0.1)
+                except Empty:
+                    self.release()
+                    continue
+                if item is END_OF_STREAM:
+                    external_open = False
+                    self.release()
+                    continue
+
+            if item is None:
+                if not external_open and self.in_loop == 0:
+                    self.end_of_stream = True
+                    break
+                # Loop is full or input has ended: wait for a job to come around or leave
+                with self.loop_changed:
+                    if self.feedback.empty() and (self.in_loop >= self.credits or not external_open):
+                        self.loop_changed.wait(0.1)
+                continue
+
+            self._send(self.outputs[0], item)
+            self.processed_count += 1
+        self._finish()
+
+    def in_flight(self) -> int:
+        return self.feedback.pending()
+
+class PipelineWithCycles(PipelineBuilder):
     """Pipeline supporting feedback loops/cycles"""
     def __init__(self, name: str):
         super().__init__(name)
         self.cycles: List[Dict[str, Any]] = []
+        self.cycles_lock = threading.Lock()  # Routes run on the exit nodes' threads
         
     def add_cycle(self, from_node: str, to_node: str, 
                   max_iterations: int = 10,
                   condition: Optional[Callable[[ImageJob], bool]] = None,
-                  description: str = ""):
-        """Add a feedback cycle with safety limits"""
+                  description: str = "",
+                  to_port: int = 0,
+                  credits: Optional[int] = None):
+        """Add a feedback cycle with safety limits
+
+        Jobs leaving from_node go back to input port to_port of to_node while
+        condition(job) holds and job.cycle_count < max_iterations. credits caps
+        how many jobs are inside the loop at once (default: the smallest
+        capacity of a bounded channel on the loop, else 64). Every node
+        between to_node and from_node must emit one job per job it takes
+        (no splitting, stitching or selection), as credits are returned per
+        job leaving the loop.
+        """
         if max_iterations <= 0:
             raise ValueError("max_iterations must be > 0 to prevent infinite loops")
+        if credits is not None and credits <= 0:
+            raise ValueError("credits must be > 0")
             
         cycle = {
             "from_node": from_node,
             "to_node": to_node,
+            "to_port": to_port,
             "max_iterations": max_iterations,
             "condition": condition,
             "description": description,
-            "iteration_count": 0
+            "credits": credits,
+            "iteration_count": 0,
+            "gate": None
         }
         self.cycles.append(cycle)
         return self
         
+    def build(self):
+        """Validate and build pipeline, turning cycles into real edges"""
+        super().build()
+        for cycle_id, cycle in enumerate(self.cycles):
+            if cycle["gate"] is None:
+                self._wire_cycle(cycle_id, cycle)
+        return self
+        
+    def start(self):
+        self.build()
+        super().start()
+        
+    def _loop_channels(self, entry: NodeDSL, exit_node: NodeDSL) -> Optional[List[Channel]]:
+        """Channels on a path entry -> ... -> exit_node, or None if unreachable"""
+        consumers = {}
+        for node in self.nodes:
+            for channel in node.inputs:
+                consumers[id(channel)] = node
+        paths = {id(entry): []}
+        frontier = [entry]
+        while frontier:
+            node = frontier.pop(0)
+            if node is exit_node:
+                return paths[id(node)]
+            for channel in node.outputs:
+                nxt = consumers.get(id(channel))
+                if nxt is not None and id(nxt) not in paths:
+                    paths[id(nxt)] = paths[id(node)] + [channel]
+                    frontier.append(nxt)
+        return None
+        
+    def _loop_nodes(self, entry: NodeDSL, exit_node: NodeDSL) -> List[NodeDSL]:
+        """Nodes on any path entry -> ... -> exit_node"""
+        producers, consumers = {}, {}
+        for node in self.nodes:
+            for channel in node.outputs:
+                producers[id(channel)] = node
+            for channel in node.inputs:
+                consumers[id(channel)] = node
+        
+        def reachable(start, edges, links):
+            seen = {id(start): start}
+            frontier = [start]
+            while frontier:
+                for channel in edges(frontier.pop()):
+                    nxt = links.get(id(channel))
+                    if nxt is not None and id(nxt) not in seen:
+                        seen[id(nxt)] = nxt
+                        frontier.append(nxt)
+            return seen
+            
+        downstream = reachable(entry, lambda node: node.outputs, consumers)
+        upstream = reachable(exit_node, lambda node: node.inputs, producers)
+        return [node for key, node in downstream.items() if key in upstream]
+        
+    def _wire_cycle(self, cycle_id: int, cycle: Dict[str, Any]):
+        """Insert a CycleGate in front of to_node and a feedback route on from_node"""
+        exit_node = self.node_map[cycle["from_node"]]
+        entry = self.node_map[cycle["to_node"]]
+        port = cycle["to_port"]
+        if port >= len(entry.inputs):
+            raise ValueError(f"Cycle target '{cycle['to_node']}' has no input port {port} - connect it first")
+            
+        loop = self._loop_channels(entry, exit_node)
+        if loop is None:
+            raise ValueError(f"Cycle '{cycle['description']}': '{cycle['from_node']}' "
+                             f"is not downstream of '{cycle['to_node']}'")
+        fanning = [node.name for node in self._loop_nodes(entry, exit_node) if not node.one_to_one]
+        if fanning:
+            raise ValueError(f"Cycle '{cycle['description']}': loop credits need one job out per job in, "
+                             f"but {', '.join(fanning)} split, stitch or select jobs inside the loop")
+        if cycle["credits"] is None:
+            bounded = [ch.queue.maxsize for ch in loop if ch.queue.maxsize]
+            cycle["credits"] = min(bounded) if bounded else DEFAULT_CYCLE_CREDITS
+            
+        prefix = f"cycle_{cycle_id}"
+        feedback = Channel(f"{prefix}_{cycle['from_node']}_to_{cycle['to_node']}",
+                           maxsize=cycle["credits"])
+        gate = CycleGate(f"{prefix}_gate", feedback, cycle["credits"])
+        
+        # external channel -> gate -> to_node
+        external = entry.inputs[port]
+        gate_out = Channel(f"{prefix}_gate_to_{cycle['to_node']}_{port}", external.data_type)
+        gate.add_input(external)
+        gate.add_output(gate_out)
+        entry.inputs[port] = gate_out
+        
+        self.add_node(f"{prefix}_gate", gate)
+        self.add_channel(feedback)
+        self.add_channel(gate_out)
+        cycle["gate"] = gate
+        
+        def route(job: ImageJob) -> bool:
+            looped = self._process_with_cycle(job, cycle_id)
+            if looped is job:
+                gate.release()  # Leaves the loop downstream
+                return False
+            gate.reinject(looped, exit_node)
+            return True
+            
+        exit_node.feedback_routes.append(route)
+        
     def _process_with_cycle(self, job: ImageJob, cycle_id: int) -> ImageJob:
         """Process job through a cycle"""
         cycle = self.cycles[cycle_id]
@@ -45,15 +245,20 @@ class PipelineWithCycles(PipelineDSL):
         result.cycle_count += 1
         result.add_transformation(f"cycle_{cycle_id}_iteration_{result.cycle_count}")
         
-        cycle["iteration_count"] += 1
+        with self.cycles_lock:
+            cycle["iteration_count"] += 1
         
         return result
         
     def _detect_deadlock(self) -> bool:
-        """Detect potential deadlocks in cycles"""
+        """Detect deadlocks: a cycle in the wait-for graph or a runaway cycle"""
+        wait_cycle = DeadlockDetector(self).find_cycle()
+        if wait_cycle:
+            print(DeadlockDetector.format_cycle(wait_cycle))
+            return True
         for cycle in self.cycles:
             if cycle["iteration_count"] > cycle["max_iterations"] * 100:
-                # Excessive iterations suggest deadlock
+                # Excessive iterations suggest a livelock
                 print(f"🚨 DEADLOCK DETECTED in cycle {cycle['description']}")
                 print(f"   Iterations: {cycle['iteration_count']}, Max: {cycle['max_iterations']}")
                 return True
@@ -0,0 +1,115 @@
+"""
+Node types by name, imported on first use.
+
+Built-in types are registered as "module:attr" strings, so looking one up
+imports only the module that defines it. Third-party packages add node
+types through the "dsl.nodes" entry point group:
+
+    # pyproject.toml of a plugin package
+    [project.entry-points."dsl.nodes"]
+    denoise = "my_nodes.denoise:DenoiseNode"
+
+or at runtime with register():
+
+    @register("denoise", strength=0.5)
+    class DenoiseNode(SynchronizedNode): ...
+
+    create("denoise", "dn1")   # DenoiseNode(name="dn1", strength=0.5)
+
+A factory is called with name= and its keyword arguments, on top of the
+defaults given at registration. Entry points are only scanned when a name
+is not registered otherwise (or all names are listed); built-ins win.
+"""
+import importlib
+from typing import Any, Callable, Dict, List, Optional, Union
+
+PLUGIN_GROUP = "dsl.nodes"
+
+
+class NodeRegistry:
+    """Name -> node factory (a callable, or "module:attr" imported when first used)"""
+    def __init__(self, group: Optional[str] = PLUGIN_GROUP):
+        self.targets: Dict[str, Union[str, Callable]] = {}
+        self.defaults: Dict[str, dict] = {}
+        self.resolved: Dict[str, Callable] = {}
+        self.group = group
+        self.plugins_loaded = group is None
+
+    def register(self, name: str, target: Union[str, Callable, None] = None,
+                 replace: bool = False, **defaults):
+        """Register target as node type name; without target, a decorator"""
+        if target is None:
+            def decorator(factory: Callable) -> Callable:
+                self.register(name, factory, replace, **defaults)
+                return factory
+            return decorator
+        if name in self.targets and not replace:
+            raise ValueError(f"Node type '{name}' is already registered")
+        self.targets[name] = target
+        self.defaults[name] = defaults
+        self.resolved.pop(name, None)
+        return target
+
+    def _load_plugins(self):
+        self.plugins_loaded = True
+        from importlib.metadata import entry_points
+        for entry in entry_points(group=self.group):
+            if entry.name not in self.targets:
+                self.targets[entry.name] = entry.value
+                self.defaults[entry.name] = {}
+
+    def resolve(self, name: str) -> Callable:
+        """The factory for name, importing its module if needed"""
+        factory = self.resolved.get(name)
+        if factory is None:
+            if name not in self.targets and not self.plugins_loaded:
+                self._load_plugins()
+            target = self.targets.get(name)
+            if target is None:
+                raise ValueError(f"Unknown node type: {name}")
+            if isinstance(target, str):
+                module, _, attr = target.partition(":")
+                factory = getattr(importlib.import_module(module), attr)
+            else:
+                factory = target
+            self.resolved[name] = factory
+        return factory
+
+    def create(self, node_type: str, name: str, **kwargs) -> Any:
+        """A new node of node_type called name"""
+        factory = self.resolve(node_type)
+        defaults = self.defaults[node_type]
+        return factory(name=name, **({**defaults, **kwargs} if defaults else kwargs))
+
+    def check(self, node_type: str, kwargs: dict):
+        """Raise TypeError if create(node_type, ..., **kwargs) would not accept kwargs"""
+        import inspect
+        inspect.signature(self.resolve(node_type)).bind(name=None, **{**self.defaults[node_type], **kwargs})
+
+    def names(self) -> List[str]:
+        if not self.plugins_loaded:
+            self._load_plugins()
+        return sorted(self.targets)
+
+    def __contains__(self, name: str) -> bool:
+        if name not in self.targets and not self.plugins_loaded:
+            self._load_plugins()
+        return name in self.targets
+
+
+REGISTRY = NodeRegistry()
+register = REGISTRY.register
+create = REGISTRY.create
+
+# node().of_type() kinds
+register("1-to-1", "dsl.nodes.filters:OneToOneNode", operation="transform")
+register("type", "dsl.nodes.filters:TypeTransformNode", target_format="JPG")
+register("n-to-1", "dsl.nodes.filters:NToOneNode")
+register("1-to-n", "dsl.nodes.filters:OneToNNode")
+register("selection", "dsl.nodes.filters:SelectionNode")
+register("summator", "dsl.nodes.filters:SummatorNode")
+# dsl_api factories
+for _name in ("source", "sink", "blur", "convert", "stitch", "split", "select_best",
+              "configurable", "parallel", "score_quality", "tone"):
+    register(_name, f"dsl.dsl_api:{_name}")
+del _name
@@ -0,0 +1,403 @@
+"""
+Channels between processes, over TCP or Unix sockets.
+
+A remote connection is two channels: a RemoteSender in the producing
+process (its node put()s into it as usual) and a RemoteReceiver in the
+consuming process (its node get()s from it). The receiver listens on the
+address, the sender connects to it:
+
+    # ingest box                              # stitch box
+    pipe.connect("ingest", 0, "stitch", 0,    pipe.connect("ingest", 0, "stitch", 0,
+                 remote="tcp://stitch:9000")               remote="tcp://0.0.0.0:9000")
+
+Each process only has one of the two nodes; connect() builds the end that
+is local. With both nodes in one process it builds both ends over the
+socket (handy for trying it out on localhost).
+
+Protocol, one message = header (kind, payload length, u64 value) + payload:
+  H  sender -> receiver  hello, payload is the channel name
+  W/P                    a batch of items (model.wire for ImageJobs, pickle
+                         otherwise), value is the batch sequence number
+  R  receiver -> sender  reply to hello: last sequence received, and the
+                         credit (items the receiver will take) to start with
+  C                      acknowledgement of a sequence number plus more credit
+
+Flow control is by credit: the receiver grants `window` items up front and
+grants more as its node consumes them, so at most `window` items are ever
+queued or in flight towards it and a slow consumer slows the producer down
+through the sender's bounded local queue. The sender batches whatever is
+queued (up to batch items/batch_bytes of payload) into one message.
+
+Batches stay in the sender until acknowledged. When the connection drops,
+the sender reconnects (backing off up to max_backoff seconds) and sends the
+unacknowledged batches again; the receiver drops the ones it already has
+by sequence number, so every item arrives once and in order. Checkpoint
+barriers do not cross processes - checkpoint each side separately.
+"""
+import os
+import select
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from queue import Empty
+from typing import Any, Deque, List, Optional, Tuple
+from .core import Channel, CheckpointBarrier, END_OF_STREAM
+from .spill import decode_items, encode_items, _payload_bytes
+from model.image_job import ImageJob
+
+MESSAGE = struct.Struct("<cIQ")  # kind, payload length, value (sequence number)
+CREDIT = struct.Struct("<I")
+HELLO, RESET, ACK = b"H", b"R", b"C"
+DATA = (b"W", b"P")
+
+
+def parse_address(address: str) -> Tuple[int, Any]:
+    """(socket family, address) for "tcp://host:port" or "unix:///path" """
+    if address.startswith("unix://"):
+        return socket.AF_UNIX, address[len("unix://"):]
+    if address.startswith("tcp://"):
+        host, _, port = address[len("tcp://"):].rpartition(":")
+        if not host or not port.isdigit():
+            raise ValueError(f"Bad address '{address}' (expected tcp://host:port)")
+        return socket.AF_INET, (host.strip("[]"), int(port))
+    raise ValueError(f"Bad address '{address}' (expected tcp://host:port or unix:///path)")
+
+
+def _send(sock: socket.socket, kind: bytes, value: int, payload: bytes = b""):
+    sock.sendall(MESSAGE.pack(kind, len(payload), value))
+    if payload:
+        sock.sendall(payload)
+
+
+def _recv_exact(sock: socket.socket, length: int) -> bytearray:
+    data = bytearray(length)
+    view = memoryview(data)
+    received = 0
+    while received < length:
+        n = sock.recv_into(view[received:])
+        if not n:
+            raise ConnectionError("Connection closed by peer")
+        received += n
+    return data
+
+
+def _recv(sock: socket.socket) -> Tuple[bytes, int, bytearray]:
+    kind, length, value = MESSAGE.unpack(_recv_exact(sock, MESSAGE.size))
+    return kind, value, _recv_exact(sock, length)
+
+
+def _readable(sock: socket.socket, timeout: float) -> bool:
+    return bool(select.select([sock], [], [], timeout)[0])
+
+
+class RemoteSender(Channel):
+    """Producing end: items put() here are delivered to the RemoteReceiver
+    listening on address. put() blocks once capacity items are waiting for
+    credit or a connection."""
+    def __init__(self, name: str, data_type: type = ImageJob, address: str = "tcp://127.0.0.1:9000",
+                 capacity: int = 1024, batch: int = 256, batch_bytes: int = 4 << 20,
+                 max_backoff: float = 2.0):
+        super().__init__(name, data_type, maxsize=capacity)
+        self.address = address
+        self.family, self.target = parse_address(address)
+        self.batch = batch
+        self.batch_bytes = batch_bytes
+        self.max_backoff = max_backoff
+
+        self.sock: Optional[socket.socket] = None
+        self.credit = 0
+        self.next_seq = 1
+        self.unacked: Deque[Tuple[int, bytes, bytes, int]] = deque()  # seq, kind, payload, items
+        self.carry: Optional[Any] = None  # End-of-stream taken while a batch was being filled
+        self.delivered = threading.Event()  # End-of-stream acknowledged
+
+        self.sent = 0
+        self.bytes_sent = 0
+        self.batches = 0
+        self.resent = 0
+        self.reconnects = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name=f"RemoteSender-{name}", daemon=True)
+        self.thread.start()
+
+    # ---- connection ----
+
+    def _connect(self) -> bool:
+        """Connect (retrying with backoff), say hello and resend what is unacknowledged"""
+        delay = 0.05
+        while self.running:
+            sock = socket.socket(self.family, socket.SOCK_STREAM)
+            try:
+                sock.settimeout(10.0)
+                sock.connect(self.target)
+                if self.family == socket.AF_INET:
+                    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                _send(sock, HELLO, 0, self.name.encode())
+                kind, acked, payload = _recv(sock)
+                if kind != RESET:
+                    raise ConnectionError(f"Unexpected reply {kind!r} to hello")
+                sock.settimeout(None)
+            except OSError:
+                sock.close()
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_backoff)
+                continue
+            self.sock = sock
+            self._ack(acked)
+            (self.credit,) = CREDIT.unpack(payload)
+            for seq, kind, data, count in self.unacked:
+                _send(sock, kind, seq, data)
+                self.credit -= count
+                self.resent += count
+            return True
+        return False
+
+    def _disconnect(self, error: Exception):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        if self.running:
+            self.reconnects += 1
+            print(f"⚠️ Remote channel '{self.name}' lost {self.address} ({error}) - reconnecting")
+
+    # ---- sending ----
+
+    def _ack(self, seq: int):
+        unacked = self.unacked
+        while unacked and unacked[0][0] <= seq:
+            unacked.popleft()
+        if self.closed and not unacked and self.queue.empty() and self.carry is None:
+            self.delivered.set()
+
+    def _receive(self, timeout: float):
+        """Handle the receiver's acknowledgements and credit, waiting up to timeout for the first"""
+        sock = self.sock
+        while not self.delivered.is_set() and _readable(sock, timeout):
+            kind, seq, payload = _recv(sock)
+            if kind != ACK:
+                raise ConnectionError(f"Unexpected message {kind!r}")
+            self.credit += CREDIT.unpack(payload)[0]
+            self._ack(seq)
+            timeout = 0.0
+
+    def _take(self, limit: int) -> List[Any]:
+        """Up to limit queued items (waiting briefly for the first); end-of-stream goes alone"""
+        if self.carry is not None:
+            item, self.carry = self.carry, None
+            return [item]
+        try:
+            item = self.queue.get(timeout=0.05)
+        except Empty:
+            return []
+        items, size = [], 0
+        while True:
+            if type(item) is CheckpointBarrier:
+                pass  # Barriers do not cross processes
+            elif item is END_OF_STREAM and items:
+                self.carry = item
+                break
+            else:
+                items.append(item)
+                size += _payload_bytes(item)
+                if item is END_OF_STREAM or len(items) >= limit or size >= self.batch_bytes:
+                    break
+            try:
+                item = self.queue.get_nowait()
+            except Empty:
+                break
+        return items
+
+    def _send_batch(self, items: List[Any]):
+        kind, payload = encode_items(items)
+        seq = self.next_seq
+        self.next_seq += 1
+        self.unacked.append((seq, kind, payload, len(items)))
+        self.credit -= len(items)
+        self.sent += len(items)
+        self.bytes_sent += MESSAGE.size + len(payload)
+        self.batches += 1
+        _send(self.sock, kind, seq, payload)
+
+    def _run(self):
+        while self.running and not self.delivered.is_set():
+            try:
+                if self.sock is None and not self._connect():
+                    break
+                if self.credit <= 0 or (self.carry is None and self.closed and self.queue.empty()):
+                    # Out of credit, or everything sent and waiting for the last acknowledgement
+                    self._receive(0.05)
+                    continue
+                items = self._take(min(self.batch, self.credit))
+                if items:
+                    self._send_batch(items)
+                self._receive(0.0)
+            except OSError as error:
+                self._disconnect(error)
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    # ---- Channel ----
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the receiver has acknowledged end-of-stream"""
+        return self.delivered.wait(timeout)
+
+    def disconnect(self):
+        self.running = False
+        self.thread.join(timeout=1.0)
+
+    def pending(self) -> int:
+        """Items queued here or sent but not acknowledged yet"""
+        return super().pending() + sum(count for _, _, _, count in list(self.unacked))
+
+    def stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "bytes_sent": self.bytes_sent,
+            "batches": self.batches,
+            "resent": self.resent,
+            "reconnects": self.reconnects,
+            "unacked": sum(count for _, _, _, count in list(self.unacked)),
+            "credit": self.credit,
+        }
+
+    def __str__(self) -> str:
+        return f"RemoteSender<{self.data_type.__name__}>('{self.name}' -> {self.address}, size={self.size()})"
+
+
+class RemoteReceiver(Channel):
+    """Consuming end: listens on address and queues what a RemoteSender
+    sends, at most window items ahead of the consumer. Use port 0 to let
+    the system pick one (see .address)."""
+    def __init__(self, name: str, data_type: type = ImageJob, address: str = "tcp://127.0.0.1:9000",
+                 window: int = 1024):
+        super().__init__(name, data_type)
+        if window < 1:
+            raise ValueError("window must be >= 1")
+        self.window = window
+        family, target = parse_address(address)
+        self.listener = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_UNIX:
+            if os.path.exists(target):
+                os.remove(target)  # Left behind by an earlier run
+            self.path = target
+        else:
+            self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.path = None
+        self.listener.bind(target)
+        self.listener.listen(1)
+        self.listener.settimeout(0.1)
+        if family == socket.AF_INET:
+            host, port = self.listener.getsockname()[:2]
+            self.address = f"tcp://{host}:{port}"
+        else:
+            self.address = address
+
+        self.consumed = 0    # Items (markers included) taken by the consumer
+        self.granted = 0     # consumed as of the last credit sent
+        self.received = 0    # Items accepted from the sender
+        self.last_seq = 0
+        self.duplicates = 0
+        self.connections = 0
+        self.conn: Optional[socket.socket] = None
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name=f"RemoteReceiver-{name}", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        # Keeps listening after end-of-stream: a sender that missed the last
+        # acknowledgement reconnects to get it
+        while self.running:
+            try:
+                conn, _ = self.listener.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break  # Listener closed
+            self.connections += 1
+            self.conn = conn
+            try:
+                self._serve(conn)
+            except OSError as error:
+                if self.running:
+                    print(f"⚠️ Remote channel '{self.name}' lost its sender ({error}) - waiting for it")
+            finally:
+                self.conn = None
+                conn.close()
+        self._close_listener()
+
+    def _serve(self, conn: socket.socket):
+        conn.settimeout(10.0)
+        kind, _, name = _recv(conn)
+        if kind != HELLO:
+            raise ConnectionError(f"Expected hello, got {kind!r}")
+        if name.decode() != self.name:
+            print(f"⚠️ Remote channel '{self.name}' connected to sender '{name.decode()}'")
+        conn.settimeout(None)
+        if conn.family == socket.AF_INET:
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # Whatever the sender had in flight is lost or resent - start from what is queued here
+        self.granted = self.consumed
+        _send(conn, RESET, self.last_seq, CREDIT.pack(max(0, self.window - (self.received - self.consumed))))
+
+        while self.running:
+            if not _readable(conn, 0.01):
+                grant = self.consumed - self.granted
+                if grant:
+                    self.granted += grant
+                    _send(conn, ACK, self.last_seq, CREDIT.pack(grant))
+                continue
+            kind, seq, payload = _recv(conn)
+            if kind not in DATA:
+                raise ConnectionError(f"Unexpected message {kind!r}")
+            items = decode_items(kind, payload)
+            if seq <= self.last_seq:
+                # Resent after a reconnect, but it had arrived - hand its credit back
+                self.duplicates += len(items)
+                _send(conn, ACK, self.last_seq, CREDIT.pack(len(items)))
+                continue
+            for item in items:
+                Channel.put(self, item)
+            self.received += len(items)
+            self.last_seq = seq
+            grant = self.consumed - self.granted
+            self.granted += grant
+            _send(conn, ACK, seq, CREDIT.pack(grant))
+            if self.closed:
+                return
+
+    def _close_listener(self):
+        self.listener.close()
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+    # ---- Channel ----
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Any:
+        item = super().get(block, timeout)
+        self.consumed += 1
+        return item
+
+    def disconnect(self):
+        self.running = False
+        conn = self.conn
+        if conn is not None:
+            conn.close()
+        self.thread.join(timeout=1.0)
+        if self.thread.is_alive():
+            self._close_listener()
+
+    def stats(self) -> dict:
+        return {
+            "received": self.received,
+            "consumed": self.consumed,
+            "duplicates": self.duplicates,
+            "connections": self.connections,
+            "last_seq": self.last_seq,
+        }
+
+    def __str__(self) -> str:
+        return f"RemoteReceiver<{self.data_type.__name__}>('{self.name}' <- {self.address}, size={self.size()})"
@@ -0,0 +1,278 @@
+"""
+Pipelines from declarative spec files (JSON or TOML).
+
+    {
+      "name": "panorama",
+      "kind": "pipeline",                  # or "with_cycles"
+      "defaults": {"capacity": 64},        # connection options for every edge
+      "nodes": [
+        {"id": "src", "type": "source", "data": "$camera", "interval": 0},
+        {"id": "blur", "type": "blur", "radius": 1.5},
+        {"id": "out", "type": "sink", "name": "archive"}
+      ],
+      "connections": [
+        "src -> blur",
+        {"from": "blur", "from_port": 0, "to": "out", "to_port": 0, "capacity": 16}
+      ],
+      "cycles": [{"from": "blur", "to": "blur", "max_iterations": 3, "condition": "$retry"}]
+    }
+
+A node's "type" is any dsl.registry node type - the dsl_api factories
+(source, sink, blur, convert, stitch, ...), the node().of_type() kinds
+("1-to-1", "type", "n-to-1", ...) and plugin nodes; its other keys are the
+factory's arguments. Values that cannot live in a file (source data,
+journals, scorers, cycle conditions) are written "$name" and passed to
+load() in bindings. A connection with "remote" may name a node of another
+process (see dsl.remote).
+
+compile_spec() validates a spec into a plan: factories and arguments
+checked, defaults applied, connections checked for unknown nodes,
+duplicates and cycles, nodes in start order. Plans are plain JSON and
+cached under the hash of the spec (in memory, and in cache_dir if given),
+so loading a known spec again only builds the nodes.
+"""
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from . import dsl_api
+from .registry import REGISTRY
+
+PLAN_VERSION = 1
+
+CONNECTION_OPTIONS = ("capacity", "spill_dir", "spill_limit", "remote")
+CYCLE_OPTIONS = ("max_iterations", "condition", "description", "to_port", "credits")
+
+_plans: Dict[str, dict] = {}  # spec hash -> plan
+
+
+class SpecError(ValueError):
+    """The spec is not a valid pipeline"""
+
+
+def spec_hash(data: Union[bytes, dict]) -> str:
+    """Hash of a spec file's bytes, or of a spec dict (canonical JSON)"""
+    if isinstance(data, dict):
+        data = json.dumps(data, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.blake2b(data + b"\0%d" % PLAN_VERSION, digest_size=16).hexdigest()
+
+
+def parse_spec(data: bytes, path: str = "") -> dict:
+    """Spec dict from JSON, or TOML when path ends in .toml"""
+    if path.endswith(".toml"):
+        try:
+            import tomllib
+        except ImportError:
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise SpecError("TOML specs need Python 3.11+ or the tomli package") from None
+        return tomllib.loads(data.decode())
+    return json.loads(data)
+
+
+# ---- compiling ----
+
+def _references(value: Any) -> List[str]:
+    if isinstance(value, str) and value.startswith("$"):
+        return [value[1:]]
+    if isinstance(value, list):
+        return [ref for item in value for ref in _references(item)]
+    if isinstance(value, dict):
+        return [ref for item in value.values() for ref in _references(item)]
+    return []
+
+
+def _compile_node(spec: Any, position: int) -> dict:
+    if not isinstance(spec, dict) or "id" not in spec or "type" not in spec:
+        raise SpecError(f"Node #{position} needs an 'id' and a 'type'")
+    node_id, node_type = spec["id"], spec["type"]
+    kwargs = {key: value for key, value in spec.items() if key not in ("id", "type", "name")}
+    if node_type not in REGISTRY:
+        raise SpecError(f"Node '{node_id}': unknown type '{node_type}'")
+    try:
+        REGISTRY.check(node_type, kwargs)
+    except TypeError as error:
+        raise SpecError(f"Node '{node_id}' ({node_type}): {error}") from None
+    return {"id": node_id, "type": node_type, "name": spec.get("name", node_id),
+            "kwargs": kwargs, "refs": _references(kwargs)}
+
+
+def _endpoint(text: str) -> Tuple[str, int]:
+    node_id, _, port = text.strip().partition(":")
+    return node_id.strip(), int(port) if port else 0  # ValueError on a bad port
+
+
+def _compile_connection(spec: Any, defaults: dict, position: int) -> list:
+    if isinstance(spec, str):
+        source, arrow, target = spec.partition("->")
+        if not arrow:
+            raise SpecError(f"Connection #{position} '{spec}' is not 'from[:port] -> to[:port]'")
+        try:
+            (from_node, from_port), (to_node, to_port) = _endpoint(source), _endpoint(target)
+        except ValueError:
+            raise SpecError(f"Connection #{position} '{spec}': bad port") from None
+        options = {}
+    elif isinstance(spec, dict) and "from" in spec and "to" in spec:
+        from_node, from_port = spec["from"], spec.get("from_port", 0)
+        to_node, to_port = spec["to"], spec.get("to_port", 0)
+        options = {key: value for key, value in spec.items()
+                   if key not in ("from", "from_port", "to", "to_port")}
+    else:
+        raise SpecError(f"Connection #{position} needs 'from' and 'to'")
+    unknown = sorted(set(options) - set(CONNECTION_OPTIONS))
+    if unknown:
+        raise SpecError(f"Connection {from_node} -> {to_node}: unexpected {', '.join(unknown)}")
+    return [from_node, from_port, to_node, to_port, {**defaults, **options}]
+
+
+def _start_order(node_ids: List[str], edges: List[Tuple[str, str]]) -> List[str]:
+    """Producers first; raises SpecError on a cycle"""
+    consumers: Dict[str, List[str]] = {node_id: [] for node_id in node_ids}
+    waiting = dict.fromkeys(node_ids, 0)
+    for from_node, to_node in edges:
+        consumers[from_node].append(to_node)
+        waiting[to_node] += 1
+    order = [node_id for node_id in node_ids if not waiting[node_id]]
+    for node_id in order:  # Grows while iterating
+        for consumer in consumers[node_id]:
+            waiting[consumer] -= 1
+            if not waiting[consumer]:
+                order.append(consumer)
+    if len(order) < len(node_ids):
+        stuck = [node_id for node_id in node_ids if waiting[node_id]]
+        raise SpecError(f"Connections form a cycle through {', '.join(stuck)} "
+                        f"(declare feedback loops under 'cycles' with kind 'with_cycles')")
+    return order
+
+
+def compile_spec(spec: dict) -> dict:
+    """Validated plan for spec (see module doc); raises SpecError"""
+    kind = spec.get("kind", "pipeline")
+    if kind not in ("pipeline", "with_cycles"):
+        raise SpecError(f"Unknown pipeline kind '{kind}'")
+    nodes = [_compile_node(node, i) for i, node in enumerate(spec.get("nodes", []))]
+    ids = [node["id"] for node in nodes]
+    if len(set(ids)) < len(ids):
+        duplicates = sorted({node_id for node_id in ids if ids.count(node_id) > 1})
+        raise SpecError(f"Duplicate node ids: {', '.join(duplicates)}")
+    known = set(ids)
+
+    defaults = spec.get("defaults", {})
+    unknown = sorted(set(defaults) - set(CONNECTION_OPTIONS))
+    if unknown:
+        raise SpecError(f"Unexpected connection defaults: {', '.join(unknown)}")
+    connections = [_compile_connection(c, defaults, i) for i, c in enumerate(spec.get("connections", []))]
+    seen = set()
+    edges = []
+    for from_node, from_port, to_node, to_port, options in connections:
+        key = (from_node, from_port, to_node, to_port)
+        if key in seen:
+            raise SpecError(f"Duplicate connection {from_node}:{from_port} -> {to_node}:{to_port}")
+        seen.add(key)
+        missing = [n for n in (from_node, to_node) if n not in known]
+        if len(missing) == 2 or (missing and options.get("remote") is None):
+            raise SpecError(f"Connection {from_node} -> {to_node}: unknown node {', '.join(missing)}")
+        if not missing:
+            edges.append((from_node, to_node))
+
+    cycles = []
+    for i, cycle in enumerate(spec.get("cycles", [])):
+        if kind != "with_cycles":
+            raise SpecError("'cycles' needs kind 'with_cycles'")
+        if not isinstance(cycle, dict) or cycle.get("from") not in known or cycle.get("to") not in known:
+            raise SpecError(f"Cycle #{i} needs 'from' and 'to' naming nodes")
+        options = {key: value for key, value in cycle.items() if key not in ("from", "to")}
+        unknown = sorted(set(options) - set(CYCLE_OPTIONS))
+        if unknown:
+            raise SpecError(f"Cycle {cycle['from']} -> {cycle['to']}: unexpected {', '.join(unknown)}")
+        if options.get("max_iterations", 10) <= 0:
+            raise SpecError(f"Cycle {cycle['from']} -> {cycle['to']}: max_iterations must be > 0")
+        cycles.append([cycle["from"], cycle["to"], options, _references(options)])
+
+    by_id = {node["id"]: node for node in nodes}
+    return {
+        "version": PLAN_VERSION,
+        "name": spec.get("name", "pipeline"),
+        "kind": kind,
+        "nodes": [by_id[node_id] for node_id in _start_order(ids, edges)],
+        "connections": connections,
+        "cycles": cycles,
+    }
+
+
+# ---- building ----
+
+def _resolve(value: Any, bindings: Dict[str, Any]) -> Any:
+    if isinstance(value, str) and value.startswith("$"):
+        return bindings[value[1:]]
+    if isinstance(value, list):
+        return [_resolve(item, bindings) for item in value]
+    if isinstance(value, dict):
+        return {key: _resolve(item, bindings) for key, item in value.items()}
+    return value
+
+
+def build(plan: dict, bindings: Optional[Dict[str, Any]] = None):
+    """Pipeline (not started) from a compiled plan"""
+    bindings = bindings or {}
+    missing = sorted({ref for node in plan["nodes"] for ref in node["refs"]}
+                     .union(ref for *_, refs in plan["cycles"] for ref in refs) - set(bindings))
+    if missing:
+        raise KeyError(f"Spec '{plan['name']}' needs bindings for: {', '.join(missing)}")
+    pipe = dsl_api.with_cycles(plan["name"]) if plan["kind"] == "with_cycles" else dsl_api.pipeline(plan["name"])
+    for spec in plan["nodes"]:
+        kwargs = _resolve(spec["kwargs"], bindings) if spec["refs"] else spec["kwargs"]
+        pipe.add_node(spec["id"], REGISTRY.create(spec["type"], spec["name"], **kwargs))
+    for from_node, from_port, to_node, to_port, options in plan["connections"]:
+        pipe.connect(from_node, from_port, to_node, to_port, **options)
+    for from_node, to_node, options, refs in plan["cycles"]:
+        pipe.add_cycle(from_node, to_node, **(_resolve(options, bindings) if refs else options))
+    return pipe
+
+
+# ---- plan cache ----
+
+def _cached(key: str, cache_dir: Optional[str]) -> Optional[dict]:
+    plan = _plans.get(key)
+    if plan is None and cache_dir is not None:
+        path = os.path.join(cache_dir, f"plan-{key}.json")
+        if os.path.exists(path):
+            with open(path) as f:
+                plan = json.load(f)
+            if plan.get("version") != PLAN_VERSION:
+                return None
+            _plans[key] = plan
+    return plan
+
+
+def _store(key: str, plan: dict, cache_dir: Optional[str]):
+    _plans[key] = plan
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        path = os.path.join(cache_dir, f"plan-{key}.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(plan, f)
+        os.replace(path + ".tmp", path)
+
+
+def plan_for(spec: Union[str, dict], cache_dir: Optional[str] = None) -> dict:
+    """Compiled plan for a spec file path or dict, from the cache when known"""
+    if isinstance(spec, dict):
+        key = spec_hash(spec)
+    else:
+        with open(spec, "rb") as f:
+            data = f.read()
+        key = spec_hash(data)
+    plan = _cached(key, cache_dir)
+    if plan is None:
+        plan = compile_spec(spec if isinstance(spec, dict) else parse_spec(data, spec))
+        _store(key, plan, cache_dir)
+    return plan
+
+
+def load(spec: Union[str, dict], bindings: Optional[Dict[str, Any]] = None,
+         cache_dir: Optional[str] = None):
+    """Pipeline (not started) from a spec file path or dict"""
+    return build(plan_for(spec, cache_dir), bindings)
@@ -0,0 +1,263 @@
+"""
+Channels that spill to disk instead of growing without bound.
+
+A SpillChannel keeps up to memory_items items in memory. Once that window
+is full, further items are written in batches (of batch items or
+batch_bytes of pixels, whichever comes first) to append-only segment
+files and read back in FIFO order as the consumer catches up; fully read
+segments are deleted. Only when disk_limit bytes are spilled does put()
+block, so a stalled stage slows its producers down instead of the
+process running out of memory or dropping items.
+
+ImageJobs are written with model.wire (pixels included); other items,
+and the end-of-stream/checkpoint markers, are pickled in place so the
+order is kept exactly.
+"""
+import io
+import os
+import pickle
+import shutil
+import struct
+import tempfile
+import weakref
+from collections import deque
+from queue import Queue, Full
+from time import monotonic
+from typing import Any, Dict, List, Optional, Tuple
+from .core import Channel, CheckpointBarrier, END_OF_STREAM
+from model.image_job import ImageJob
+
+FRAME = struct.Struct("<cI")  # kind (b"W" wire, b"P" pickle), payload length
+WIRE, PICKLE = b"W", b"P"
+
+
+def _payload_bytes(item) -> int:
+    pixels = getattr(item, "pixels", None)
+    encoded = getattr(item, "encoded", None)
+    return (pixels.nbytes if pixels is not None else 0) + (len(encoded) if encoded is not None else 0)
+
+
+class _MarkerPickler(pickle.Pickler):
+    """Checkpoint barriers hold callbacks - they stay in memory, referenced by id"""
+    def __init__(self, file, held: Dict[int, Any]):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.held = held
+
+    def persistent_id(self, obj):
+        if type(obj) is CheckpointBarrier:
+            self.held[id(obj)] = obj
+            return id(obj)
+        return None
+
+
+class _MarkerUnpickler(pickle.Unpickler):
+    def __init__(self, file, held: Dict[int, Any]):
+        super().__init__(file)
+        self.held = held
+
+    def persistent_load(self, pid):
+        return self.held.pop(pid)
+
+
+def encode_items(items: List[Any], held: Optional[Dict[int, Any]] = None) -> Tuple[bytes, bytes]:
+    """(kind, payload) for a batch: model.wire when it is all ImageJobs, else pickle.
+    With held, checkpoint barriers are kept there and pickled by reference."""
+    if all(type(item) is ImageJob for item in items):
+        from model.wire import pack
+        return WIRE, pack(items)
+    buffer = io.BytesIO()
+    if held is None:
+        pickle.dump(items, buffer, pickle.HIGHEST_PROTOCOL)
+    else:
+        _MarkerPickler(buffer, held).dump(items)
+    return PICKLE, buffer.getvalue()
+
+
+def decode_items(kind: bytes, payload, held: Optional[Dict[int, Any]] = None) -> List[Any]:
+    """Batch from encode_items()"""
+    if kind == WIRE:
+        from model.wire import unpack
+        return unpack(payload)
+    if held is None:
+        return pickle.loads(payload)
+    return _MarkerUnpickler(io.BytesIO(payload), held).load()
+
+
+def _is_marker(item) -> bool:
+    return item is END_OF_STREAM or type(item) is CheckpointBarrier
+
+
+class SpillQueue(Queue):
+    """Queue with an in-memory window and an on-disk overflow (see module doc)"""
+    def __init__(self, memory_items: int, directory: str, disk_limit: Optional[int] = None,
+                 segment_bytes: int = 64 << 20, batch: int = 256, batch_bytes: int = 4 << 20):
+        super().__init__(maxsize=memory_items)
+        self.directory = directory
+        self.disk_limit = disk_limit
+        self.segment_bytes = segment_bytes
+        self.batch = batch
+        self.batch_bytes = batch_bytes
+        self.buffered_bytes = 0   # Payload (pixels, encoded) in the write buffer
+        self.held: Dict[int, Any] = {}
+        self.segments: deque = deque()  # Paths, oldest first; the last one is being written
+        self.next_segment = 0
+        self.writer: Optional[io.BufferedWriter] = None
+        self.reader: Optional[io.BufferedReader] = None
+        self.write_buffer: List[Any] = []  # Newest items, not written yet
+        self.spilled = 0          # Items in segment files
+        self.spilled_markers = 0  # Of which end-of-stream/checkpoint markers
+        self.disk_bytes = 0       # Bytes in segment files
+        self.spilled_total = 0
+        self.peak_disk_bytes = 0
+
+    # ---- Queue hooks (called with the queue mutex held) ----
+
+    def _init(self, maxsize):
+        self.queue = deque()
+
+    def _qsize(self) -> int:
+        return len(self.queue) + self.spilled + len(self.write_buffer)
+
+    def _put(self, item):
+        if self.spilled or self.write_buffer or len(self.queue) >= self.maxsize:
+            # Once anything is spilled, newer items queue up behind it
+            self.write_buffer.append(item)
+            self.buffered_bytes += _payload_bytes(item)
+            if len(self.write_buffer) >= self.batch or self.buffered_bytes >= self.batch_bytes:
+                self._flush()
+        else:
+            self.queue.append(item)
+
+    def _get(self):
+        if not self.queue:
+            if self.spilled:
+                self.queue.extend(self._read_frame())
+            else:
+                self.queue.extend(self.write_buffer)
+                self.write_buffer = []
+                self.buffered_bytes = 0
+        return self.queue.popleft()
+
+    def _full(self) -> bool:
+        return (len(self.queue) >= self.maxsize and self.disk_limit is not None
+                and self.disk_bytes >= self.disk_limit)
+
+    def put(self, item, block: bool = True, timeout: Optional[float] = None):
+        """Queue.put(), blocking only while the memory window and the disk are full"""
+        with self.not_full:
+            if not block:
+                if self._full():
+                    raise Full
+            elif timeout is None:
+                while self._full():
+                    self.not_full.wait()
+            else:
+                end = monotonic() + timeout
+                while self._full():
+                    remaining = end - monotonic()
+                    if remaining <= 0.0:
+                        raise Full
+                    self.not_full.wait(remaining)
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    def full(self) -> bool:
+        with self.mutex:
+            return self._full()
+
+    # ---- segments ----
+
+    def _encode(self, items: List[Any]) -> bytes:
+        kind, payload = encode_items(items, self.held)
+        return FRAME.pack(kind, len(payload)) + payload
+
+    def _flush(self):
+        """Append the write buffer to the current segment as one frame"""
+        if not self.write_buffer:
+            return
+        data = self._encode(self.write_buffer)
+        if self.writer is None or self.writer.tell() >= self.segment_bytes:
+            if self.writer is not None:
+                self.writer.close()
+            path = os.path.join(self.directory, f"segment-{self.next_segment:06d}.spill")
+            self.next_segment += 1
+            self.segments.append(path)
+            self.writer = open(path, "wb")
+        self.writer.write(data)
+        self.writer.flush()  # Readers open the file separately
+        self.spilled += len(self.write_buffer)
+        self.spilled_markers += sum(1 for item in self.write_buffer if _is_marker(item))
+        self.spilled_total += len(self.write_buffer)
+        self.disk_bytes += len(data)
+        self.peak_disk_bytes = max(self.peak_disk_bytes, self.disk_bytes)
+        self.write_buffer = []
+        self.buffered_bytes = 0
+
+    def _read_frame(self) -> List[Any]:
+        """Next frame from the oldest segment; finished segments are deleted"""
+        while True:
+            if self.reader is None:
+                self.reader = open(self.segments[0], "rb")
+            header = self.reader.read(FRAME.size)
+            if header:
+                break
+            # End of this segment: it is complete unless it is still being written
+            self.reader.close()
+            self.reader = None
+            path = self.segments.popleft()
+            if path == getattr(self.writer, "name", None):
+                self.writer.close()
+                self.writer = None
+            os.remove(path)
+        kind, length = FRAME.unpack(header)
+        payload = self.reader.read(length)
+        self.disk_bytes -= FRAME.size + length
+        items = decode_items(kind, payload, self.held)
+        self.spilled -= len(items)
+        self.spilled_markers -= sum(1 for item in items if _is_marker(item))
+        if not self.spilled and self.reader is not None:
+            # Everything on disk has been read - start over with empty files
+            self.reader.close()
+            self.reader = None
+            if self.writer is not None:
+                self.writer.close()
+                self.writer = None
+            for path in self.segments:
+                os.remove(path)
+            self.segments.clear()
+        return items
+
+    def markers(self) -> int:
+        """End-of-stream/checkpoint markers in memory, the write buffer or on disk"""
+        return self.spilled_markers + sum(1 for item in list(self.queue) + self.write_buffer
+                                          if _is_marker(item))
+
+
+class SpillChannel(Channel):
+    """Channel holding memory_items in memory and spilling the rest to
+    segment files under directory (a fresh temporary directory, removed
+    with the channel, by default). put() blocks once disk_limit bytes
+    (None = no limit) are spilled."""
+    def __init__(self, name: str, data_type: type = ImageJob, memory_items: int = 1024,
+                 directory: Optional[str] = None, disk_limit: Optional[int] = None,
+                 segment_bytes: int = 64 << 20, batch: int = 256, batch_bytes: int = 4 << 20):
+        super().__init__(name, data_type)
+        if memory_items < 1:
+            raise ValueError("memory_items must be >= 1")
+        self.directory = tempfile.mkdtemp(prefix=f"spill_{name}_", dir=directory)
+        weakref.finalize(self, shutil.rmtree, self.directory, True)
+        self.queue = SpillQueue(memory_items, self.directory, disk_limit, segment_bytes, batch, batch_bytes)
+
+    def pending(self) -> int:
+        with self.queue.mutex:
+            return self.queue._qsize() - self.queue.markers()
+
+    def stats(self) -> dict:
+        return {
+            "in_memory": len(self.queue.queue),
+            "spilled": self.queue.spilled + len(self.queue.write_buffer),
+            "spilled_total": self.queue.spilled_total,
+            "disk_bytes": self.queue.disk_bytes,
+            "peak_disk_bytes": self.queue.peak_disk_bytes,
+        }
@@ -0,0 +1,122 @@
+"""
+Sampling per-job tracer with Chrome/Perfetto trace-event export.
+
+Tracing is off unless enable() installs a Tracer in ACTIVE. Instrumented
+code checks `tracing.ACTIVE is not None` first, so the disabled path costs
+one attribute lookup per item.
+"""
+import json
+import random
+import threading
+import time
+from itertools import count
+from typing import Any, Dict, Iterable, List, Optional
+
+ACTIVE: Optional['Tracer'] = None
+
+
+class Tracer:
+    """Collects spans for sampled jobs (jobs carrying a trace_id)"""
+    def __init__(self, sample_rate: float = 0.01, seed: Optional[int] = None,
+                 max_events: int = 1_000_000):
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be between 0 and 1")
+        self.sample_rate = sample_rate
+        self.max_events = max_events
+        self.events: List[Dict[str, Any]] = []
+        self.dropped_events = 0
+        self.thread_names: Dict[int, str] = {}
+        self.origin = time.perf_counter()
+        self._random = random.Random(seed)
+        self._ids = count(1)
+        self._marks: Dict[Any, float] = {}
+        self._lock = threading.Lock()
+
+    # ============ Sampling ============
+    def sample(self, job) -> bool:
+        """Tag job with a trace id if it is picked by the sampler"""
+        if getattr(job, 'trace_id', None) is not None:
+            return True
+        if self._random.random() >= self.sample_rate:
+            return False
+        with self._lock:
+            job.trace_id = f"t{next(self._ids)}"
+        return True
+
+    @staticmethod
+    def traced(jobs: Iterable) -> List:
+        return [job for job in jobs if getattr(job, 'trace_id', None) is not None]
+
+    # ============ Recording ============
+    def span(self, name: str, job, start: float, end: float, cat: str = "node", **args):
+        """Record a complete event; start/end are time.perf_counter() values"""
+        if len(self.events) >= self.max_events:
+            self.dropped_events += 1
+            return
+        thread = threading.current_thread()
+        self.thread_names.setdefault(thread.ident, thread.name)
+        args["trace_id"] = job.trace_id
+        args["image_id"] = job.image_id
+        self.events.append({
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": (start - self.origin) * 1e6,
+            "dur": max(end - start, 0.0) * 1e6,
+            "pid": 1,
+            "tid": thread.ident,
+            "args": args,
+        })
+
+    def mark(self, key, ts: Optional[float] = None):
+        """Remember a timestamp to close a span from another thread later"""
+        self._marks[key] = time.perf_counter() if ts is None else ts
+
+    def pop_mark(self, key) -> Optional[float]:
+        return self._marks.pop(key, None)
+
+    # ============ Channel hooks ============
+    def on_put(self, channel, job):
+        self.mark((channel.name, id(job)))
+
+    def on_get(self, channel, job):
+        now = time.perf_counter()
+        queued_at = self.pop_mark((channel.name, id(job)))
+        if queued_at is not None:
+            self.span(f"channel {channel.name}", job, queued_at, now, cat="channel")
+        self.mark(("received", id(job)), now)
+
+    def received_at(self, job) -> Optional[float]:
+        return self.pop_mark(("received", id(job)))
+
+    # ============ Export ============
+    def to_dict(self) -> Dict[str, Any]:
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}}
+            for tid, name in self.thread_names.items()
+        ]
+        return {
+            "traceEvents": metadata + list(self.events),
+            "displayTimeUnit": "ms",
+            "otherData": {"sample_rate": self.sample_rate, "dropped_events": self.dropped_events},
+        }
+
+    def write(self, path: str):
+        """Write Chrome trace-event JSON (open in chrome://tracing or Perfetto)"""
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+        print(f"🧵 Trace written to {path} ({len(self.events)} events)")
+
+
+def enable(sample_rate: float = 0.01, seed: Optional[int] = None, **kwargs) -> Tracer:
+    """Install a global tracer - affects every pipeline in the process"""
+    global ACTIVE
+    ACTIVE = Tracer(sample_rate, seed, **kwargs)
+    return ACTIVE
+
+
+def disable() -> Optional[Tracer]:
+    """Turn tracing off and return the tracer that was active"""
+    global ACTIVE
+    tracer, ACTIVE = ACTIVE, None
+    return tracer
@@ -219,9 +219,11 @@ def interactive_menu():
 
     choice = input("\nEnter choice (1-7): ").strip()
 
+    pipe = None
+
     if choice == "1":
         from demo.basic_dsl import demo_basic_dsl
-        demo_basic_dsl()
+        pipe = demo_basic_dsl()
 
     elif choice == "2":
     # Type transformation ONLY (PNG → JPG)
@@ -241,7 +243,7 @@ def interactive_menu():
         pipe.build()
         pipe.start()
 
-        time.sleep(1.0)
+        pipe.wait_for_completion(5.0)
     elif choice == "3":
     # n-to-1: Panorama stitching ONLY
         from dsl import pipeline, stitch, source, sink, connect
@@ -260,6 +262,7 @@ def interactive_menu():
         pipe.build()
         pipe.start()
 
+        pipe.wait_for_completion(5.0)
 
     elif choice == "4":
     # 1-to-n: Image splitting (CORRECT demonstration)
@@ -284,8 +287,8 @@ def interactive_menu():
         pipe.build()
         pipe.start()
 
-    # allow ALL split outputs to be produced
-        time.sleep(2.0)
+    # returns once ALL split outputs reached the sink
+        pipe.wait_for_completion(5.0)
 
 
 
@@ -316,8 +319,8 @@ def interactive_menu():
         pipe.build()
         pipe.start()
 
-    # Allow selector to fire once
-        time.sleep(1.5)
+    # Selector fires once, then end-of-stream reaches the sink
+        pipe.wait_for_completion(5.0)
 
 
 
@@ -361,10 +364,10 @@ def interactive_menu():
         pipe.build()
         pipe.start()
 
-    # Let it run long enough to show accumulation
-        time.sleep(2.0)
+    # Completes once Channel B ends - leftover A items are reported
+        pipe.wait_for_completion(5.0)
 
-        print("\n⚠️ Remaining items in Channel A are waiting forever")
+        print("\n⚠️ Remaining items in Channel A can never be matched")
         print("⚠️ This demonstrates synchronization & accumulation\n")
         print("\n✅ Synchronization issue demonstrated successfully.")
         print("✅ Exiting demo (pipeline intentionally non-terminating).")
@@ -373,9 +376,10 @@ def interactive_menu():
 
     else:
         print("❌ Invalid choice")
-    time.sleep(2.0)
-# 🔑 Force clean program exit after pipeline execution
-    os._exit(0)
+
+    # Drain what is still in flight, then stop every node within the deadline
+    if pipe:
+        print(pipe.shutdown(deadline=2.0))
 
 
 def main():
@@ -2,4 +2,13 @@
 from .image_job import ImageJob
 from .processing_status import ProcessingStatus
 
-__all__ = ['ImageJob', 'ProcessingStatus']
\ No newline at end of file
+
+def __getattr__(name):
+    # JobBatch pulls in numpy - only when it is asked for
+    if name == 'JobBatch':
+        from .job_batch import JobBatch
+        return JobBatch
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ['ImageJob', 'ProcessingStatus', 'JobBatch']
@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+import weakref
+from typing import Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # Only needed when stitching pixels
+    np = None
+
+
+class PanoramaCanvas:
+    """Disk-backed canvas that parts are feather-blended into as they arrive.
+
+    Each part adds pixels * weight and weight into float32 memmaps, with
+    weights ramping linearly from the part's edges over `feather` pixels, so
+    blending does not depend on arrival order. finish() divides strip by strip
+    into a memmap of the parts' dtype. Peak memory is one part plus a few
+    strip_bytes-sized temporaries.
+    """
+    def __init__(self, height: int, width: int, channels: int = 3,
+                 directory: Optional[str] = None, feather: int = 32, strip_bytes: int = 4 << 20):
+        self.height = height
+        self.width = width
+        self.channels = channels
+        self.feather = max(1, feather)
+        self.strip_bytes = strip_bytes
+        self.directory = tempfile.mkdtemp(prefix="canvas_", dir=directory)
+        shape = (height, width, channels)
+        self.sum = np.memmap(os.path.join(self.directory, "sum.f32"), np.float32, "w+", shape=shape)
+        self.weight = np.memmap(os.path.join(self.directory, "weight.f32"), np.float32, "w+",
+                                shape=(height, width))
+        self.dtype = None
+        self.parts = 0
+
+    def _strip_rows(self, width: int) -> int:
+        """Rows per strip so float32 temporaries stay around strip_bytes"""
+        return max(1, self.strip_bytes // (width * self.channels * 4))
+
+    def _ramp(self, length: int):
+        index = np.arange(length, dtype=np.float32)
+        distance = np.minimum(index + 1, length - index)
+        return np.minimum(distance / self.feather, 1.0)
+
+    def add(self, pixels, x: int, y: int):
+        """Blend a part whose top-left corner is at (x, y); overhang is clipped"""
+        if pixels.ndim == 2:
+            pixels = pixels[..., None]
+        if pixels.shape[2] != self.channels:
+            pixels = np.broadcast_to(pixels[..., :1], pixels.shape[:2] + (self.channels,)) \
+                if pixels.shape[2] == 1 else pixels[..., :self.channels]
+        self.dtype = self.dtype or pixels.dtype
+        height, width = pixels.shape[:2]
+
+        top, left = max(0, y), max(0, x)
+        bottom, right = min(self.height, y + height), min(self.width, x + width)
+        if top >= bottom or left >= right:
+            return
+        weight_x = self._ramp(width)[left - x:right - x]
+        weight_y = self._ramp(height)
+
+        rows = self._strip_rows(right - left)
+        for row in range(top, bottom, rows):
+            end = min(bottom, row + rows)
+            weights = weight_y[row - y:end - y, None] * weight_x[None, :]
+            strip = pixels[row - y:end - y, left - x:right - x].astype(np.float32)
+            self.sum[row:end, left:right] += strip * weights[..., None]
+            self.weight[row:end, left:right] += weights
+        self.parts += 1
+
+    def finish(self, path: Optional[str] = None):
+        """Normalise into a read-only memmap (default: a temporary panorama.img
+        next to the sums, deleted once the memmap is no longer used)"""
+        dtype = self.dtype or np.uint8
+        temporary = path is None
+        path = path or os.path.join(self.directory, "panorama.img")
+        result = np.memmap(path, dtype, "w+", shape=(self.height, self.width, self.channels))
+        rounding = 0.5 if np.issubdtype(dtype, np.integer) else 0.0
+        rows = self._strip_rows(self.width)
+        for row in range(0, self.height, rows):
+            end = min(self.height, row + rows)
+            weight = np.maximum(self.weight[row:end], 1e-6)[..., None]
+            result[row:end] = self.sum[row:end] / weight + rounding
+        result.flush()
+        # The sums are no longer needed - free their disk space
+        del self.sum, self.weight
+        for name in ("sum.f32", "weight.f32"):
+            os.remove(os.path.join(self.directory, name))
+        result = np.memmap(path, dtype, "r", shape=(self.height, self.width, self.channels))
+        if not temporary:
+            os.rmdir(self.directory)
+            return result
+        try:
+            # The mapping stays valid after the file and its directory are unlinked
+            os.remove(path)
+            os.rmdir(self.directory)
+        except OSError:  # A mapped file cannot be removed on Windows
+            weakref.finalize(result, shutil.rmtree, self.directory, True)
+        return result
+
+    def discard(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        return self.height, self.width, self.channels
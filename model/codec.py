@@ -0,0 +1,162 @@
+import io
+from typing import Dict, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # Only needed once pixels are decoded
+    np = None
+
+
+class Codec:
+    """Encodes/decodes one family of formats to (height, width[, channels]) arrays"""
+    name = "codec"
+    formats: Tuple[str, ...] = ()
+
+    def decode(self, data: bytes, width: Optional[int] = None, height: Optional[int] = None):
+        raise NotImplementedError
+
+    def encode(self, pixels, fmt: str) -> bytes:
+        raise NotImplementedError
+
+    def size(self, data: bytes) -> Optional[Tuple[int, int]]:
+        """(width, height) from the header without decoding, if the format has one"""
+        return None
+
+
+class PNMCodec(Codec):
+    """Binary PPM (P6, RGB) and PGM (P5, grey), 8 or 16 bit"""
+    name = "pnm"
+    formats = ("PPM", "PGM")
+
+    @staticmethod
+    def _header(data: bytes) -> Tuple[bytes, int, int, int, int]:
+        """(magic, width, height, maxval, offset of the pixel data)"""
+        # Only find()/slicing - data may be an mmap, which has no index()
+        fields = []
+        pos, end = 0, len(data)
+        while len(fields) < 4:
+            while pos < end and data[pos:pos + 1].isspace():
+                pos += 1
+            if data[pos:pos + 1] == b"#":  # Comment to end of line
+                pos = data.find(b"\n", pos) + 1
+                if not pos:
+                    raise ValueError("Truncated PPM/PGM header")
+                continue
+            start = pos
+            while pos < end and not data[pos:pos + 1].isspace():
+                pos += 1
+            if pos >= end:
+                raise ValueError("Truncated PPM/PGM header")
+            fields.append(data[start:pos])
+        magic, width, height, maxval = fields[0], int(fields[1]), int(fields[2]), int(fields[3])
+        if magic not in (b"P5", b"P6"):
+            raise ValueError(f"Not a binary PPM/PGM file (magic {magic!r})")
+        return magic, width, height, maxval, pos + 1  # Single whitespace after maxval
+
+    def size(self, data: bytes) -> Optional[Tuple[int, int]]:
+        _, width, height, _, _ = self._header(data)
+        return width, height
+
+    def decode(self, data: bytes, width: Optional[int] = None, height: Optional[int] = None):
+        magic, width, height, maxval, offset = self._header(data)
+        channels = 3 if magic == b"P6" else 1
+        dtype = np.uint8 if maxval < 256 else np.dtype(">u2")
+        pixels = np.frombuffer(data, dtype=dtype, count=width * height * channels, offset=offset)
+        return pixels.reshape((height, width, 3) if channels == 3 else (height, width))
+
+    def encode(self, pixels, fmt: str) -> bytes:
+        pixels = np.asarray(pixels)
+        grey = pixels.ndim == 2 or pixels.shape[2] == 1
+        if fmt == "PGM" and not grey:
+            pixels = (pixels[..., :3] @ np.array([0.299, 0.587, 0.114])).astype(pixels.dtype)
+            grey = True
+        elif fmt == "PPM" and grey:
+            pixels = np.repeat(pixels.reshape(pixels.shape[0], pixels.shape[1], 1), 3, axis=2)
+            grey = False
+        elif not grey:
+            pixels = pixels[..., :3]
+        height, width = pixels.shape[:2]
+        maxval = 255 if pixels.dtype == np.uint8 else 65535
+        data = pixels.astype(">u2") if maxval > 255 else pixels
+        header = f"{'P5' if grey else 'P6'}\n{width} {height}\n{maxval}\n".encode()
+        return header + np.ascontiguousarray(data).tobytes()
+
+
+class RawCodec(Codec):
+    """Headerless interleaved samples; the job's width/height give the shape.
+
+    Bytes per pixel pick the layout: 1 grey, 2 grey 16-bit, 3 RGB, 4 RGBA,
+    6 RGB 16-bit (native byte order).
+    """
+    name = "raw"
+    formats = ("RAW",)
+    LAYOUTS = {1: ("u1", 1), 2: ("u2", 1), 3: ("u1", 3), 4: ("u1", 4), 6: ("u2", 3)}
+
+    def decode(self, data: bytes, width: Optional[int] = None, height: Optional[int] = None):
+        if not width or not height:
+            raise ValueError("RAW data needs the job's width and height")
+        per_pixel, rest = divmod(len(data), width * height)
+        if rest or per_pixel not in self.LAYOUTS:
+            raise ValueError(f"{len(data)} bytes do not fit a {width}x{height} RAW image")
+        dtype, channels = self.LAYOUTS[per_pixel]
+        pixels = np.frombuffer(data, dtype=dtype)
+        return pixels.reshape((height, width, channels) if channels > 1 else (height, width))
+
+    def encode(self, pixels, fmt: str) -> bytes:
+        return np.ascontiguousarray(pixels).tobytes()
+
+
+class PillowCodec(Codec):
+    """Compressed formats through Pillow (registered only if it is installed)"""
+    name = "pillow"
+    formats = ("PNG", "JPG", "JPEG", "TIFF", "BMP", "WEBP")
+    SAVE_AS = {"JPG": "JPEG"}
+
+    def __init__(self, image_module):
+        self.Image = image_module
+
+    def size(self, data: bytes) -> Optional[Tuple[int, int]]:
+        return self.Image.open(io.BytesIO(data)).size
+
+    def decode(self, data: bytes, width: Optional[int] = None, height: Optional[int] = None):
+        return np.asarray(self.Image.open(io.BytesIO(data)))
+
+    def encode(self, pixels, fmt: str) -> bytes:
+        image = self.Image.fromarray(np.asarray(pixels))
+        save_as = self.SAVE_AS.get(fmt, fmt)
+        if save_as == "JPEG" and image.mode == "RGBA":
+            image = image.convert("RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, format=save_as)
+        return buffer.getvalue()
+
+
+CODECS: Dict[str, Codec] = {}
+
+
+def register_codec(codec: Codec, replace: bool = True):
+    """Make codec handle every format it lists (later registrations win)"""
+    for fmt in codec.formats:
+        if replace or fmt not in CODECS:
+            CODECS[fmt.upper()] = codec
+
+
+def get_codec(fmt: str) -> Codec:
+    codec = CODECS.get(fmt.upper())
+    if codec is None:
+        raise KeyError(f"No codec registered for format '{fmt}' (have: {', '.join(sorted(CODECS))})")
+    return codec
+
+
+def has_codec(fmt: str) -> bool:
+    return fmt.upper() in CODECS
+
+
+register_codec(PNMCodec())
+register_codec(RawCodec())
+try:
+    from PIL import Image as _PILImage
+except ImportError:  # Optional: compressed formats stay metadata-only
+    _PILImage = None
+else:
+    register_codec(PillowCodec(_PILImage))
@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 import time
 from .processing_status import ProcessingStatus
 
@@ -13,8 +13,10 @@ class ImageJob:
 
     # For specific filter types
     panorama_group: Optional[str] = None          # For n-to-1 (panorama)
+    panorama_offset: Optional[Tuple[int, int]] = None  # (x, y) of this part on the panorama canvas
     split_into: Optional[int] = None              # For 1-to-n (splitting)
     quality_score: Optional[float] = None         # For 1-of-n selection
+    quality_metrics: Optional[Dict[str, float]] = None  # Set by QualityScoreNode
     correlation_id: Optional[str] = None          # For grouping related jobs
 
     # For summator/numeric operations (professor's example)
@@ -24,6 +26,14 @@ class ImageJob:
     cycle_count: int = 0
     iteration_limit: Optional[int] = None
 
+    # Image payload (optional - most jobs only carry metadata)
+    width: Optional[int] = None
+    height: Optional[int] = None
+    pixels: Optional[Any] = field(default=None, repr=False, compare=False)  # numpy array, shared by copy()
+    encoded: Optional[bytes] = field(default=None, repr=False, compare=False)  # image file bytes (or an mmap)
+    encoded_format: Optional[str] = None          # Format of encoded (may lag current_format)
+    levels: Optional[Dict[int, Any]] = field(default=None, repr=False, compare=False)  # pyramid cache, shared by copy()
+
     # Control signals
     is_termination: bool = False
     is_poison_pill: bool = False
@@ -33,6 +43,7 @@ class ImageJob:
     created_at: float = field(default_factory=time.time)
     status: ProcessingStatus = ProcessingStatus.PENDING
     processed_by: List[str] = field(default_factory=list)
+    trace_id: Optional[str] = None                # Set by the sampling tracer
 
     def add_transformation(self, transformation: str) -> 'ImageJob':
         """Simulate processing by adding transformation to list"""
@@ -42,25 +53,89 @@ class ImageJob:
         self.status = ProcessingStatus.COMPLETED
         return self
 
+    def load_pixels(self):
+        """Pixels, decoded from encoded on first use (cached on the job)"""
+        if self.pixels is None and self.encoded is not None:
+            from .codec import get_codec
+            self.pixels = get_codec(self.encoded_format).decode(self.encoded, self.width, self.height)
+            self.height, self.width = self.pixels.shape[:2]
+        return self.pixels
+
+    def pyramid_level(self, level: int):
+        """Pixels downsampled 2x per level (0 = full resolution).
+
+        Levels are computed once from the nearest cached level and shared
+        with every copy of the job, whichever consumer asks first.
+        """
+        if level == 0:
+            return self.load_pixels()
+        if self.levels is None:
+            self.levels = {}
+        cached = self.levels.get(level)
+        if cached is not None:
+            return cached
+        below = max((l for l in self.levels if l < level), default=0)
+        pixels = self.levels[below] if below else self.load_pixels()
+        if pixels is None:
+            return None
+        from .imaging import downsample
+        for current in range(below + 1, level + 1):
+            pixels = self.levels.setdefault(current, downsample(pixels))
+        return pixels
+
+    def set_pixels(self, pixels) -> 'ImageJob':
+        """Replace the pixels - the encoded bytes and pyramid no longer match them"""
+        self.pixels = pixels
+        self.encoded = None
+        self.encoded_format = None
+        self.levels = None
+        if pixels is not None:
+            self.height, self.width = pixels.shape[:2]
+        return self
+
+    def to_bytes(self) -> Optional[bytes]:
+        """The image encoded as current_format, transcoding only if the bytes
+        are in another format or the pixels changed"""
+        if self.encoded is not None and self.encoded_format == self.current_format:
+            return self.encoded
+        pixels = self.load_pixels()
+        if pixels is None:
+            return None
+        from .codec import get_codec
+        self.encoded = get_codec(self.current_format).encode(pixels, self.current_format.upper())
+        self.encoded_format = self.current_format
+        return self.encoded
+
     def copy(self) -> 'ImageJob':
         """Create a copy of the job"""
+        if self.levels is None and (self.pixels is not None or self.encoded is not None):
+            self.levels = {}  # So levels computed on either job serve both
         return ImageJob(
             image_id=self.image_id,
             transformations=self.transformations.copy(),
             current_format=self.current_format,
             panorama_group=self.panorama_group,
+            panorama_offset=self.panorama_offset,
             split_into=self.split_into,
             quality_score=self.quality_score,
+            quality_metrics=self.quality_metrics.copy() if self.quality_metrics else None,
             correlation_id=self.correlation_id,
             numeric_value=self.numeric_value,
             cycle_count=self.cycle_count,
             iteration_limit=self.iteration_limit,
+            width=self.width,
+            height=self.height,
+            pixels=self.pixels,
+            encoded=self.encoded,
+            encoded_format=self.encoded_format,
+            levels=self.levels,
             is_termination=self.is_termination,
             is_poison_pill=self.is_poison_pill,
             config_updates=self.config_updates.copy() if self.config_updates else None,
             created_at=self.created_at,
             status=self.status,
-            processed_by=self.processed_by.copy()
+            processed_by=self.processed_by.copy(),
+            trace_id=self.trace_id
         )
 
     def __str__(self) -> str:
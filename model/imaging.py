@@ -0,0 +1,117 @@
+"""Pixel operations shared by nodes (numpy arrays of shape (height, width[, channels]))"""
+
+try:
+    import numpy as np
+except ImportError:  # Only needed for jobs that carry pixels
+    np = None
+
+
+def downsample(pixels):
+    """Half-size image by averaging 2x2 blocks (odd last row/column dropped)"""
+    height, width = pixels.shape[0] // 2 * 2, pixels.shape[1] // 2 * 2
+    if height == 0 or width == 0:
+        return pixels
+    # Narrowest accumulator that cannot overflow: one pass over the full image
+    if pixels.dtype.kind == "u" and pixels.dtype.itemsize <= 2:
+        accumulate = np.uint16 if pixels.dtype.itemsize == 1 else np.uint32
+    else:
+        accumulate = np.float64
+    rows = pixels[0:height:2, :width].astype(accumulate)
+    rows += pixels[1:height:2, :width]
+    total = rows[:, 0:width:2] + rows[:, 1:width:2]
+    if accumulate is np.float64:
+        return (total / 4).astype(pixels.dtype)
+    total += 2
+    total >>= 2
+    return total.astype(pixels.dtype)
+
+
+def grey(pixels):
+    """Luma as float32"""
+    if pixels.ndim == 2:
+        return pixels.astype(np.float32)
+    return pixels[..., :3].astype(np.float32) @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def sharpness(pixels) -> float:
+    """Variance of the 4-neighbour Laplacian of the luma (higher = sharper)"""
+    luma = grey(pixels)
+    if luma.shape[0] < 3 or luma.shape[1] < 3:
+        return 0.0
+    laplacian = (luma[:-2, 1:-1] + luma[2:, 1:-1] + luma[1:-1, :-2] + luma[1:-1, 2:]
+                 - 4 * luma[1:-1, 1:-1])
+    return float(laplacian.var())
+
+
+def _luma_stack(stack):
+    """Luma of a stack of same-shaped images, (N, H, W) float32 on a 0-255 scale"""
+    if stack.dtype.kind == "f":
+        scale = 255.0
+    else:
+        scale = 255.0 / np.iinfo(stack.dtype).max
+    if stack.ndim == 4:
+        luma = stack[..., :3].astype(np.float32) @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    else:
+        luma = stack.astype(np.float32)
+    if scale != 1.0:
+        luma *= scale
+    return luma
+
+
+def quality_metrics(stack):
+    """Quality metrics for a stack of same-shaped images (N, H, W[, C]).
+
+    Returns a dict of length-N arrays:
+      sharpness - variance of the Laplacian
+      noise     - Immerkaer's noise sigma estimate
+      exposure  - mean luma (0-1), clipped_dark/clipped_bright fractions and
+                  dynamic_range between the 1st and 99th percentile (0-1)
+    All on the 0-255 scale regardless of dtype.
+    """
+    luma = _luma_stack(stack)
+    n, height, width = luma.shape
+    if height < 3 or width < 3:
+        zeros = np.zeros(n)
+        return {"sharpness": zeros, "noise": zeros, "exposure": zeros + 0.5,
+                "clipped_dark": zeros, "clipped_bright": zeros, "dynamic_range": zeros}
+
+    centre = luma[:, 1:-1, 1:-1]
+    cross = luma[:, :-2, 1:-1] + luma[:, 2:, 1:-1] + luma[:, 1:-1, :-2] + luma[:, 1:-1, 2:]
+    laplacian = cross - 4 * centre
+    corners = luma[:, :-2, :-2] + luma[:, :-2, 2:] + luma[:, 2:, :-2] + luma[:, 2:, 2:]
+    # Immerkaer mask [[1,-2,1],[-2,4,-2],[1,-2,1]] = corners - 2*cross + 4*centre
+    residual = np.abs(corners - 2 * cross + 4 * centre)
+    noise = np.sqrt(np.pi / 2) * residual.sum(axis=(1, 2)) / (6 * (width - 2) * (height - 2))
+
+    # Exposure from per-image 256-bin histograms (one bincount for the stack)
+    bins = np.clip(luma, 0, 255).astype(np.int32).reshape(n, -1)
+    bins += (np.arange(n, dtype=np.int32) * 256)[:, None]
+    histogram = np.bincount(bins.ravel(), minlength=n * 256).reshape(n, 256) / bins.shape[1]
+    cumulative = histogram.cumsum(axis=1)
+    low = (cumulative < 0.01).sum(axis=1)
+    high = (cumulative < 0.99).sum(axis=1)
+    return {
+        "sharpness": laplacian.var(axis=(1, 2)),
+        "noise": noise,
+        "exposure": histogram @ np.arange(256) / 255.0,
+        "clipped_dark": cumulative[:, 5],
+        "clipped_bright": 1.0 - cumulative[:, 249],
+        "dynamic_range": (high - low) / 255.0,
+    }
+
+
+def quality_score(metrics, sharpness_ref: float = 100.0, noise_ref: float = 10.0,
+                  weights=(0.5, 0.25, 0.25)):
+    """Combine quality_metrics() into scores in [0, 1].
+
+    Sharpness saturates around sharpness_ref, noise decays around noise_ref,
+    and exposure rewards mid-tone means, wide dynamic range and little clipping.
+    """
+    sharp = 1.0 - np.exp(-metrics["sharpness"] / sharpness_ref)
+    clean = np.exp(-metrics["noise"] / noise_ref)
+    exposure = ((1.0 - 2.0 * np.abs(metrics["exposure"] - 0.5))
+                * np.clip(metrics["dynamic_range"] / 0.8, 0.0, 1.0)
+                * (1.0 - metrics["clipped_dark"] - metrics["clipped_bright"]))
+    w_sharp, w_noise, w_exposure = weights
+    score = (w_sharp * sharp + w_noise * clean + w_exposure * np.clip(exposure, 0.0, 1.0))
+    return score / (w_sharp + w_noise + w_exposure)
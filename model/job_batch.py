@@ -0,0 +1,165 @@
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from .image_job import ImageJob
+
+try:
+    import numpy as np
+except ImportError:  # JobBatch needs numpy, ImageJob does not
+    np = None
+
+
+class FormatTable:
+    """Interns format strings to small integer codes shared by every batch"""
+    def __init__(self):
+        self.names: List[str] = []
+        self.codes: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def code(self, name: str) -> int:
+        code = self.codes.get(name)
+        if code is None:
+            with self.lock:
+                code = self.codes.setdefault(name, len(self.names))
+                if code == len(self.names):
+                    self.names.append(name)
+        return code
+
+    def name(self, code: int) -> str:
+        return self.names[code]
+
+
+FORMATS = FormatTable()
+
+
+class JobBatch:
+    """Struct-of-arrays batch of job metadata - one row per ImageJob.
+
+    Columns are numpy arrays: image_id and correlation_id are fixed-width
+    strings ("" = no correlation), current_format holds FORMATS codes,
+    quality_score and numeric_value are float64 (NaN = None). Transformations
+    apply to the whole batch. Channels typed ImageJob carry batches as they
+    are; pixels and the panorama/split fields stay on ImageJob.
+    """
+    record_type = ImageJob  # Channels of this type accept batches
+
+    def __init__(self, image_id, current_format, quality_score=None, numeric_value=None,
+                 cycle_count=None, correlation_id=None, created_at=None,
+                 transformations: Optional[List[str]] = None):
+        if np is None:
+            raise ImportError("JobBatch requires numpy")
+        n = len(image_id)
+        self.image_id = np.asarray(image_id, dtype=str)
+        self.current_format = np.asarray(current_format, dtype=np.int16)
+        self.quality_score = self._column(quality_score, n, np.float64, np.nan)
+        self.numeric_value = self._column(numeric_value, n, np.float64, np.nan)
+        self.cycle_count = self._column(cycle_count, n, np.int32, 0)
+        self.correlation_id = (np.asarray(correlation_id, dtype=str) if correlation_id is not None
+                               else np.full(n, "", dtype="<U1"))
+        self.created_at = time.time() if created_at is None else created_at
+        self.transformations = list(transformations or [])
+        self.trace_id = None
+
+    @property
+    def created_at(self):
+        return self._created_at
+
+    @created_at.setter
+    def created_at(self, value):
+        """Accepts a column or one timestamp for the whole batch (as sources set it)"""
+        self._created_at = np.broadcast_to(np.asarray(value, dtype=np.float64), self.image_id.shape)
+
+    @staticmethod
+    def _column(values, n: int, dtype, fill):
+        if values is None:
+            return np.full(n, fill, dtype=dtype)
+        return np.asarray(values, dtype=dtype)
+
+    @classmethod
+    def from_jobs(cls, jobs: Sequence[ImageJob]) -> 'JobBatch':
+        """Pack ImageJobs into columns (transformations of the first job are kept)"""
+        def number(value):
+            return np.nan if value is None else value
+
+        return cls(
+            image_id=[job.image_id for job in jobs],
+            current_format=[FORMATS.code(job.current_format) for job in jobs],
+            quality_score=[number(job.quality_score) for job in jobs],
+            numeric_value=[number(job.numeric_value) for job in jobs],
+            cycle_count=[job.cycle_count for job in jobs],
+            correlation_id=[job.correlation_id or "" for job in jobs],
+            created_at=[job.created_at for job in jobs],
+            transformations=jobs[0].transformations if jobs else None,
+        )
+
+    def to_jobs(self) -> List[ImageJob]:
+        """Unpack into one ImageJob per row"""
+        def number(value):
+            return None if np.isnan(value) else float(value)
+
+        return [
+            ImageJob(
+                image_id=str(self.image_id[i]),
+                transformations=self.transformations.copy(),
+                current_format=FORMATS.name(self.current_format[i]),
+                quality_score=number(self.quality_score[i]),
+                numeric_value=number(self.numeric_value[i]),
+                cycle_count=int(self.cycle_count[i]),
+                correlation_id=str(self.correlation_id[i]) or None,
+                created_at=float(self.created_at[i]),
+            )
+            for i in range(len(self))
+        ]
+
+    def take(self, rows) -> 'JobBatch':
+        """Rows selected by an index array or boolean mask"""
+        return JobBatch(self.image_id[rows], self.current_format[rows], self.quality_score[rows],
+                        self.numeric_value[rows], self.cycle_count[rows], self.correlation_id[rows],
+                        self.created_at[rows], self.transformations)
+
+    @staticmethod
+    def concat(batches: Iterable['JobBatch']) -> 'JobBatch':
+        batches = list(batches)
+        return JobBatch(
+            np.concatenate([b.image_id for b in batches]),
+            np.concatenate([b.current_format for b in batches]),
+            np.concatenate([b.quality_score for b in batches]),
+            np.concatenate([b.numeric_value for b in batches]),
+            np.concatenate([b.cycle_count for b in batches]),
+            np.concatenate([b.correlation_id for b in batches]),
+            np.concatenate([b.created_at for b in batches]),
+            batches[0].transformations,
+        )
+
+    @staticmethod
+    def choose(batches: Sequence['JobBatch'], which) -> 'JobBatch':
+        """Row i taken from batches[which[i]] (batches must have equal lengths)"""
+        def pick(column: str):
+            columns = [getattr(b, column) for b in batches]
+            return np.choose(which, columns) if len(columns) <= 32 else \
+                np.stack(columns)[which, np.arange(len(which))]
+
+        return JobBatch(pick("image_id"), pick("current_format"), pick("quality_score"),
+                        pick("numeric_value"), pick("cycle_count"), pick("correlation_id"),
+                        pick("created_at"), batches[0].transformations)
+
+    def copy(self) -> 'JobBatch':
+        """Columns are shared (nodes replace them rather than write in place)"""
+        batch = self.take(slice(None))
+        batch.trace_id = self.trace_id
+        return batch
+
+    def add_transformation(self, transformation: str) -> 'JobBatch':
+        if transformation not in self.transformations:
+            self.transformations.append(transformation)
+        return self
+
+    def formats(self) -> List[str]:
+        return [FORMATS.name(code) for code in self.current_format]
+
+    def __len__(self) -> int:
+        return len(self.image_id)
+
+    def __str__(self) -> str:
+        return f"JobBatch({len(self)} jobs, transformations={len(self.transformations)})"
@@ -0,0 +1,254 @@
+"""
+Compact binary encoding of ImageJob batches (for IPC, spilling, checkpoints).
+
+A frame holds a batch of jobs column by column:
+
+    header    magic "IJOB", version, string index width, job count, section
+              count (struct-packed)
+    sections  each a u32 length + payload: the string table, then one packed
+              array per column (see encode_jobs); None is 0 for strings, NaN
+              for floats and INT_NONE for ints; rarely set fields (offsets,
+              metrics, config updates, buffers) list only the jobs having them
+    buffers   pixel arrays and encoded bytes, out of band
+
+Every string (ids, formats, transformation names, metric names) is stored
+once in the frame's string table and referenced by index, so repeated
+transformation lists cost 4 bytes per entry. encode_jobs() returns the
+frame and the buffers separately (like pickle protocol 5) so a transport can
+send pixels without copying them; pack()/unpack() put both into one bytes
+object, and unpack() hands back numpy views into it.
+
+Each frame costs some tens of microseconds however few jobs it holds, so
+encode batches (a few dozen jobs or more), not single jobs. Decoding only
+accepts its own version - bump VERSION when the layout changes.
+"""
+import math
+import pickle
+import struct
+from array import array
+from itertools import accumulate, chain
+from operator import attrgetter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from .image_job import ImageJob
+from .processing_status import ProcessingStatus
+
+MAGIC = b"IJOB"
+VERSION = 1
+HEADER = struct.Struct("<4sHBxII")  # magic, version, index width (2/4), count, sections
+LENGTH = struct.Struct("<I")
+INT_NONE = -(1 << 31)
+
+STATUSES = list(ProcessingStatus)
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+
+# Scalar columns by storage: string-table index, float64, int32
+_STRINGS = ("image_id", "current_format", "panorama_group", "correlation_id", "encoded_format", "trace_id")
+_FLOATS = ("quality_score", "numeric_value", "created_at")
+_INTS = ("cycle_count", "iteration_limit", "width", "height", "split_into")
+_LISTS = ("transformations", "processed_by")
+_get_strings, _get_floats, _get_ints, _get_lists = (attrgetter(*names) for names in
+                                                    (_STRINGS, _FLOATS, _INTS, _LISTS))
+_FIELDS = _STRINGS + _FLOATS + _INTS + _LISTS + (
+    "status", "is_termination", "is_poison_pill", "panorama_offset", "quality_metrics",
+    "config_updates", "pixels", "encoded", "levels")
+
+
+def _present(jobs: Sequence[ImageJob], name: str) -> Tuple[List[int], list]:
+    """Positions and values of the jobs where field name is set"""
+    values = [getattr(job, name) for job in jobs]
+    positions = [i for i, value in enumerate(values) if value is not None]
+    return positions, [values[i] for i in positions]
+
+
+def _buffer(obj) -> memoryview:
+    """Bytes-like view of a pixel array or encoded bytes/mmap, C-contiguous"""
+    if hasattr(obj, "dtype"):
+        import numpy as np
+        obj = np.ascontiguousarray(obj)
+    return memoryview(obj).cast("B")
+
+
+def encode_jobs(jobs: Sequence[ImageJob]) -> Tuple[bytes, List[memoryview]]:
+    """Frame for jobs plus their out-of-band buffers (pixels, encoded bytes)"""
+    count = len(jobs)
+    table: Dict[Optional[str], int] = {None: 0}
+    intern = table.setdefault
+    indexed: List[list] = []   # String-index columns, packed once the table width is known
+    sections: List[Any] = []
+
+    def strings(values) -> int:
+        indexed.append([intern(value, len(table)) for value in values])
+        sections.append(len(indexed) - 1)
+
+    columns = list(zip(*map(_get_strings, jobs))) if count else [()] * len(_STRINGS)
+    for column in columns:
+        strings(column)
+    columns = list(zip(*map(_get_floats, jobs))) if count else [()] * len(_FLOATS)
+    for column in columns:
+        sections.append(array("d", [math.nan if v is None else v for v in column]).tobytes())
+    columns = list(zip(*map(_get_ints, jobs))) if count else [()] * len(_INTS)
+    for column in columns:
+        sections.append(array("i", [INT_NONE if v is None else v for v in column]).tobytes())
+    columns = list(zip(*map(_get_lists, jobs))) if count else [()] * len(_LISTS)
+    for column in columns:
+        sections.append(array("H", map(len, column)).tobytes())
+        strings(chain.from_iterable(column))
+    sections.append(bytes(STATUS_CODES[job.status] for job in jobs))
+    sections.append(bytes((1 if job.is_termination else 0) | (2 if job.is_poison_pill else 0) for job in jobs))
+
+    positions, offsets = _present(jobs, "panorama_offset")
+    sections += [array("I", positions).tobytes(), array("i", chain.from_iterable(offsets)).tobytes()]
+
+    positions, metrics = _present(jobs, "quality_metrics")
+    sections += [array("I", positions).tobytes(), array("H", map(len, metrics)).tobytes()]
+    strings(chain.from_iterable(metrics))
+    sections.append(array("d", chain.from_iterable(m.values() for m in metrics)).tobytes())
+
+    # Free-form dicts are rare - pickle them rather than invent a schema
+    positions, configs = _present(jobs, "config_updates")
+    configs = [pickle.dumps(config, pickle.HIGHEST_PROTOCOL) for config in configs]
+    sections += [array("I", positions).tobytes(), array("I", map(len, configs)).tobytes(), b"".join(configs)]
+
+    buffers: List[memoryview] = []
+    positions, pixels = _present(jobs, "pixels")
+    buffers += [_buffer(p) for p in pixels]
+    sections += [array("I", positions).tobytes(), array("B", [p.ndim for p in pixels]).tobytes(),
+                 array("q", chain.from_iterable(p.shape for p in pixels)).tobytes()]
+    strings(p.dtype.str for p in pixels)
+    positions, encoded = _present(jobs, "encoded")
+    buffers += [_buffer(e) for e in encoded]
+    sections.append(array("I", positions).tobytes())
+
+    width = 2 if len(table) <= 0xFFFF else 4
+    typecode = "H" if width == 2 else "I"
+    sections = [array(typecode, indexed[s]).tobytes() if isinstance(s, int) else s for s in sections]
+    text = [s.encode() for s in list(table)[1:]]
+    sections[:0] = [array("I", map(len, text)).tobytes(), b"".join(text)]
+
+    parts = [HEADER.pack(MAGIC, VERSION, width, count, len(sections))]
+    for section in sections:
+        parts.append(LENGTH.pack(len(section)))
+        parts.append(section)
+    return b"".join(parts), buffers
+
+
+def _array(typecode: str, payload) -> array:
+    values = array(typecode)
+    values.frombytes(payload)
+    return values
+
+
+def decode_jobs(frame, buffers: Sequence[Any] = ()) -> List[ImageJob]:
+    """Jobs from encode_jobs() output; pixels are numpy views of buffers"""
+    frame = memoryview(frame)
+    magic, version, width, count, section_count = HEADER.unpack_from(frame)
+    if magic != MAGIC:
+        raise ValueError("Not an ImageJob frame")
+    if version != VERSION:
+        raise ValueError(f"Unsupported ImageJob frame version {version} (expected {VERSION})")
+    position = HEADER.size
+    sections = []
+    for _ in range(section_count):
+        (length,) = LENGTH.unpack_from(frame, position)
+        position += LENGTH.size
+        sections.append(frame[position:position + length])
+        position += length
+    sections = iter(sections)
+
+    lengths = _array("I", next(sections))
+    text = bytes(next(sections))
+    ends = list(accumulate(lengths))
+    strings: List[Optional[str]] = [None] + [text[end - length:end].decode()
+                                             for end, length in zip(ends, lengths)]
+    typecode = "H" if width == 2 else "I"
+
+    def indexed() -> List[Optional[str]]:
+        return [strings[i] for i in _array(typecode, next(sections))]
+
+    columns = [indexed() for _ in _STRINGS]
+    columns += [[None if v != v else v for v in _array("d", next(sections))] for _ in _FLOATS]
+    columns += [[None if v == INT_NONE else v for v in _array("i", next(sections))] for _ in _INTS]
+    for _ in _LISTS:
+        counts = _array("H", next(sections))
+        entries = indexed()
+        columns.append([entries[end - n:end] for end, n in zip(accumulate(counts), counts)])
+    columns.append([STATUSES[code] for code in bytes(next(sections))])
+    flags = bytes(next(sections))
+    columns.append([bool(flag & 1) for flag in flags])
+    columns.append([bool(flag & 2) for flag in flags])
+
+    # Sparse columns: positions of the jobs that have the field, then values
+    positions = next(sections)
+    offsets = _array("i", next(sections))
+    columns.append(_sparse(positions, count, [(offsets[i], offsets[i + 1])
+                                                for i in range(0, len(offsets), 2)]))
+    positions = next(sections)
+    counts = _array("H", next(sections))
+    names = indexed()
+    values = _array("d", next(sections))
+    metrics = [dict(zip(names[end - n:end], values[end - n:end])) for end, n in zip(accumulate(counts), counts)]
+    columns.append(_sparse(positions, count, metrics))
+    positions = next(sections)
+    config_lengths = _array("I", next(sections))
+    blob = next(sections)
+    configs = [pickle.loads(blob[end - n:end]) for end, n in zip(accumulate(config_lengths), config_lengths)]
+    columns.append(_sparse(positions, count, configs))
+
+    positions = next(sections)
+    ndims = _array("B", next(sections))
+    shapes = _array("q", next(sections))
+    dtypes = indexed()
+    pixels = []
+    if ndims:
+        import numpy as np
+        for slot, (end, ndim) in enumerate(zip(accumulate(ndims), ndims)):
+            pixels.append(np.frombuffer(buffers[slot], dtype=dtypes[slot]).reshape(tuple(shapes[end - ndim:end])))
+    columns.append(_sparse(positions, count, pixels))
+    columns.append(_sparse(next(sections), count, list(buffers[len(pixels):])))
+    columns.append([None] * count)  # levels
+
+    new = ImageJob.__new__
+    jobs = []
+    for values in zip(*columns):
+        job = new(ImageJob)
+        job.__dict__ = dict(zip(_FIELDS, values))
+        jobs.append(job)
+    return jobs
+
+
+def _sparse(positions, count: int, values: list) -> list:
+    """Column of count entries: values at positions, None elsewhere"""
+    column = [None] * count
+    for i, value in zip(_array("I", positions), values):
+        column[i] = value
+    return column
+
+
+def pack(jobs: Sequence[ImageJob]) -> bytes:
+    """Frame and buffers in one bytes object (buffers 64-byte aligned)"""
+    frame, buffers = encode_jobs(jobs)
+    parts = [LENGTH.pack(len(frame)), frame, LENGTH.pack(len(buffers))]
+    position = sum(len(p) for p in parts) + 16 * len(buffers)
+    table = array("q")  # (start, length) per buffer
+    payload = []
+    for buffer in buffers:
+        padding = -position % 64
+        payload.append(b"\0" * padding)
+        position += padding
+        table.extend((position, buffer.nbytes))
+        payload.append(buffer)
+        position += buffer.nbytes
+    return b"".join(parts + [table.tobytes()] + payload)
+
+
+def unpack(data) -> List[ImageJob]:
+    """Jobs from pack(); pixels and encoded bytes are views into data"""
+    view = memoryview(data)
+    (frame_length,) = LENGTH.unpack_from(view)
+    frame = view[LENGTH.size:LENGTH.size + frame_length]
+    position = LENGTH.size + frame_length
+    (buffer_count,) = LENGTH.unpack_from(view, position)
+    position += LENGTH.size
+    table = _array("q", view[position:position + 16 * buffer_count])
+    buffers = [view[table[i]:table[i] + table[i + 1]] for i in range(0, len(table), 2)]
+    return decode_jobs(frame, buffers)